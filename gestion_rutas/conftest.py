@@ -0,0 +1,30 @@
+"""Fixtures compartidas de pytest para las pruebas de servicios y de database/db.py"""
+
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+from gestion_rutas.database import db as db_modulo
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path, monkeypatch):
+    """
+    Base SQLite temporal con las tablas de models.models y models.base. Reemplaza el
+    engine de database/db.py (y el importado por nombre en los servicios) para que los
+    helpers raw-SQL no toquen gestion_rutas_local.db.
+    """
+    from gestion_rutas.models import base  # noqa: F401 (registra las tablas en db.Base)
+    from gestion_rutas.models.models import Base as LegacyBase
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'pruebas.db'}", connect_args={"check_same_thread": False})
+    LegacyBase.metadata.create_all(bind=engine)
+    db_modulo.Base.metadata.create_all(bind=engine)
+
+    original = db_modulo.engine
+    for nombre, modulo in list(sys.modules.items()):
+        if nombre.startswith("gestion_rutas") and getattr(modulo, "engine", None) is original:
+            monkeypatch.setattr(modulo, "engine", engine)
+    yield engine
+    engine.dispose()
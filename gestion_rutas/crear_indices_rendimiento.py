@@ -0,0 +1,141 @@
+"""
+Script de migración: índices de rendimiento
+Crea en una base PostgreSQL existente los índices declarados en los modelos
+(create_all solo los crea en tablas nuevas) y las vistas materializadas de
+analítica.
+
+Uso: python -m gestion_rutas.crear_indices_rendimiento
+"""
+
+import logging
+from sqlalchemy import text
+from .database.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Columna geográfica de punto_recoleccion para obtener_puntos_cercanos (requiere PostGIS).
+# Se calcula desde latitud/longitud, así que no hay que mantenerla desde la aplicación.
+ESPACIAL = [
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+    "ALTER TABLE punto_recoleccion ADD COLUMN IF NOT EXISTS geog geography(Point, 4326) "
+    "GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitud, latitud), 4326)::geography) STORED",
+    # SP-GiST: más chico y rápido que GiST para puntos agrupados (todos en el mismo sector);
+    # no se usa KNN (<->), el orden por distancia se hace sobre los pocos puntos filtrados
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_punto_geog_spgist ON punto_recoleccion USING SPGIST (geog)",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_punto_geog",
+]
+
+# Búsqueda por subcadena de nombre (ILIKE '%...%') en obtener_puntos de disposición
+TRIGRAMAS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_punto_nombre_trgm ON punto_disposicion USING GIN (nombre gin_trgm_ops)",
+]
+
+# Geometría de rutas planificadas empaquetada en binario (ver RutaPlanificadaService);
+# las rutas existentes conservan geometria_json y se siguen leyendo desde ahí
+COLUMNAS = [
+    "ALTER TABLE ruta_planificada ADD COLUMN IF NOT EXISTS geometria_bin BYTEA",
+]
+
+# CONCURRENTLY evita bloquear escrituras mientras se construye el índice
+INDICES = [
+    # obtener_entregas / obtener_entregas_pendientes / obtener_entregas_por_ruta
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entrega_estado_fecha ON entregas (estado, fecha_programada)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entrega_cliente_fecha ON entregas (id_cliente, fecha_programada)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entrega_ruta ON entregas (id_ruta)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entrega_pendiente ON entregas (fecha_programada) WHERE estado = 'PENDIENTE'",
+    # obtener_incidencias (ORDER BY fecha_hora DESC)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_incidencia_fecha_desc ON incidencia (fecha_hora DESC)",
+    # obtener_rutas_ejecutadas / obtener_rutas (ORDER BY fecha DESC, id DESC y paginación por clave)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ruta_exec_fecha_id ON ruta_ejecutada (fecha DESC, id_ruta_exec DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ruta_plan_fecha_id ON ruta_planificada (fecha DESC, id_ruta DESC)",
+    # obtener_rutas filtrando por zona (y turno)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ruta_plan_zona_turno_fecha ON ruta_planificada (id_zona, id_turno, fecha DESC, id_ruta DESC)",
+    # obtener_turnos / obtener_turnos_por_camion (WHERE id_camion o estado ORDER BY fecha DESC)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_turno_camion_fecha ON turno (id_camion, fecha DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_turno_estado_fecha ON turno (estado, fecha DESC)",
+    # obtener_rutas_por_camion / métricas del camión (WHERE id_camion ORDER BY fecha DESC)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ruta_exec_camion_fecha ON ruta_ejecutada (id_camion, fecha DESC)",
+    # obtener_rutas_ejecutadas(ruta_id) / calcular_metricas_ruta
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ruta_exec_id_ruta ON ruta_ejecutada (id_ruta)",
+    # obtener_puntos_por_tipo (WHERE tipo ORDER BY nombre, columnas en INCLUDE)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_punto_disp_tipo_nombre ON punto_disposicion (tipo, nombre) "
+    "INCLUDE (id_disposicion, latitud, longitud, capacidad_diaria_ton)",
+    # obtener_periodos_por_granularidad / obtener_periodos_por_estacionalidad
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_periodo_gran_fecha ON periodo_temporal (tipo_granularidad, fecha_inicio DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_periodo_estac_fecha ON periodo_temporal (estacionalidad, fecha_inicio DESC)",
+]
+
+# Resumen diario de predicciones por zona; el índice único permite REFRESH CONCURRENTLY
+VISTAS = [
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_pred_by_zona AS
+    SELECT id_zona,
+           date_trunc('day', fecha_prediccion) AS dia,
+           COUNT(*) AS n_predicciones,
+           AVG(valor_predicho_kg) AS promedio_predicho_kg,
+           AVG(valor_real_kg) AS promedio_real_kg,
+           AVG(error_rmse) AS promedio_rmse,
+           AVG(error_mape) AS promedio_mape
+    FROM prediccion_demanda
+    GROUP BY 1, 2
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_pred_by_zona ON mv_pred_by_zona (id_zona, dia)",
+]
+
+
+def crear_indices():
+    """Crear los índices de rendimiento (solo PostgreSQL)"""
+    if engine.dialect.name != "postgresql":
+        logger.warning(f"Motor {engine.dialect.name}: se omiten los índices (solo PostgreSQL)")
+        return
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for ddl in ESPACIAL:
+            try:
+                conn.execute(text(ddl))
+                logger.info(f"OK: {ddl}")
+            except Exception as e:
+                # Sin PostGIS, obtener_puntos_cercanos sigue calculando en Python
+                logger.warning(f"Se omite DDL espacial ({ddl}): {e}")
+                break
+        for ddl in TRIGRAMAS:
+            try:
+                conn.execute(text(ddl))
+                logger.info(f"OK: {ddl}")
+            except Exception as e:
+                logger.warning(f"Se omite índice de trigramas ({ddl}): {e}")
+                break
+        for ddl in COLUMNAS:
+            try:
+                conn.execute(text(ddl))
+                logger.info(f"OK: {ddl}")
+            except Exception as e:
+                logger.error(f"Error agregando columna ({ddl}): {e}")
+        for ddl in INDICES:
+            try:
+                conn.execute(text(ddl))
+                logger.info(f"OK: {ddl}")
+            except Exception as e:
+                logger.error(f"Error creando índice ({ddl}): {e}")
+        for ddl in VISTAS:
+            try:
+                conn.execute(text(ddl))
+                logger.info("OK: vista materializada mv_pred_by_zona")
+            except Exception as e:
+                logger.error(f"Error creando vista materializada: {e}")
+
+
+def refrescar_vistas():
+    """Refrescar las vistas materializadas sin bloquear lecturas (solo PostgreSQL)"""
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_pred_by_zona"))
+
+
+if __name__ == "__main__":
+    crear_indices()
@@ -1,10 +1,19 @@
 import os
+import re
+import hashlib
 import logging
+from collections import OrderedDict
+from contextlib import contextmanager
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -15,6 +24,19 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "gestion_rutas")
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+# Pool de conexiones compartido por el ORM y los helpers raw-SQL
+# (engine.raw_connection() toma una conexión del pool y close() la devuelve).
+# Tamaño total = DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW (25 por defecto).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# pre_ping hace un "SELECT 1" en cada checkout; con pool_recycle y una red estable
+# puede desactivarse (DB_POOL_PRE_PING=0) para ahorrar un round-trip por consulta
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+# Caché de SQL compilado de SQLAlchemy (por defecto 500 formas de consulta); con muchos
+# filtros opcionales por listado las formas se multiplican y conviene un margen mayor
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
 SQLITE_DATABASE_URL = "sqlite:///./gestion_rutas_local.db"
 
 Base = declarative_base()
@@ -24,7 +46,14 @@ SessionLocal = None
 
 try:
     # Intentar conectar a PostgreSQL
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_POOL_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        query_cache_size=DB_QUERY_CACHE_SIZE,
+    )
     # Test connection
     with engine.connect() as connection:
         connection.execute(text("SELECT 1"))
@@ -42,9 +71,16 @@ except Exception as e:
     logger.warning(f"No se pudo conectar a PostgreSQL: {error_msg}")
     logger.warning("Activando modo fallback: SQLite local")
     engine = create_engine(
-        SQLITE_DATABASE_URL, connect_args={"check_same_thread": False}
+        SQLITE_DATABASE_URL, connect_args={"check_same_thread": False},
+        query_cache_size=DB_QUERY_CACHE_SIZE,
     )
 
+if engine.dialect.name == "postgresql" and orjson is not None:
+    # psycopg2 decodifica las columnas json/jsonb con json.loads; orjson es bastante más rápido
+    import psycopg2.extras
+    psycopg2.extras.register_default_json(globally=True, loads=orjson.loads)
+    psycopg2.extras.register_default_jsonb(globally=True, loads=orjson.loads)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -54,6 +90,12 @@ def get_db():
     finally:
         db.close()
 
+def cerrar_pool():
+    """Cerrar todas las conexiones del pool (llamar al apagar la aplicación)"""
+    if engine is not None:
+        engine.dispose()
+        logger.info("Pool de conexiones cerrado")
+
 def init_db():
     """Inicializar la base de datos (crear tablas)"""
     # Importar modelos aquí para evitar importaciones circulares al inicio
@@ -83,7 +125,100 @@ def get_connection():
     """Obtener una conexión raw (DBAPI)"""
     return engine.raw_connection()
 
-def execute_query(query, params=None, fetch=True):
+# Sentencias preparadas (PREPARE/EXECUTE) por conexión del pool, en orden LRU.
+# Detrás de pgbouncer en modo transacción la conexión al servidor cambia entre
+# transacciones y un PREPARE no sobrevive: desactivar con DB_PREPARED_STATEMENTS=0
+MAX_PREPARADAS_POR_CONEXION = 64
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "1") != "0"
+
+# SQLSTATE de una sentencia preparada que ya no sirve: no existe en el servidor
+# (DISCARD ALL, reinicio de pgbouncer) o su plan quedó inválido porque cambió el tipo
+# de fila ("cached plan must not change result type", p. ej. tras un ALTER TABLE)
+_PREPARADA_INEXISTENTE = "26000"
+_PREPARADA_INVALIDA = "0A000"
+_PREPARADA_DUPLICADA = "42P05"
+
+
+def _en_savepoint(cursor, sql, params=None):
+    """
+    Ejecutar sql dentro de un SAVEPOINT: si falla se vuelve al savepoint (la transacción
+    y el trabajo previo siguen válidos) y se relanza el error.
+    """
+    cursor.execute("SAVEPOINT lar_preparada")
+    try:
+        cursor.execute(sql, params)
+    except Exception:
+        cursor.execute("ROLLBACK TO SAVEPOINT lar_preparada")
+        raise
+    cursor.execute("RELEASE SAVEPOINT lar_preparada")
+
+
+def _ejecutar(conn, cursor, query, params=None, preparada=False, en_transaccion=False):
+    """
+    Ejecutar una consulta; con preparada=True (solo PostgreSQL) se prepara una vez
+    por conexión y las siguientes llamadas solo hacen EXECUTE, sin re-planificar.
+    Pensado para consultas fijas y simples (getters por id) con lista explícita de
+    columnas: con SELECT * / RETURNING * un ALTER TABLE invalida el plan.
+
+    Si el EXECUTE falla porque la sentencia ya no existe o su plan es inválido, se
+    olvida y la consulta se ejecuta directa. Sin en_transaccion la consulta es la
+    primera de su transacción y basta con un rollback; con en_transaccion (varias
+    consultas en la misma transacción, ver misma_conexion) el EXECUTE va en un
+    SAVEPOINT para no perder lo anterior.
+    """
+    if not preparada or not DB_PREPARED_STATEMENTS or "sqlite" in str(engine.url):
+        cursor.execute(query, params or ())
+        return
+
+    # conn.info vive mientras viva la conexión DBAPI (se reinicia si se reconecta)
+    preparadas = conn.info.setdefault("preparadas", OrderedDict())
+    nombre = "lar_" + hashlib.md5(query.encode()).hexdigest()[:16]
+    n_params = query.count("%s")
+    if nombre in preparadas:
+        preparadas.move_to_end(nombre)
+    else:
+        contador = iter(range(1, n_params + 1))
+        sql = re.sub(r"%s", lambda _: f"${next(contador)}", query)
+        try:
+            _en_savepoint(cursor, f"PREPARE {nombre} AS {sql}")
+        except Exception as e:
+            # Ya preparada en el servidor (conn.info se perdió): se puede usar igual
+            if getattr(e, "pgcode", None) != _PREPARADA_DUPLICADA:
+                logger.warning(f"No se pudo preparar la consulta, se ejecuta directa: {e}")
+                cursor.execute(query, params or ())
+                return
+        preparadas[nombre] = n_params
+        if len(preparadas) > MAX_PREPARADAS_POR_CONEXION:
+            antigua, _ = preparadas.popitem(last=False)
+            try:
+                _en_savepoint(cursor, f"DEALLOCATE {antigua}")
+            except Exception as e:
+                logger.warning(f"No se pudo liberar la sentencia {antigua}: {e}")
+
+    argumentos = "(" + ", ".join(["%s"] * n_params) + ")" if n_params else ""
+    ejecutar = f"EXECUTE {nombre}{argumentos}"
+    try:
+        if en_transaccion:
+            _en_savepoint(cursor, ejecutar, params or ())
+        else:
+            cursor.execute(ejecutar, params or ())
+    except Exception as e:
+        codigo = getattr(e, "pgcode", None)
+        if codigo not in (_PREPARADA_INEXISTENTE, _PREPARADA_INVALIDA):
+            raise
+        logger.warning(f"Sentencia preparada {nombre} inválida, se ejecuta directa: {e}")
+        preparadas.pop(nombre, None)
+        if not en_transaccion:
+            conn.rollback()
+        if codigo == _PREPARADA_INVALIDA:
+            # Sigue existiendo en el servidor: liberarla para poder prepararla de nuevo
+            try:
+                _en_savepoint(cursor, f"DEALLOCATE {nombre}")
+            except Exception:
+                pass
+        cursor.execute(query, params or ())
+
+def execute_query(query, params=None, fetch=True, preparada=False):
     conn = get_connection()
     try:
         cursor = conn.cursor()
@@ -115,7 +250,7 @@ def execute_query(query, params=None, fetch=True):
 
             query = query.replace("%s", "?")
             
-        cursor.execute(query, params or ())
+        _ejecutar(conn, cursor, query, params, preparada)
         
         if fetch:
             if cursor.description:
@@ -127,11 +262,109 @@ def execute_query(query, params=None, fetch=True):
     finally:
         conn.close()
 
-def execute_query_one(query, params=None):
-    results = execute_query(query, params, fetch=True)
+def execute_query_as(clase, query, params=None, preparada=False):
+    """
+    Como execute_query, pero cada fila se construye como clase(*fila) en el orden
+    de columnas del SELECT (p. ej. una dataclass con slots) en lugar de un dict.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        if "sqlite" in str(engine.url) and params:
+            query = query.replace("%s", "?")
+        _ejecutar(conn, cursor, query, params, preparada)
+        return [clase(*row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def execute_query_stream(query, params=None, itersize=10000, clase=None):
+    """
+    Iterar las filas de una consulta (como dicts) sin cargarlas todas en memoria.
+    En PostgreSQL usa un cursor con nombre (del lado del servidor) que trae
+    itersize filas por viaje; la conexión se devuelve al pool al terminar.
+    Con clase, cada fila se entrega como clase(*fila).
+    """
+    conn = get_connection()
+    try:
+        is_sqlite = "sqlite" in str(engine.url)
+        if is_sqlite:
+            cursor = conn.cursor()
+            if params:
+                query = query.replace("%s", "?")
+        else:
+            cursor = conn.cursor(name=f"stream_{id(conn)}")
+            cursor.itersize = itersize
+        cursor.execute(query, params or ())
+
+        columns = None
+        while True:
+            filas = cursor.fetchmany(itersize)
+            if not filas:
+                break
+            if clase is not None:
+                for fila in filas:
+                    yield clase(*fila)
+                continue
+            if columns is None:
+                columns = [col[0] for col in cursor.description]
+            for fila in filas:
+                yield dict(zip(columns, fila))
+        cursor.close()
+    finally:
+        conn.close()
+
+class _ConsultasEnConexion:
+    """Consultas sobre una conexión ya tomada del pool (ver misma_conexion)"""
+
+    def __init__(self, conn, cursor, is_sqlite):
+        self.conn = conn
+        self.cursor = cursor
+        self.is_sqlite = is_sqlite
+
+    def todas(self, query, params=None, preparada=False):
+        if self.is_sqlite and params:
+            query = query.replace("%s", "?")
+        _ejecutar(self.conn, self.cursor, query, params, preparada, en_transaccion=True)
+        if not self.cursor.description:
+            return []
+        columns = [col[0] for col in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+    def una(self, query, params=None, preparada=False):
+        filas = self.todas(query, params, preparada)
+        return filas[0] if filas else None
+
+
+@contextmanager
+def misma_conexion(statement_timeout_ms=None):
+    """
+    Ejecutar varias consultas con una sola conexión del pool y en una sola
+    transacción (misma foto de los datos). Uso:
+
+        with misma_conexion() as db:
+            camion = db.una("SELECT ...", (id,))
+            rutas = db.todas("SELECT ...", (id,))
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        is_sqlite = "sqlite" in str(engine.url)
+        if statement_timeout_ms and not is_sqlite:
+            # SET LOCAL: solo dura lo que dura esta transacción
+            cursor.execute(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+        yield _ConsultasEnConexion(conn, cursor, is_sqlite)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def execute_query_one(query, params=None, preparada=False):
+    results = execute_query(query, params, fetch=True, preparada=preparada)
     return results[0] if results else None
 
-def execute_insert_update_delete(query, params=None):
+def execute_insert_update_delete(query, params=None, preparada=False):
     conn = get_connection()
     try:
         cursor = conn.cursor()
@@ -139,13 +372,13 @@ def execute_insert_update_delete(query, params=None):
         if is_sqlite and params:
             query = query.replace("%s", "?")
             
-        cursor.execute(query, params or ())
+        _ejecutar(conn, cursor, query, params, preparada)
         conn.commit()
         return cursor.rowcount
     finally:
         conn.close()
 
-def execute_insert_returning(query, params=None):
+def execute_insert_returning(query, params=None, preparada=False):
     conn = get_connection()
     try:
         cursor = conn.cursor()
@@ -162,10 +395,13 @@ def execute_insert_returning(query, params=None):
                 
             cursor.execute(query_clean, params or ())
             conn.commit()
+            if cursor.rowcount == 0:
+                # UPDATE/DELETE sin filas afectadas: equivale a RETURNING vacío
+                return None
             last_id = cursor.lastrowid
             return {"id": last_id} # Basic return
         else:
-            cursor.execute(query, params or ())
+            _ejecutar(conn, cursor, query, params, preparada)
             conn.commit()
             if cursor.description:
                 columns = [col[0] for col in cursor.description]
@@ -174,3 +410,85 @@ def execute_insert_returning(query, params=None):
             return None
     finally:
         conn.close()
+
+def execute_values_returning(query, rows, page_size=1000):
+    """
+    Inserción masiva en un solo round-trip por página.
+    La consulta usa "VALUES %s" (formato de psycopg2.extras.execute_values);
+    devuelve las filas del RETURNING (en SQLite, lista vacía).
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        is_sqlite = "sqlite" in str(engine.url)
+
+        if is_sqlite:
+            marcadores = "(" + ", ".join("?" * len(rows[0])) + ")"
+            query_clean = query.split("RETURNING")[0].replace("%s", marcadores)
+            cursor.executemany(query_clean, rows)
+            conn.commit()
+            return []
+        else:
+            from psycopg2.extras import execute_values
+            resultados = execute_values(cursor, query, rows, page_size=page_size, fetch="RETURNING" in query)
+            conn.commit()
+            if not resultados:
+                return []
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in resultados]
+    finally:
+        conn.close()
+
+def set_enviados(columnas):
+    """
+    Cláusula SET de texto fijo para un UPDATE parcial: "col = CASE WHEN %s THEN %s
+    ELSE col END" por columna. Cada columna recibe (enviada, valor), ver
+    valores_enviados: un None enviado limpia la columna y un campo ausente la conserva.
+    """
+    return ", ".join(f"{col} = CASE WHEN %s THEN %s ELSE {col} END" for col in columnas)
+
+def valores_enviados(datos, columnas):
+    """Parámetros de set_enviados: (col in datos, datos.get(col)) por columna, en orden"""
+    valores = []
+    for col in columnas:
+        valores.extend((col in datos, datos.get(col)))
+    return valores
+
+def separar_total(rows, columna="total", skip=0, consulta_conteo=None, params_conteo=None):
+    """
+    Extraer el total de una consulta paginada con COUNT(*) OVER() y quitarlo
+    de cada fila. Con la página vacía el total no viene en ninguna fila: si
+    skip > 0 (OFFSET más allá del final) se cuenta con consulta_conteo (un
+    SELECT COUNT(*) AS <columna> con el mismo WHERE); sin ella es None
+    (desconocido), nunca un 0 falso. Con skip 0 la página vacía sí significa 0.
+    """
+    if rows:
+        total = rows[0][columna]
+        for row in rows:
+            row.pop(columna, None)
+        return rows, total
+    if not skip:
+        return rows, 0
+    if consulta_conteo is None:
+        return rows, None
+    fila = execute_query_one(consulta_conteo, params_conteo)
+    return rows, fila[columna] if fila else 0
+
+def estimar_total(tabla, minimo=10000):
+    """
+    Número aproximado de filas de una tabla según las estadísticas de PostgreSQL
+    (pg_class.reltuples: una lectura del catálogo en lugar de un COUNT(*) completo).
+    Devuelve None en SQLite, si la tabla no se ha analizado o si tiene menos de
+    minimo filas (ahí el COUNT exacto es barato).
+    """
+    if "sqlite" in str(engine.url):
+        return None
+    fila = execute_query_one(
+        "SELECT reltuples::bigint AS n FROM pg_class WHERE oid = to_regclass(%s)", (tabla,), preparada=True
+    )
+    if not fila or fila["n"] is None or fila["n"] < minimo:
+        return None
+    return int(fila["n"])
@@ -0,0 +1,200 @@
+"""test_db.py - Pruebas de los helpers raw-SQL de database/db.py"""
+
+import pytest
+
+from gestion_rutas.database import db as db_modulo
+from gestion_rutas.database.db import _ejecutar, execute_insert_update_delete, execute_query, misma_conexion
+
+
+class _ErrorPg(Exception):
+    """Error con SQLSTATE, como los de psycopg2"""
+
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+class _CursorFalso:
+    """
+    Cursor que solo registra las sentencias (para las ramas exclusivas de PostgreSQL).
+    errores: prefijo de sentencia -> SQLSTATE con el que falla una vez.
+    """
+
+    def __init__(self, sentencias, errores):
+        self.sentencias = sentencias
+        self.errores = errores
+        self.description = None
+
+    def execute(self, query, params=None):
+        self.sentencias.append(query)
+        for prefijo in list(self.errores):
+            if query.startswith(prefijo):
+                raise _ErrorPg(self.errores.pop(prefijo))
+
+
+class _ConexionFalsa:
+    def __init__(self):
+        self.sentencias = []
+        self.errores = {}
+        self.info = {}
+        self.confirmada = False
+        self.revertida = False
+
+    def cursor(self):
+        return _CursorFalso(self.sentencias, self.errores)
+
+    def commit(self):
+        self.confirmada = True
+
+    def rollback(self):
+        self.revertida = True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def conexion_postgres(monkeypatch):
+    """Simular un engine PostgreSQL: get_connection entrega una conexión que registra el SQL"""
+    conexion = _ConexionFalsa()
+
+    class _EngineFalso:
+        url = "postgresql://pruebas"
+
+    monkeypatch.setattr(db_modulo, "engine", _EngineFalso())
+    monkeypatch.setattr(db_modulo, "get_connection", lambda: conexion)
+    return conexion
+
+
+def test_misma_conexion_una_transaccion(sqlite_engine):
+    with misma_conexion() as db:
+        db.todas("INSERT INTO camion (id_camion, patente) VALUES (%s, %s)", (1, "AA-1111"))
+        assert db.una("SELECT patente FROM camion WHERE id_camion = %s", (1,)) == {"patente": "AA-1111"}
+
+    assert execute_query("SELECT COUNT(*) AS n FROM camion") == [{"n": 1}]
+
+
+def test_misma_conexion_revierte_si_falla(sqlite_engine):
+    with pytest.raises(RuntimeError):
+        with misma_conexion() as db:
+            db.todas("INSERT INTO camion (id_camion, patente) VALUES (%s, %s)", (1, "AA-1111"))
+            raise RuntimeError("falla")
+
+    assert execute_query("SELECT COUNT(*) AS n FROM camion") == [{"n": 0}]
+
+
+def test_misma_conexion_statement_timeout(conexion_postgres):
+    with misma_conexion(statement_timeout_ms=2000) as db:
+        db.todas("SELECT 1")
+
+    assert conexion_postgres.sentencias[0] == "SET LOCAL statement_timeout = 2000"
+    assert conexion_postgres.confirmada
+
+
+def test_misma_conexion_sin_timeout_no_emite_set(conexion_postgres):
+    with misma_conexion() as db:
+        db.todas("SELECT 1")
+
+    assert conexion_postgres.sentencias == ["SELECT 1"]
+
+
+def test_execute_insert_update_delete_rowcount(sqlite_engine):
+    assert execute_insert_update_delete("INSERT INTO camion (id_camion, patente) VALUES (%s, %s)", (1, "AA-1111")) == 1
+    assert execute_insert_update_delete("DELETE FROM camion WHERE id_camion = %s", (2,)) == 0
+
+
+_CONSULTA = "SELECT id_turno, estado FROM turno WHERE id_turno = %s"
+
+
+def _preparar(conexion):
+    cursor = conexion.cursor()
+    _ejecutar(conexion, cursor, _CONSULTA, (1,), preparada=True)
+    nombre, = conexion.info["preparadas"]
+    conexion.sentencias.clear()
+    return cursor, nombre
+
+
+def test_ejecutar_prepara_una_vez(conexion_postgres):
+    cursor, nombre = _preparar(conexion_postgres)
+
+    _ejecutar(conexion_postgres, cursor, _CONSULTA, (1,), preparada=True)
+
+    assert conexion_postgres.sentencias == [f"EXECUTE {nombre}(%s)"]
+
+
+def test_ejecutar_prepare_fallido_usa_savepoint(conexion_postgres):
+    conexion_postgres.errores["PREPARE"] = "42601"
+    cursor = conexion_postgres.cursor()
+
+    _ejecutar(conexion_postgres, cursor, _CONSULTA, (1,), preparada=True)
+
+    assert conexion_postgres.sentencias[0] == "SAVEPOINT lar_preparada"
+    assert conexion_postgres.sentencias[2:] == ["ROLLBACK TO SAVEPOINT lar_preparada", _CONSULTA]
+    assert not conexion_postgres.revertida
+    assert not conexion_postgres.info["preparadas"]
+
+
+def test_ejecutar_prepare_duplicada_se_reutiliza(conexion_postgres):
+    conexion_postgres.errores["PREPARE"] = "42P05"
+    cursor = conexion_postgres.cursor()
+
+    _ejecutar(conexion_postgres, cursor, _CONSULTA, (1,), preparada=True)
+
+    nombre, = conexion_postgres.info["preparadas"]
+    assert conexion_postgres.sentencias[-1] == f"EXECUTE {nombre}(%s)"
+
+
+def test_ejecutar_sentencia_inexistente_se_olvida(conexion_postgres):
+    cursor, nombre = _preparar(conexion_postgres)
+    conexion_postgres.errores["EXECUTE"] = "26000"
+
+    _ejecutar(conexion_postgres, cursor, _CONSULTA, (1,), preparada=True)
+
+    assert conexion_postgres.sentencias == [f"EXECUTE {nombre}(%s)", _CONSULTA]
+    assert conexion_postgres.revertida
+    assert nombre not in conexion_postgres.info["preparadas"]
+
+
+def test_ejecutar_plan_invalido_en_transaccion(conexion_postgres):
+    cursor, nombre = _preparar(conexion_postgres)
+    conexion_postgres.errores["EXECUTE"] = "0A000"
+
+    _ejecutar(conexion_postgres, cursor, _CONSULTA, (1,), preparada=True, en_transaccion=True)
+
+    assert conexion_postgres.sentencias == [
+        "SAVEPOINT lar_preparada",
+        f"EXECUTE {nombre}(%s)",
+        "ROLLBACK TO SAVEPOINT lar_preparada",
+        "SAVEPOINT lar_preparada",
+        f"DEALLOCATE {nombre}",
+        "RELEASE SAVEPOINT lar_preparada",
+        _CONSULTA,
+    ]
+    assert not conexion_postgres.revertida
+    assert nombre not in conexion_postgres.info["preparadas"]
+
+
+def test_ejecutar_otros_errores_se_propagan(conexion_postgres):
+    cursor, nombre = _preparar(conexion_postgres)
+    conexion_postgres.errores["EXECUTE"] = "23505"
+
+    with pytest.raises(Exception) as error:
+        _ejecutar(conexion_postgres, cursor, _CONSULTA, (1,), preparada=True)
+
+    assert error.value.pgcode == "23505"
+    assert nombre in conexion_postgres.info["preparadas"]
+
+
+def test_separar_total_pagina_vacia():
+    # Sin skip la página vacía es un total real de 0; más allá del final no se sabe
+    assert db_modulo.separar_total([]) == ([], 0)
+    assert db_modulo.separar_total([], skip=20) == ([], None)
+    filas, total = db_modulo.separar_total([{"id": 1, "total": 7}, {"id": 2, "total": 7}])
+    assert filas == [{"id": 1}, {"id": 2}] and total == 7
+
+
+def test_valores_enviados_distingue_none_de_ausente():
+    columnas = ("nombre", "tipo", "capacidad")
+
+    assert db_modulo.set_enviados(columnas[:1]) == "nombre = CASE WHEN %s THEN %s ELSE nombre END"
+    assert db_modulo.valores_enviados({"tipo": None, "capacidad": 5}, columnas) == [False, None, True, None, True, 5]
@@ -0,0 +1,142 @@
+"""
+Conversión del modelo LSTM del mapa (lstm_temp/modelo.keras) a TFLite cuantizado
+El servicio de predicciones usa lstm_temp/modelo.tflite si existe; si no, usa Keras
+
+Antes de guardar, el modelo cuantizado se compara con Keras sobre ventanas de
+validación que no se usaron para calibrar: si el error supera la tolerancia
+no se escribe el archivo (y el servicio sigue usando Keras).
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+try:
+    import tensorflow as tf
+except ImportError:
+    tf = None
+
+MODELO_KERAS = os.path.join('lstm_temp', 'modelo.keras')
+MODELO_TFLITE = os.path.join('lstm_temp', 'modelo.tflite')
+DATOS_CSV = 'datos_residuos_iquique.csv'
+N_DIAS = 3
+N_MUESTRAS = 200
+N_VALIDACION = 500
+
+# Diferencia máxima aceptada entre TFLite y Keras sobre la validación
+TOLERANCIA_MAPE_PCT = 2.0
+TOLERANCIA_RMSE_REL = 0.02  # RMSE relativo al valor absoluto medio de Keras
+
+
+def cargar_ventanas(ruta_csv: str) -> np.ndarray:
+    """Ventanas de N_DIAS días como las que recibe el servicio (residuos_kg en orden cronológico)"""
+    df = pd.read_csv(ruta_csv, usecols=['punto_recoleccion', 'fecha', 'residuos_kg'])
+    df = df.sort_values('fecha', kind='stable')
+    ventanas = []
+    for _, sub in df.groupby('punto_recoleccion'):
+        residuos = sub['residuos_kg'].to_numpy(dtype=np.float32)
+        for i in range(len(residuos) - N_DIAS + 1):
+            ventanas.append(residuos[i:i + N_DIAS])
+    return np.array(ventanas, dtype=np.float32).reshape(-1, N_DIAS, 1)
+
+
+def separar_calibracion_validacion(ventanas: np.ndarray, seed: int = 42) -> tuple:
+    """Muestras disjuntas: N_MUESTRAS para calibrar la cuantización y hasta N_VALIDACION para validarla"""
+    orden = np.random.default_rng(seed).permutation(len(ventanas))
+    calibracion = ventanas[orden[:N_MUESTRAS]]
+    validacion = ventanas[orden[N_MUESTRAS:N_MUESTRAS + N_VALIDACION]]
+    return calibracion, validacion
+
+
+def convertir(modelo, calibracion: np.ndarray) -> bytes:
+    """Cuantización int8 con entrada/salida float32"""
+    def dataset_representativo():
+        for x in calibracion:
+            yield [x.reshape(1, N_DIAS, 1)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(modelo)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = dataset_representativo
+    # Las capas LSTM sin kernel int8 nativo quedan como operaciones TF
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+        tf.lite.OpsSet.TFLITE_BUILTINS,
+        tf.lite.OpsSet.SELECT_TF_OPS,
+    ]
+    return converter.convert()
+
+
+def predecir_tflite(modelo_tflite: bytes, X: np.ndarray) -> np.ndarray:
+    """Predicciones del modelo convertido, una ventana por invocación (como en el servicio)"""
+    interprete = tf.lite.Interpreter(model_content=modelo_tflite)
+    interprete.allocate_tensors()
+    entrada = interprete.get_input_details()[0]['index']
+    salida = interprete.get_output_details()[0]['index']
+    resultados = []
+    for x in X:
+        interprete.set_tensor(entrada, x.reshape(1, N_DIAS, 1).astype(np.float32))
+        interprete.invoke()
+        resultados.append(interprete.get_tensor(salida).ravel())
+    return np.concatenate(resultados)
+
+
+def comparar_predicciones(pred_keras: np.ndarray, pred_tflite: np.ndarray) -> dict:
+    """MAPE (%) y RMSE relativo de TFLite respecto de Keras"""
+    pred_keras = np.asarray(pred_keras, dtype=np.float64).ravel()
+    pred_tflite = np.asarray(pred_tflite, dtype=np.float64).ravel()
+    diferencia = pred_tflite - pred_keras
+    escala = max(float(np.mean(np.abs(pred_keras))), 1e-9)
+    # Piso del denominador: una salida de Keras ~0 no dispara el MAPE
+    denominador = np.maximum(np.abs(pred_keras), escala * 1e-3)
+    return {
+        'mape_pct': float(np.mean(np.abs(diferencia) / denominador) * 100),
+        'rmse_rel': float(np.sqrt(np.mean(diferencia ** 2)) / escala),
+    }
+
+
+def dentro_de_tolerancia(metricas: dict) -> bool:
+    return metricas['mape_pct'] <= TOLERANCIA_MAPE_PCT and metricas['rmse_rel'] <= TOLERANCIA_RMSE_REL
+
+
+def main() -> int:
+    if tf is None:
+        print("[ERROR] TensorFlow no está instalado")
+        return 1
+
+    print("=" * 80)
+    print("CONVERSIÓN DEL MODELO LSTM A TFLITE")
+    print("=" * 80)
+
+    print("\n1. Cargando modelo Keras...")
+    modelo = tf.keras.models.load_model(MODELO_KERAS)
+
+    print("\n2. Preparando datos representativos y de validación...")
+    calibracion, validacion = separar_calibracion_validacion(cargar_ventanas(DATOS_CSV))
+    print(f"   {len(calibracion)} ventanas de calibración y {len(validacion)} de validación ({N_DIAS} días)")
+
+    print("\n3. Convirtiendo (cuantización int8 con entrada/salida float32)...")
+    modelo_tflite = convertir(modelo, calibracion)
+
+    print("\n4. Validando contra Keras...")
+    metricas = comparar_predicciones(
+        modelo.predict(validacion, verbose=0), predecir_tflite(modelo_tflite, validacion)
+    )
+    print(f"   MAPE: {metricas['mape_pct']:.3f}% (máx {TOLERANCIA_MAPE_PCT}%)")
+    print(f"   RMSE relativo: {metricas['rmse_rel']:.4f} (máx {TOLERANCIA_RMSE_REL})")
+    if not dentro_de_tolerancia(metricas):
+        print(f"\n[ERROR] El modelo cuantizado se aleja demasiado de Keras: no se escribe {MODELO_TFLITE}")
+        return 1
+
+    with open(MODELO_TFLITE, 'wb') as f:
+        f.write(modelo_tflite)
+
+    print(f"   [OK] Modelo guardado en {MODELO_TFLITE} ({len(modelo_tflite) / 1024:.1f} KB)")
+    print("\n" + "=" * 80)
+    print("[OK] CONVERSIÓN COMPLETADA")
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
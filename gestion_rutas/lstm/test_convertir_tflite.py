@@ -0,0 +1,53 @@
+"""test_convertir_tflite.py - Validación del modelo TFLite cuantizado contra Keras"""
+
+import numpy as np
+import pytest
+
+import convertir_tflite as conv
+
+
+def test_comparar_predicciones_identicas():
+    pred = np.array([10.0, 20.0, 30.0])
+
+    metricas = conv.comparar_predicciones(pred, pred)
+
+    assert metricas == {'mape_pct': 0.0, 'rmse_rel': 0.0}
+    assert conv.dentro_de_tolerancia(metricas)
+
+
+def test_comparar_predicciones_fuera_de_tolerancia():
+    pred_keras = np.array([10.0, 20.0, 30.0])
+
+    metricas = conv.comparar_predicciones(pred_keras, pred_keras * 1.05)
+
+    assert metricas['mape_pct'] == pytest.approx(5.0)
+    assert not conv.dentro_de_tolerancia(metricas)
+
+
+def test_separar_calibracion_validacion_disjuntas():
+    ventanas = np.arange(1000 * conv.N_DIAS, dtype=np.float32).reshape(-1, conv.N_DIAS, 1)
+
+    calibracion, validacion = conv.separar_calibracion_validacion(ventanas)
+
+    assert len(calibracion) == conv.N_MUESTRAS
+    assert len(validacion) == conv.N_VALIDACION
+    assert not set(calibracion[:, 0, 0]) & set(validacion[:, 0, 0])
+
+
+def test_tflite_reproduce_keras():
+    tf = pytest.importorskip("tensorflow")
+    tf.keras.utils.set_random_seed(0)
+    modelo = tf.keras.Sequential([
+        tf.keras.Input(shape=(conv.N_DIAS, 1)),
+        tf.keras.layers.LSTM(8),
+        tf.keras.layers.Dense(1),
+    ])
+    ventanas = np.random.default_rng(0).uniform(50, 150, size=(400, conv.N_DIAS, 1)).astype(np.float32)
+    calibracion, validacion = conv.separar_calibracion_validacion(ventanas)
+
+    modelo_tflite = conv.convertir(modelo, calibracion)
+    metricas = conv.comparar_predicciones(
+        modelo.predict(validacion, verbose=0), conv.predecir_tflite(modelo_tflite, validacion)
+    )
+
+    assert conv.dentro_de_tolerancia(metricas), metricas
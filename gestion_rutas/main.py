@@ -2,12 +2,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+from .database.db import cerrar_pool
 from .routers import (
     ruta, mapa_router,
     zona_router, punto_router, camion_router, ruta_planificada_router,
     turno_router, usuario_router, punto_disposicion_router,
     lstm_router, mas_router, operador_router, bridge_router
 )
+from contextlib import asynccontextmanager
 import logging
 import os
 from pathlib import Path
@@ -16,10 +18,19 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Al apagar la aplicación, liberar el pool de conexiones a la base de datos"""
+    yield
+    cerrar_pool()
+
+
 app = FastAPI(
     title="API Gestión de Rutas VRP",
     description="API completa para optimización de rutas de entrega con VRP y predicción LSTM",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
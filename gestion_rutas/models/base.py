@@ -4,12 +4,35 @@ Define todas las tablas principales para el sistema de gestión de rutas
 """
 
 from datetime import datetime, date
-from sqlalchemy import Column, Integer, String, Float, Date, Time, DateTime, ForeignKey, Boolean, JSON, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, Time, DateTime, ForeignKey, Boolean, JSON, Enum, Index, text
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.expression import FunctionElement
 from ..database.db import Base
 import enum
 
 
+class UtcAhora(FunctionElement):
+    """
+    Hora actual en UTC y sin zona, asignada por la BD: el mismo formato que
+    datetime.utcnow en fecha_registro/fecha_creacion (now() devolvería la hora
+    local del servidor).
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(UtcAhora, "postgresql")
+def _utc_ahora_postgresql(element, compiler, **kw):
+    return "timezone('UTC', now())"
+
+
+@compiles(UtcAhora)
+def _utc_ahora(element, compiler, **kw):
+    # SQLite (fallback local): CURRENT_TIMESTAMP ya está en UTC
+    return "CURRENT_TIMESTAMP"
+
+
 class EstadoRuta(str, enum.Enum):
     """Estados posibles de una ruta"""
     PLANIFICADA = "planificada"
@@ -59,7 +82,7 @@ class Cliente(Base):
     ciudad = Column(String(100))
     estado_activo = Column(Boolean, default=True)
     fecha_registro = Column(DateTime, default=datetime.utcnow)
-    fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    fecha_actualizacion = Column(DateTime, default=UtcAhora(), onupdate=UtcAhora())  # Lo asigna la BD
 
     # Relaciones
     entregas = relationship("Entrega", back_populates="cliente", cascade="all, delete-orphan")
@@ -156,7 +179,7 @@ class Entrega(Base):
     fecha_entrega_real = Column(DateTime)
     tiempo_transito_minutos = Column(Float)
     observaciones = Column(String(1000))
-    fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    fecha_actualizacion = Column(DateTime, default=UtcAhora(), onupdate=UtcAhora())  # Lo asigna la BD
 
     # Relaciones
     cliente = relationship("Cliente", back_populates="entregas")
@@ -164,6 +187,17 @@ class Entrega(Base):
     ruta = relationship("Ruta", back_populates="entregas")
     vehiculo = relationship("Vehiculo", back_populates="entregas")
 
+    # Índices para los filtros habituales de obtener_entregas / obtener_entregas_pendientes
+    __table_args__ = (
+        Index("ix_entrega_estado_fecha", "estado", "fecha_programada"),
+        Index("ix_entrega_cliente_fecha", "id_cliente", "fecha_programada"),
+        Index("ix_entrega_ruta", "id_ruta"),
+        Index(
+            "ix_entrega_pendiente", "fecha_programada",
+            postgresql_where=text("estado = 'PENDIENTE'")
+        ),
+    )
+
     def __repr__(self):
         return f"<Entrega(id={self.id}, cliente_id={self.id_cliente}, estado={self.estado})>"
 
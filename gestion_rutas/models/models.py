@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Time, DateTime, ForeignKey, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, Time, DateTime, ForeignKey, Boolean, JSON, Index, LargeBinary
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -53,6 +53,10 @@ class Turno(Base):
     estado = Column(String)
     camion = relationship('Camion', back_populates='turnos')
     rutas = relationship('RutaPlanificada', back_populates='turno')
+    __table_args__ = (
+        Index('idx_turno_camion_fecha', id_camion, fecha.desc()),
+        Index('idx_turno_estado_fecha', estado, fecha.desc()),
+    )
 
 class RutaPlanificada(Base):
     __tablename__ = 'ruta_planificada'
@@ -64,10 +68,15 @@ class RutaPlanificada(Base):
     duracion_planificada_min = Column(Float)
     secuencia_puntos = Column(JSON)  # Lista de IDs de puntos
     geometria_json = Column(JSON)    # Geometría completa de la ruta [[lat,lon],...]
+    geometria_bin = Column(LargeBinary)  # Misma geometría empaquetada (int32 lat,lon en microgrados); tiene prioridad sobre geometria_json
     version_modelo_vrp = Column(String)
     zona = relationship('Zona', back_populates='rutas')
     turno = relationship('Turno', back_populates='rutas')
     rutas_ejecutadas = relationship('RutaEjecutada', back_populates='ruta_planificada')
+    __table_args__ = (
+        Index('idx_ruta_plan_fecha_id', fecha.desc(), id_ruta.desc()),
+        Index('idx_ruta_plan_zona_turno_fecha', id_zona, id_turno, fecha.desc(), id_ruta.desc()),
+    )
 
 class RutaEjecutada(Base):
     __tablename__ = 'ruta_ejecutada'
@@ -83,6 +92,11 @@ class RutaEjecutada(Base):
     ruta_planificada = relationship('RutaPlanificada', back_populates='rutas_ejecutadas')
     camion = relationship('Camion', back_populates='rutas_ejecutadas')
     incidencias = relationship('Incidencia', back_populates='ruta_ejecutada')
+    __table_args__ = (
+        Index('idx_ruta_exec_fecha_id', fecha.desc(), id_ruta_exec.desc()),
+        Index('idx_ruta_exec_camion_fecha', id_camion, fecha.desc()),
+        Index('idx_ruta_exec_id_ruta', id_ruta),
+    )
 
 class Incidencia(Base):
     __tablename__ = 'incidencia'
@@ -97,6 +111,9 @@ class Incidencia(Base):
     ruta_ejecutada = relationship('RutaEjecutada', back_populates='incidencias')
     zona = relationship('Zona', back_populates='incidencias')
     camion = relationship('Camion', back_populates='incidencias')
+    __table_args__ = (
+        Index('ix_incidencia_fecha_desc', fecha_hora.desc()),
+    )
 
 class PrediccionDemanda(Base):
     __tablename__ = 'prediccion_demanda'
@@ -123,12 +140,16 @@ class Operador(Base):
 
 class PuntoDisposicion(Base):
     __tablename__ = 'punto_disposicion'
-    id_punto_disp = Column(Integer, primary_key=True)
+    id_disposicion = Column(Integer, primary_key=True)  # nombre real de la columna (ver punto_disposicion_service)
     nombre = Column(String)
     tipo = Column(String)
     latitud = Column(Float)
     longitud = Column(Float)
     capacidad_diaria_ton = Column(Float)
+    __table_args__ = (
+        Index('idx_punto_disp_tipo_nombre', tipo, nombre,
+              postgresql_include=['id_disposicion', 'latitud', 'longitud', 'capacidad_diaria_ton']),
+    )
 
 class Usuario(Base):
     __tablename__ = 'usuario'
@@ -146,3 +167,7 @@ class PeriodoTemporal(Base):
     fecha_fin = Column(DateTime)
     tipo_granularidad = Column(String)
     estacionalidad = Column(String)
+    __table_args__ = (
+        Index('idx_periodo_gran_fecha', tipo_granularidad, fecha_inicio.desc()),
+        Index('idx_periodo_estac_fecha', estacionalidad, fecha_inicio.desc()),
+    )
@@ -0,0 +1,40 @@
+"""test_models.py - Pruebas de los modelos ORM (índices y marcas de tiempo)"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateIndex
+
+from gestion_rutas.crear_indices_rendimiento import INDICES
+from gestion_rutas.database.db import Base
+from gestion_rutas.models.base import Cliente, UtcAhora
+from gestion_rutas.models.models import PuntoDisposicion
+
+
+def test_indice_punto_disposicion_coincide_con_script():
+    indice, = [i for i in PuntoDisposicion.__table__.indexes if i.name == 'idx_punto_disp_tipo_nombre']
+    ddl = str(CreateIndex(indice).compile(dialect=postgresql.dialect()))
+
+    assert "INCLUDE (id_disposicion, latitud, longitud, capacidad_diaria_ton)" in ddl
+    assert any("idx_punto_disp_tipo_nombre" in sql and "INCLUDE (id_disposicion," in sql for sql in INDICES)
+
+
+def test_utc_ahora_en_postgresql():
+    assert str(UtcAhora().compile(dialect=postgresql.dialect())) == "timezone('UTC', now())"
+
+
+def test_fecha_actualizacion_en_utc():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        cliente = Cliente(nombre="Cliente", email="cliente@test.cl")
+        db.add(cliente)
+        db.commit()
+        db.refresh(cliente)
+
+        assert abs(cliente.fecha_actualizacion - datetime.utcnow()) < timedelta(minutes=1)
+        assert abs(cliente.fecha_actualizacion - cliente.fecha_registro) < timedelta(minutes=1)
+    engine.dispose()
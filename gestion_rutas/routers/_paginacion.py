@@ -0,0 +1,25 @@
+"""
+Cursores de paginación por clave (header X-Next-Cursor) compartidos por los routers
+de listados ordenados por (fecha, id) descendente
+"""
+
+import base64
+from datetime import date, datetime
+from typing import Tuple, Union
+
+from fastapi import HTTPException
+
+
+def codificar_cursor(fecha, id_fila: int) -> str:
+    """Cursor opaco (base64 de 'fecha|id') de la última fila de una página"""
+    return base64.urlsafe_b64encode(f"{fecha}|{id_fila}".encode()).decode()
+
+
+def decodificar_cursor(cursor: str, solo_fecha: bool = False) -> Tuple[Union[datetime, date], int]:
+    """(fecha, id) de un cursor de codificar_cursor; con solo_fecha la fecha es date (columnas DATE)"""
+    try:
+        fecha, id_fila = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        fecha = datetime.fromisoformat(fecha)
+        return (fecha.date() if solo_fecha else fecha), int(id_fila)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
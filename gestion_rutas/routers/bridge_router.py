@@ -14,7 +14,7 @@ from ..service.camion_service import CamionService
 from ..service.punto_service import PuntoService
 from ..service.ruta_planificada_service import RutaPlanificadaService
 from ..service.lstm_service import LSTMPredictionService
-from ..service.prediccion_mapa_service import PrediccionMapaService
+from ..service.prediccion_mapa_service import get_service
 
 # Configuración de logger
 logger = logging.getLogger(__name__)
@@ -274,7 +274,7 @@ async def init_simulation(
         fecha_dt = datetime.now()
 
     # 1. Cargar predicciones usando el servicio existente
-    servicio = PrediccionMapaService()
+    servicio = get_service()
     predicciones = servicio.generar_predicciones_completas(fecha_dt)
     
     if not predicciones:
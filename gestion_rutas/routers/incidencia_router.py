@@ -29,10 +29,14 @@ async def get_incidencias(
     id_camion: int = Query(None),
     fecha_desde: datetime = Query(None),
     fecha_hasta: datetime = Query(None),
+    con_total: bool = Query(True, description="Calcular el total de registros (false para scroll infinito)"),
 ):
-    """Obtiene una lista paginada de incidencias con filtros opcionales."""
+    """
+    Obtiene una lista paginada de incidencias con filtros opcionales.
+    `has_more` indica si hay otra página; con `con_total=false` no se cuenta y `total` es null.
+    """
     try:
-        incidencias, total = IncidenciaService.obtener_incidencias(
+        incidencias, hay_mas, total = IncidenciaService.obtener_incidencias(
             tipo=tipo,
             severidad_min=severidad_min,
             severidad_max=severidad_max,
@@ -41,9 +45,10 @@ async def get_incidencias(
             fecha_desde=fecha_desde,
             fecha_hasta=fecha_hasta,
             skip=skip,
-            limit=limit
+            limit=limit,
+            con_total=con_total
         )
-        return {"data": incidencias, "total": total, "skip": skip, "limit": limit}
+        return {"data": incidencias, "total": total, "has_more": hay_mas, "skip": skip, "limit": limit}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al listar incidencias: {str(e)}")
 
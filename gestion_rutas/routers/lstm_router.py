@@ -8,7 +8,7 @@ from fastapi.templating import Jinja2Templates
 from typing import Optional
 from datetime import datetime, timedelta
 from ..service.lstm_service import LSTMPredictionService
-from ..service.prediccion_mapa_service import PrediccionMapaService
+from ..service.prediccion_mapa_service import get_service
 import logging
 from pathlib import Path
 
@@ -139,7 +139,7 @@ def obtener_predicciones_fecha(
             fecha_prediccion = datetime.now() + timedelta(days=1)
         
         # Generar predicciones usando el servicio de mapa
-        servicio = PrediccionMapaService()
+        servicio = get_service()
         predicciones = servicio.generar_predicciones_completas(fecha_prediccion)
         
         if not predicciones or len(predicciones) == 0:
@@ -7,7 +7,7 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from datetime import datetime, timedelta
 from typing import Optional
 
-from ..service.prediccion_mapa_service import PrediccionMapaService
+from ..service.prediccion_mapa_service import get_service
 
 router = APIRouter(prefix="/mapa", tags=["Visualización LSTM"])
 
@@ -44,7 +44,7 @@ async def mapa_predicciones_lstm(
         fecha_prediccion = datetime.now() + timedelta(days=1)
     
     # Generar predicciones
-    servicio = PrediccionMapaService()
+    servicio = get_service()
     predicciones = servicio.generar_predicciones_completas(fecha_prediccion)
     
     if not predicciones:
@@ -341,7 +341,7 @@ async def predicciones_json(
         fecha_prediccion = datetime.now() + timedelta(days=1)
     
     # Generar predicciones
-    servicio = PrediccionMapaService()
+    servicio = get_service()
     predicciones = servicio.generar_predicciones_completas(fecha_prediccion)
     estadisticas = servicio.generar_estadisticas_globales(predicciones)
     
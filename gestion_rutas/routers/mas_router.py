@@ -138,11 +138,11 @@ def cargar_predicciones_lstm_csv(num_clientes: int = 50) -> List[float]:
     Usa el mismo servicio que el endpoint /api/lstm/predicciones-fecha
     """
     try:
-        from gestion_rutas.service.prediccion_mapa_service import PrediccionMapaService
+        from gestion_rutas.service.prediccion_mapa_service import get_service
         from datetime import datetime, timedelta
         
         logger.info(f" Generando predicciones LSTM para {num_clientes} puntos...")
-        servicio = PrediccionMapaService()
+        servicio = get_service()
         fecha_prediccion = datetime.now() + timedelta(days=1)
         predicciones_completas = servicio.generar_predicciones_completas(fecha_prediccion)
         
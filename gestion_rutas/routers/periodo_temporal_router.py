@@ -4,7 +4,7 @@ Endpoints para crear, listar, actualizar y eliminar periodos temporales.
 Usando PostgreSQL directo sin SQLAlchemy
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from datetime import datetime
 from typing import Optional
 
@@ -14,6 +14,7 @@ from ..schemas.schemas import (
     PeriodoTemporalResponse
 )
 from ..service.periodo_temporal_service import PeriodoTemporalService
+from ._paginacion import codificar_cursor, decodificar_cursor
 
 router = APIRouter(prefix="/periodos-temporales", tags=["Periodos Temporales"])
 
@@ -27,10 +28,13 @@ periodo_service = PeriodoTemporalService()
     description="Retorna una lista paginada de periodos temporales"
 )
 async def get_periodos_temporales(
+    response: Response,
     skip: int = Query(0, ge=0, description="Número de registros a saltar"),
     limit: int = Query(10, ge=1, le=100, description="Número máximo de registros a retornar"),
     tipo_granularidad: Optional[str] = Query(None, description="Filtrar por granularidad (diario, semanal, mensual, anual)"),
     estacionalidad: Optional[str] = Query(None, description="Filtrar por estacionalidad (verano, invierno, primavera, otoño, general)"),
+    con_total: bool = Query(True, description="Calcular el total de registros (false para scroll infinito)"),
+    cursor: Optional[str] = Query(None, description="Header X-Next-Cursor de la página anterior (reemplaza a skip)"),
 ):
     """
     Obtiene una lista paginada de periodos temporales con filtros opcionales.
@@ -38,14 +42,23 @@ async def get_periodos_temporales(
     **Parámetros de filtrado:**
     - `tipo_granularidad`: Filtra por granularidad temporal (diario, semanal, mensual, anual)
     - `estacionalidad`: Filtra por estacionalidad (verano, invierno, primavera, otoño, general)
+    - `cursor`: Valor del header `X-Next-Cursor` de la página anterior; pagina por
+      (fecha_inicio, id_periodo) en lugar de `skip`, con costo constante en páginas profundas
     
     **Ejemplo de uso:**
     ```
     GET /periodos-temporales/?skip=0&limit=10&tipo_granularidad=mensual
     ```
     """
+    cursor_fecha, cursor_id = decodificar_cursor(cursor) if cursor else (None, None)
     try:
-        periodos, total = periodo_service.obtener_periodos(tipo_granularidad, estacionalidad, skip, limit)
+        periodos, total = periodo_service.obtener_periodos(
+            tipo_granularidad, estacionalidad, skip, limit,
+            cursor_fecha=cursor_fecha, cursor_id=cursor_id, con_total=con_total
+        )
+        if len(periodos) == limit:
+            ultimo = periodos[-1]
+            response.headers["X-Next-Cursor"] = codificar_cursor(ultimo['fecha_inicio'], ultimo['id_periodo'])
         return {
             "data": periodos,
             "total": total,
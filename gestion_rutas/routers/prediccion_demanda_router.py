@@ -4,9 +4,9 @@ Endpoints para crear, listar, actualizar y eliminar predicciones de demanda LSTM
 Usando PostgreSQL directo sin SQLAlchemy
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from ..schemas.schemas import (
     PrediccionDemandaCreate,
@@ -14,6 +14,7 @@ from ..schemas.schemas import (
     PrediccionDemandaResponse
 )
 from ..service.prediccion_demanda_service import PrediccionDemandaService
+from ._paginacion import codificar_cursor, decodificar_cursor
 
 router = APIRouter(prefix="/predicciones-demanda", tags=["Predicciones de Demanda"])
 
@@ -27,6 +28,7 @@ prediccion_service = PrediccionDemandaService()
     description="Retorna una lista paginada de predicciones LSTM con opciones de filtrado"
 )
 async def get_predicciones_demanda(
+    response: Response,
     skip: int = Query(0, ge=0, description="Número de registros a saltar"),
     limit: int = Query(10, ge=1, le=100, description="Número máximo de registros a retornar"),
     id_zona: Optional[int] = Query(None, description="Filtrar por ID de zona"),
@@ -34,6 +36,8 @@ async def get_predicciones_demanda(
     fecha_desde: Optional[datetime] = Query(None, description="Filtrar desde esta fecha"),
     fecha_hasta: Optional[datetime] = Query(None, description="Filtrar hasta esta fecha"),
     modelo_version: Optional[str] = Query(None, description="Filtrar por versión del modelo LSTM"),
+    con_total: bool = Query(True, description="Calcular el total de registros (false para scroll infinito)"),
+    cursor: Optional[str] = Query(None, description="Header X-Next-Cursor de la página anterior (reemplaza a skip)"),
 ):
     """
     Obtiene una lista paginada de predicciones de demanda con filtros opcionales.
@@ -44,12 +48,15 @@ async def get_predicciones_demanda(
     - `fecha_desde`: Filtra predicciones desde una fecha específica
     - `fecha_hasta`: Filtra predicciones hasta una fecha específica
     - `modelo_version`: Filtra por versión del modelo LSTM
+    - `cursor`: Valor del header `X-Next-Cursor` de la página anterior; pagina por
+      (fecha_prediccion, id_prediccion) en lugar de `skip`, con costo constante en páginas profundas
     
     **Ejemplo de uso:**
     ```
     GET /predicciones-demanda/?skip=0&limit=10&id_zona=1&horizonte_horas=24
     ```
     """
+    cursor_fecha, cursor_id = decodificar_cursor(cursor) if cursor else (None, None)
     try:
         predicciones, total = prediccion_service.obtener_predicciones(
             id_zona=id_zona,
@@ -58,8 +65,14 @@ async def get_predicciones_demanda(
             fecha_hasta=fecha_hasta,
             modelo_version=modelo_version,
             skip=skip,
-            limit=limit
+            limit=limit,
+            cursor_fecha=cursor_fecha,
+            cursor_id=cursor_id,
+            con_total=con_total
         )
+        if len(predicciones) == limit:
+            ultima = predicciones[-1]
+            response.headers["X-Next-Cursor"] = codificar_cursor(ultima['fecha_prediccion'], ultima['id_prediccion'])
         return {
             "data": predicciones,
             "total": total,
@@ -133,6 +146,29 @@ async def create_prediccion_demanda(prediccion: PrediccionDemandaCreate):
         raise HTTPException(status_code=500, detail=f"Error al crear predicción: {str(e)}")
 
 
+@router.post(
+    "/lote",
+    response_model=dict,
+    status_code=201,
+    summary="Crear predicciones de demanda en lote",
+    description="Inserta varias predicciones LSTM en una sola operación"
+)
+async def create_predicciones_demanda_lote(predicciones: List[PrediccionDemandaCreate]):
+    """
+    Crea varias predicciones de demanda con un único INSERT masivo.
+    
+    **Ejemplo de uso:**
+    ```
+    POST /predicciones-demanda/lote
+    ```
+    """
+    try:
+        creadas = prediccion_service.crear_predicciones_bulk([p.dict() for p in predicciones])
+        return {"total": len(predicciones), "data": creadas}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al crear predicciones: {str(e)}")
+
+
 @router.put(
     "/{prediccion_id}",
     response_model=PrediccionDemandaResponse,
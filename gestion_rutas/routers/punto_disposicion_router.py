@@ -5,7 +5,7 @@ Usando PostgreSQL directo sin SQLAlchemy
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from typing import List, Optional
 
 from ..schemas.schemas import (
     PuntoDisposicionCreate,
@@ -115,6 +115,29 @@ async def create_punto_disposicion(punto: PuntoDisposicionCreate):
         raise HTTPException(status_code=500, detail=f"Error al crear punto de disposición: {str(e)}")
 
 
+@router.post(
+    "/lote",
+    response_model=dict,
+    status_code=201,
+    summary="Crear puntos de disposición en lote",
+    description="Inserta varios puntos de disposición en una sola operación"
+)
+async def create_puntos_disposicion_lote(puntos: List[PuntoDisposicionCreate]):
+    """
+    Crea varios puntos de disposición con un único INSERT masivo.
+    
+    **Ejemplo de uso:**
+    ```
+    POST /puntos-disposicion/lote
+    ```
+    """
+    try:
+        creados = punto_disposicion_service.crear_puntos_bulk([p.dict() for p in puntos])
+        return {"total": len(puntos), "data": creados}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al crear puntos de disposición: {str(e)}")
+
+
 @router.put(
     "/{punto_id}",
     response_model=PuntoDisposicionResponse,
@@ -5,12 +5,13 @@ Endpoints CRUD completos para la tabla RutaPlanificada
 Usando PostgreSQL directo sin SQLAlchemy
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional
 from datetime import date
 
 from ..schemas.schemas import RutaPlanificadaCreate, RutaPlanificadaUpdate, RutaPlanificadaResponse
 from ..service.ruta_planificada_service import RutaPlanificadaService
+from ._paginacion import codificar_cursor, decodificar_cursor
 
 router = APIRouter(
     prefix="/rutas-planificadas",
@@ -22,12 +23,14 @@ ruta_service = RutaPlanificadaService()
 
 @router.get("/", response_model=List[RutaPlanificadaResponse], summary="Obtener todas las rutas planificadas")
 def get_rutas_planificadas(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     zona_id: Optional[int] = None,
     turno_id: Optional[int] = None,
     fecha_desde: Optional[date] = None,
     fecha_hasta: Optional[date] = None,
+    cursor: Optional[str] = None,
 ):
     """
     Obtiene todas las rutas planificadas con paginación y filtros.
@@ -39,7 +42,10 @@ def get_rutas_planificadas(
     - `turno_id`: Filtrar por turno
     - `fecha_desde`: Filtrar por fecha inicial (YYYY-MM-DD)
     - `fecha_hasta`: Filtrar por fecha final (YYYY-MM-DD)
+    - `cursor`: Valor del header `X-Next-Cursor` de la página anterior; pagina por
+      (fecha, id_ruta) en lugar de `skip`, con costo constante en páginas profundas
     """
+    cursor_fecha, cursor_id = decodificar_cursor(cursor, solo_fecha=True) if cursor else (None, None)
     try:
         rutas, total = ruta_service.obtener_rutas(
             zona_id=zona_id,
@@ -47,8 +53,13 @@ def get_rutas_planificadas(
             fecha_desde=fecha_desde,
             fecha_hasta=fecha_hasta,
             skip=skip,
-            limit=limit
+            limit=limit,
+            cursor_fecha=cursor_fecha,
+            cursor_id=cursor_id
         )
+        if len(rutas) == limit:
+            ultima = rutas[-1]
+            response.headers["X-Next-Cursor"] = codificar_cursor(ultima['fecha'], ultima['id_ruta'])
         return rutas
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -91,11 +102,40 @@ def create_ruta_planificada(ruta: RutaPlanificadaCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/lote", response_model=dict, status_code=201, summary="Crear rutas planificadas en lote")
+def create_rutas_planificadas_lote(rutas: List[RutaPlanificadaCreate]):
+    """
+    Crea varias rutas planificadas (p. ej. todas las de una corrida VRP) con un
+    único INSERT masivo. Mismos campos que `POST /rutas-planificadas/`.
+    """
+    try:
+        creadas = ruta_service.crear_rutas_batch([
+            {
+                "id_zona": ruta.id_zona,
+                "id_turno": ruta.id_turno,
+                "fecha": ruta.fecha,
+                "secuencia_puntos": ruta.secuencia_puntos,
+                "distancia_km": ruta.distancia_km,
+                "duracion_min": ruta.tiempo_estimado_min,
+                "version_vrp": ruta.version_modelo_vrp,
+                "geometria_json": ruta.geometria_json,
+            }
+            for ruta in rutas
+        ])
+        return {"total": len(rutas), "data": creadas}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.put("/{ruta_id}", response_model=RutaPlanificadaResponse, summary="Actualizar ruta planificada")
 def update_ruta_planificada(ruta_id: int, ruta: RutaPlanificadaUpdate):
-    """Actualiza una ruta planificada existente."""
+    """
+    Actualiza una ruta planificada existente.
+    Los campos omitidos se conservan y un `null` explícito limpia el campo.
+    `id_camion` y `estado` no son columnas de la ruta planificada: enviarlos responde 422.
+    """
     try:
-        datos = {k: v for k, v in ruta.dict().items() if v is not None}
+        datos = ruta.dict(exclude_unset=True)
         if not datos:
             raise HTTPException(status_code=400, detail="No hay campos para actualizar")
         
@@ -103,6 +143,10 @@ def update_ruta_planificada(ruta_id: int, ruta: RutaPlanificadaUpdate):
         if not ruta_actualizada:
             raise HTTPException(status_code=404, detail=f"Ruta con ID {ruta_id} no encontrada")
         return ruta_actualizada
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
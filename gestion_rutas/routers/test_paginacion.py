@@ -0,0 +1,23 @@
+"""test_paginacion.py - Cursores X-Next-Cursor compartidos por los routers"""
+
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+
+from gestion_rutas.routers._paginacion import codificar_cursor, decodificar_cursor
+
+
+def test_cursor_ida_y_vuelta():
+    cursor = codificar_cursor(datetime(2024, 1, 2, 8, 30), 17)
+
+    assert decodificar_cursor(cursor) == (datetime(2024, 1, 2, 8, 30), 17)
+    assert decodificar_cursor(cursor, solo_fecha=True) == (date(2024, 1, 2), 17)
+    assert decodificar_cursor(codificar_cursor(date(2024, 1, 2), 5), solo_fecha=True) == (date(2024, 1, 2), 5)
+
+
+def test_cursor_invalido_es_400():
+    with pytest.raises(HTTPException) as error:
+        decodificar_cursor("no-es-un-cursor")
+
+    assert error.value.status_code == 400
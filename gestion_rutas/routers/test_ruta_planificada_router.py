@@ -0,0 +1,54 @@
+"""test_ruta_planificada_router.py - PUT /rutas-planificadas/{id} sobre SQLite temporal"""
+
+from datetime import date
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from gestion_rutas.database.db import execute_insert_update_delete, execute_query_one
+from gestion_rutas.routers import ruta_planificada_router
+from gestion_rutas.schemas.schemas import RutaPlanificadaUpdate
+
+
+@pytest.fixture
+def cliente(sqlite_engine):
+    app = FastAPI()
+    app.include_router(ruta_planificada_router.router)
+    execute_insert_update_delete(
+        "INSERT INTO ruta_planificada (id_ruta, id_zona, id_turno, fecha, secuencia_puntos, "
+        "distancia_planificada_km, duracion_planificada_min) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        (1, 1, 1, date(2024, 1, 1), "[1, 2]", 5.0, 20)
+    )
+    return TestClient(app)
+
+
+def test_put_traduce_los_nombres_del_schema(cliente):
+    # En SQLite el RETURNING solo trae el id (no pasaría response_model): se llama al endpoint
+    ruta_planificada_router.update_ruta_planificada(
+        1, RutaPlanificadaUpdate(distancia_km=12.5, tiempo_estimado_min=30)
+    )
+
+    fila = execute_query_one(
+        "SELECT distancia_planificada_km, duracion_planificada_min, secuencia_puntos FROM ruta_planificada WHERE id_ruta = %s",
+        (1,)
+    )
+    assert fila["distancia_planificada_km"] == 12.5
+    assert fila["duracion_planificada_min"] == 30
+    assert fila["secuencia_puntos"] == "[1, 2]"
+
+
+def test_put_campo_sin_columna_es_422(cliente):
+    respuesta = cliente.put("/rutas-planificadas/1", json={"estado": "completada", "id_camion": 3})
+
+    assert respuesta.status_code == 422
+    assert "estado" in respuesta.json()["detail"]
+
+
+def test_put_ruta_inexistente_es_404(cliente):
+    respuesta = cliente.put("/rutas-planificadas/99", json={"distancia_km": 1.0})
+
+    assert respuesta.status_code == 404
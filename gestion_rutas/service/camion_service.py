@@ -4,11 +4,15 @@ Service Layer para Camiones (Vehículos) - PostgreSQL Directo
 
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete, misma_conexion
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Límite por bloque de consultas de métricas (SET LOCAL, solo PostgreSQL): un camión con
+# mucho historial no debe retener la conexión del pool indefinidamente
+STATEMENT_TIMEOUT_MS = 2000
+
 
 class CamionService:
     """Servicio para operaciones con Camiones - PostgreSQL Directo"""
@@ -113,11 +117,16 @@ class CamionService:
     @staticmethod
     def calcular_metricas_camion(camion_id: int) -> Dict[str, Any]:
         """Calcular métricas de desempeño del camión"""
-        camion = CamionService.obtener_camion(camion_id)
-        if not camion:
-            return {}
-
-        rutas = CamionService.obtener_rutas_ejecutadas_camion(camion_id)
+        # Camión y rutas con una sola conexión del pool
+        with misma_conexion(statement_timeout_ms=STATEMENT_TIMEOUT_MS) as db:
+            camion = db.una("SELECT * FROM camion WHERE id_camion = %s", (camion_id,))
+            if not camion:
+                return {}
+            rutas = db.todas(
+                "SELECT distancia_real_km, duracion_real_min, cumplimiento_horario_pct "
+                "FROM ruta_ejecutada WHERE id_camion = %s",
+                (camion_id,)
+            )
         
         metricas = {
             "camion_id": camion_id,
@@ -158,10 +167,11 @@ class CamionService:
         fecha_limite = date.today() - timedelta(days=dias)
         
         query = "SELECT * FROM ruta_ejecutada WHERE id_camion = %s AND fecha >= %s ORDER BY fecha DESC"
-        rutas = execute_query(query, (camion_id, fecha_limite))
-
-        if not rutas:
-            return {"camion_id": camion_id, "carga_promedio": 0}
+        with misma_conexion(statement_timeout_ms=STATEMENT_TIMEOUT_MS) as db:
+            rutas = db.todas(query, (camion_id, fecha_limite))
+            if not rutas:
+                return {"camion_id": camion_id, "carga_promedio": 0}
+            camion = db.una("SELECT * FROM camion WHERE id_camion = %s", (camion_id,))
 
         # Nota: se asume que telemetria_json es JSON en PostgreSQL
         # Si está como string, necesitarías parsearlo
@@ -176,7 +186,6 @@ class CamionService:
             except:
                 cargas.append(0)
         
-        camion = CamionService.obtener_camion(camion_id)
         capacidad = camion.get('capacidad_kg', 1) if camion else 1
         
         return {
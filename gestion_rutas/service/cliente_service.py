@@ -2,15 +2,33 @@
 Service Layer para Clientes
 """
 
-from sqlalchemy.orm import Session
+from cachetools import TTLCache
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session, raiseload
 from typing import List, Optional
-from datetime import datetime
-from ..models.base import Cliente
+from ..models.base import Cliente, UtcAhora
 from ..schemas.schemas import ClienteCreate, ClienteUpdate
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# ClienteResponse no incluye las entregas: no se cargan. En depuración
+# (DEBUG_LAZY_LOAD=1) cualquier acceso lazy no previsto lanza excepción
+_CARGA_CLIENTE = [raiseload("*")] if os.getenv("DEBUG_LAZY_LOAD") == "1" else []
+
+# Cache email -> id para la búsqueda por email (ruta de login/lookup).
+# Se guardan ids y no instancias ORM, que pertenecen a una sesión concreta.
+_cache_email = TTLCache(maxsize=1024, ttl=60)
+_cache_lock = threading.Lock()
+
+
+def _invalidar_email(email: Optional[str]) -> None:
+    if email:
+        with _cache_lock:
+            _cache_email.pop(email, None)
+
 
 class ClienteService:
     """Servicio para operaciones con Clientes"""
@@ -31,6 +49,7 @@ class ClienteService:
             db.add(nuevo_cliente)
             db.commit()
             db.refresh(nuevo_cliente)
+            _invalidar_email(nuevo_cliente.email)
             logger.info(f"Cliente {nuevo_cliente.id} creado: {nuevo_cliente.email}")
             return nuevo_cliente
         except Exception as e:
@@ -41,12 +60,25 @@ class ClienteService:
     @staticmethod
     def obtener_cliente(db: Session, cliente_id: int) -> Optional[Cliente]:
         """Obtener cliente por ID"""
-        return db.query(Cliente).filter(Cliente.id == cliente_id).first()
+        return db.get(Cliente, cliente_id, options=_CARGA_CLIENTE)
 
     @staticmethod
     def obtener_cliente_por_email(db: Session, email: str) -> Optional[Cliente]:
         """Obtener cliente por email"""
-        return db.query(Cliente).filter(Cliente.email == email).first()
+        with _cache_lock:
+            cliente_id = _cache_email.get(email)
+        if cliente_id is not None:
+            cliente = db.get(Cliente, cliente_id)
+            # El email pudo cambiar desde que se cacheó
+            if cliente and cliente.email == email:
+                return cliente
+
+        # email tiene índice único: a lo sumo una fila
+        cliente = db.scalars(select(Cliente).where(Cliente.email == email)).one_or_none()
+        if cliente:
+            with _cache_lock:
+                _cache_email[email] = cliente.id
+        return cliente
 
     @staticmethod
     def obtener_clientes(
@@ -65,23 +97,28 @@ class ClienteService:
             query = query.filter(Cliente.ciudad.ilike(f"%{ciudad}%"))
 
         total = query.count()
-        clientes = query.offset(skip).limit(limit).all()
+        clientes = query.options(*_CARGA_CLIENTE).offset(skip).limit(limit).all()
         return clientes, total
 
     @staticmethod
     def actualizar_cliente(db: Session, cliente_id: int, cliente_data: ClienteUpdate) -> Optional[Cliente]:
         """Actualizar cliente existente"""
         try:
-            cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+            datos = cliente_data.model_dump(exclude_unset=True)
+            # Un solo UPDATE ... RETURNING: si no devuelve fila, el cliente no existe
+            stmt = (
+                update(Cliente)
+                .where(Cliente.id == cliente_id)
+                .values(**datos, fecha_actualizacion=UtcAhora())
+                .returning(Cliente)
+            )
+            cliente = db.execute(stmt).scalar_one_or_none()
             if not cliente:
+                db.rollback()
                 return None
 
-            for campo, valor in cliente_data.dict(exclude_unset=True).items():
-                setattr(cliente, campo, valor)
-
-            cliente.fecha_actualizacion = datetime.utcnow()
             db.commit()
-            db.refresh(cliente)
+            _invalidar_email(cliente.email)
             logger.info(f"Cliente {cliente_id} actualizado")
             return cliente
         except Exception as e:
@@ -93,14 +130,19 @@ class ClienteService:
     def desactivar_cliente(db: Session, cliente_id: int) -> Optional[Cliente]:
         """Desactivar cliente (soft delete)"""
         try:
-            cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+            stmt = (
+                update(Cliente)
+                .where(Cliente.id == cliente_id)
+                .values(estado_activo=False)
+                .returning(Cliente)
+            )
+            cliente = db.execute(stmt).scalar_one_or_none()
             if not cliente:
+                db.rollback()
                 return None
 
-            cliente.estado_activo = False
-            cliente.fecha_actualizacion = datetime.utcnow()
             db.commit()
-            db.refresh(cliente)
+            _invalidar_email(cliente.email)
             logger.info(f"Cliente {cliente_id} desactivado")
             return cliente
         except Exception as e:
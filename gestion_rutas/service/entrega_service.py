@@ -2,15 +2,22 @@
 Service Layer para Entregas
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.orm import Session, raiseload
 from typing import List, Optional
-from datetime import datetime, date
-from ..models.base import Entrega, EstadoEntrega
+from datetime import date
+from ..models.base import Entrega, EstadoEntrega, UtcAhora
 from ..schemas.schemas import EntregaCreate, EntregaUpdate
 import logging
+import os
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# EntregaResponse solo usa columnas propias: cliente y punto no se cargan. En
+# depuración (DEBUG_LAZY_LOAD=1) cualquier acceso lazy no previsto lanza excepción
+_CARGA_ENTREGA = [raiseload("*")] if os.getenv("DEBUG_LAZY_LOAD") == "1" else []
+
 
 class EntregaService:
     """Servicio para operaciones con Entregas"""
@@ -45,7 +52,7 @@ class EntregaService:
     @staticmethod
     def obtener_entrega(db: Session, entrega_id: int) -> Optional[Entrega]:
         """Obtener entrega por ID"""
-        return db.query(Entrega).filter(Entrega.id == entrega_id).first()
+        return db.get(Entrega, entrega_id, options=_CARGA_ENTREGA)
 
     @staticmethod
     def obtener_entregas(
@@ -73,23 +80,27 @@ class EntregaService:
             query = query.filter(Entrega.fecha_programada <= fecha_hasta)
 
         total = query.count()
-        entregas = query.offset(skip).limit(limit).all()
+        entregas = query.options(*_CARGA_ENTREGA).offset(skip).limit(limit).all()
         return entregas, total
 
     @staticmethod
     def actualizar_entrega(db: Session, entrega_id: int, entrega_data: EntregaUpdate) -> Optional[Entrega]:
         """Actualizar entrega"""
         try:
-            entrega = db.query(Entrega).filter(Entrega.id == entrega_id).first()
+            datos = entrega_data.model_dump(exclude_unset=True)
+            # Un solo UPDATE ... RETURNING: si no devuelve fila, la entrega no existe
+            stmt = (
+                update(Entrega)
+                .where(Entrega.id == entrega_id)
+                .values(**datos, fecha_actualizacion=UtcAhora())
+                .returning(Entrega)
+            )
+            entrega = db.execute(stmt).scalar_one_or_none()
             if not entrega:
+                db.rollback()
                 return None
 
-            for campo, valor in entrega_data.dict(exclude_unset=True).items():
-                setattr(entrega, campo, valor)
-
-            entrega.fecha_actualizacion = datetime.utcnow()
             db.commit()
-            db.refresh(entrega)
             logger.info(f"Entrega {entrega_id} actualizada")
             return entrega
         except Exception as e:
@@ -105,18 +116,22 @@ class EntregaService:
     ) -> Optional[Entrega]:
         """Cambiar estado de una entrega"""
         try:
-            entrega = db.query(Entrega).filter(Entrega.id == entrega_id).first()
+            valores = {"estado": nuevo_estado}
+            if nuevo_estado == EstadoEntrega.ENTREGADA:
+                valores["fecha_entrega_real"] = UtcAhora()
+
+            stmt = (
+                update(Entrega)
+                .where(Entrega.id == entrega_id)
+                .values(**valores)
+                .returning(Entrega)
+            )
+            entrega = db.execute(stmt).scalar_one_or_none()
             if not entrega:
+                db.rollback()
                 return None
 
-            entrega.estado = nuevo_estado
-            
-            if nuevo_estado == EstadoEntrega.ENTREGADA:
-                entrega.fecha_entrega_real = datetime.utcnow()
-
-            entrega.fecha_actualizacion = datetime.utcnow()
             db.commit()
-            db.refresh(entrega)
             logger.info(f"Entrega {entrega_id} cambió a estado {nuevo_estado}")
             return entrega
         except Exception as e:
@@ -127,7 +142,7 @@ class EntregaService:
     @staticmethod
     def obtener_entregas_pendientes(db: Session, cliente_id: Optional[int] = None) -> List[Entrega]:
         """Obtener entregas pendientes"""
-        query = db.query(Entrega).filter(Entrega.estado == EstadoEntrega.PENDIENTE)
+        query = db.query(Entrega).options(*_CARGA_ENTREGA).filter(Entrega.estado == EstadoEntrega.PENDIENTE)
         
         if cliente_id:
             query = query.filter(Entrega.id_cliente == cliente_id)
@@ -137,7 +152,7 @@ class EntregaService:
     @staticmethod
     def obtener_entregas_por_ruta(db: Session, ruta_id: int) -> List[Entrega]:
         """Obtener todas las entregas de una ruta"""
-        return db.query(Entrega).filter(Entrega.id_ruta == ruta_id).all()
+        return db.query(Entrega).options(*_CARGA_ENTREGA).filter(Entrega.id_ruta == ruta_id).all()
 
     @staticmethod
     def asignar_entrega_a_ruta(
@@ -147,15 +162,21 @@ class EntregaService:
     ) -> Optional[Entrega]:
         """Asignar una entrega a una ruta"""
         try:
-            entrega = db.query(Entrega).filter(Entrega.id == entrega_id).first()
+            stmt = (
+                update(Entrega)
+                .where(Entrega.id == entrega_id)
+                .values(
+                    id_ruta=ruta_id,
+                    estado=EstadoEntrega.EN_TRANSITO
+                )
+                .returning(Entrega)
+            )
+            entrega = db.execute(stmt).scalar_one_or_none()
             if not entrega:
+                db.rollback()
                 return None
 
-            entrega.id_ruta = ruta_id
-            entrega.estado = EstadoEntrega.EN_TRANSITO
-            entrega.fecha_actualizacion = datetime.utcnow()
             db.commit()
-            db.refresh(entrega)
             logger.info(f"Entrega {entrega_id} asignada a ruta {ruta_id}")
             return entrega
         except Exception as e:
@@ -170,7 +191,7 @@ class EntregaService:
         prioridad: int = 3
     ) -> List[Entrega]:
         """Obtener entregas de alta prioridad para una fecha"""
-        return db.query(Entrega).filter(
+        return db.query(Entrega).options(*_CARGA_ENTREGA).filter(
             Entrega.fecha_programada == fecha,
             Entrega.prioridad >= prioridad,
             Entrega.estado == EstadoEntrega.PENDIENTE
@@ -179,4 +200,5 @@ class EntregaService:
     @staticmethod
     def calcular_peso_entregas(entregas: List[Entrega]) -> float:
         """Calcular peso total de una lista de entregas"""
-        return sum(e.peso_kg for e in entregas)
+        pesos = np.fromiter((e.peso_kg for e in entregas), dtype=np.float64, count=len(entregas))
+        return float(pesos.sum())
@@ -4,7 +4,7 @@ Service Layer para Incidencias - PostgreSQL Directo
 
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from ..database.db import execute_query, execute_query_one, execute_insert_returning, separar_total
 import logging
 
 logger = logging.getLogger(__name__)
@@ -54,9 +54,14 @@ class IncidenciaService:
         fecha_desde: Optional[datetime] = None,
         fecha_hasta: Optional[datetime] = None,
         skip: int = 0,
-        limit: int = 10
-    ) -> tuple[List[Dict], int]:
-        """Obtener incidencias con filtros"""
+        limit: int = 10,
+        con_total: bool = False
+    ) -> tuple[List[Dict], bool, Optional[int]]:
+        """
+        Obtener incidencias con filtros.
+        Retorna (incidencias, hay_mas, total): hay_mas sale de pedir una fila extra;
+        el total solo se cuenta con con_total=True (si no, es None).
+        """
         conditions = []
         params = []
         
@@ -84,15 +89,20 @@ class IncidenciaService:
         
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
         
-        params.extend([skip, limit])
-        query = f"SELECT * FROM incidencia{where_clause} ORDER BY fecha_hora DESC OFFSET %s LIMIT %s"
-        incidencias = execute_query(query, tuple(params))
-        
-        count_query = f"SELECT COUNT(*) as total FROM incidencia{where_clause}"
-        count_result = execute_query_one(count_query, tuple(params[:-2]) if conditions else ())
-        total = count_result['total'] if count_result else 0
-        
-        return incidencias, total
+        params.extend([skip, limit + 1])
+        total = None
+        if con_total:
+            query = f"SELECT *, COUNT(*) OVER() AS total FROM incidencia{where_clause} ORDER BY fecha_hora DESC OFFSET %s LIMIT %s"
+            conteo = f"SELECT COUNT(*) AS total FROM incidencia{where_clause}"
+            incidencias, total = separar_total(
+                execute_query(query, tuple(params)), skip=skip, consulta_conteo=conteo, params_conteo=tuple(params[:-2])
+            )
+        else:
+            query = f"SELECT * FROM incidencia{where_clause} ORDER BY fecha_hora DESC OFFSET %s LIMIT %s"
+            incidencias = execute_query(query, tuple(params))
+
+        hay_mas = len(incidencias) > limit
+        return incidencias[:limit], hay_mas, total
 
     @staticmethod
     def actualizar_incidencia(incidencia_id: int, datos: Dict[str, Any]) -> Optional[Dict]:
@@ -114,9 +124,9 @@ class IncidenciaService:
     @staticmethod
     def eliminar_incidencia(incidencia_id: int) -> bool:
         """Eliminar una incidencia"""
-        query = "DELETE FROM incidencia WHERE id_incidencia = %s"
-        resultado = execute_insert_update_delete(query, (incidencia_id,))
-        return resultado > 0
+        query = "DELETE FROM incidencia WHERE id_incidencia = %s RETURNING id_incidencia"
+        resultado = execute_insert_returning(query, (incidencia_id,))
+        return resultado is not None
 
     @staticmethod
     def obtener_incidencias_criticas() -> List[Dict]:
@@ -6,14 +6,26 @@ Integra el modelo LSTM con el backend FastAPI
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
+import bisect
 import json
+import importlib.util
 import logging
+from functools import lru_cache
 from pathlib import Path
 import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# pyarrow parsea el CSV en paralelo; si no está instalado se usa el motor C
+_CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+
+# Umbrales de calidad: MAPE < 15 excelente, < 25 buena; R² > 0.8 excelente, > 0.6 buena
+_MAPE_UMBRALES = (15, 25)
+_MAPE_ETIQUETAS = ("excelente", "buena", "regular")
+_R2_UMBRALES = (0.6, 0.8)
+_R2_ETIQUETAS = ("regular", "buena", "excelente")
+
 
 class LSTMPredictionService:
     """Servicio para predicciones y validación LSTM"""
@@ -29,7 +41,13 @@ class LSTMPredictionService:
                 logger.warning(f"Archivo no encontrado: {LSTMPredictionService.PREDICCIONES_CSV}")
                 return None
             
-            df = pd.read_csv(LSTMPredictionService.PREDICCIONES_CSV)
+            # float32 basta para MAPE/R²; los escalares de salida se convierten a float
+            df = pd.read_csv(
+                LSTMPredictionService.PREDICCIONES_CSV,
+                usecols=['Real', 'Predicho'],
+                dtype={'Real': 'float32', 'Predicho': 'float32'},
+                engine=_CSV_ENGINE
+            )
             logger.info(f" Predicciones cargadas: {len(df)} registros")
             return df
         except Exception as e:
@@ -89,9 +107,10 @@ class LSTMPredictionService:
     @staticmethod
     def _evaluar_calidad(mape: float, r2: float) -> Dict[str, Any]:
         """Evaluar calidad del modelo basado en MAPE y R²"""
+        # bisect_right para "<" estricto en MAPE, bisect_left para ">" estricto en R²
         evaluacion = {
-            "mape_calidad": "excelente" if mape < 15 else "buena" if mape < 25 else "regular",
-            "r2_calidad": "excelente" if r2 > 0.8 else "buena" if r2 > 0.6 else "regular",
+            "mape_calidad": _MAPE_ETIQUETAS[bisect.bisect_right(_MAPE_UMBRALES, mape)],
+            "r2_calidad": _R2_ETIQUETAS[bisect.bisect_left(_R2_UMBRALES, r2)],
         }
 
         # Calidad general
@@ -148,15 +167,10 @@ class LSTMPredictionService:
         (En producción, esto usaría el modelo LSTM real)
         """
         try:
-            # Para ahora, retornar una predicción basada en las predicciones cargadas
-            df = LSTMPredictionService.cargar_predicciones_csv()
-            
-            if df is not None and not df.empty:
-                # Seleccionar una predicción aleatoria como ejemplo
-                idx = hash(f"{tipo_zona}_{hora_del_dia}_{dia_semana}") % len(df)
-                prediccion = float(df.iloc[idx]['Predicho'])
-            else:
-                # Predicción por defecto
+            try:
+                prediccion = LSTMPredictionService._predecir_demanda_impl(tipo_zona, hora_del_dia, dia_semana)
+            except LookupError:
+                # Predicción por defecto (no se cachea: el CSV puede aparecer después)
                 prediccion = 0.5
 
             return {
@@ -176,6 +190,22 @@ class LSTMPredictionService:
             logger.error(f"Error al predecir demanda: {str(e)}")
             return {"error": str(e)}
 
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _predecir_demanda_impl(tipo_zona: str, hora_del_dia: int, dia_semana: int) -> float:
+        """
+        Predicción para una clave (tipo_zona, hora, día); pura en sus argumentos,
+        por eso se memoiza. Lanza LookupError si no hay predicciones cargadas.
+        """
+        # Para ahora, retornar una predicción basada en las predicciones cargadas
+        df = LSTMPredictionService.cargar_predicciones_csv()
+        if df is None or df.empty:
+            raise LookupError("No hay predicciones disponibles")
+
+        # Seleccionar una predicción aleatoria como ejemplo
+        idx = hash(f"{tipo_zona}_{hora_del_dia}_{dia_semana}") % len(df)
+        return float(df.iloc[idx]['Predicho'])
+
     @staticmethod
     def obtener_reporte_validacion() -> Dict[str, Any]:
         """Obtener reporte completo de validación del modelo"""
@@ -3,11 +3,26 @@ Service Layer para Operadores - PostgreSQL Directo
 """
 
 from typing import List, Optional, Dict, Any
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from cachetools import TTLCache
+from ..database.db import execute_query, execute_query_one, execute_insert_returning
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Cache de lookups por email (ruta de login). Se invalida en cada escritura.
+_cache_email = TTLCache(maxsize=1024, ttl=60)
+_cache_lock = threading.Lock()
+
+
+def _invalidar_cache(email: Optional[str] = None) -> None:
+    """Invalida un email concreto, o todo el cache si no se conoce el email previo"""
+    with _cache_lock:
+        if email:
+            _cache_email.pop(email, None)
+        else:
+            _cache_email.clear()
+
 class OperadorService:
     """Servicio para operaciones con Operadores - PostgreSQL Directo"""
 
@@ -28,6 +43,7 @@ class OperadorService:
             """
             resultado = execute_insert_returning(query, (nombre, email, telefono, estado, id_usuario))
             if resultado:
+                _invalidar_cache(email)
                 logger.info(f"Operador {resultado['id_operador']} creado: {nombre}")
             return resultado
         except Exception as e:
@@ -43,8 +59,17 @@ class OperadorService:
     @staticmethod
     def obtener_operador_por_email(email: str) -> Optional[Dict]:
         """Obtener operador por email"""
+        with _cache_lock:
+            operador = _cache_email.get(email)
+        if operador is not None:
+            return dict(operador)
+
         query = "SELECT * FROM operador WHERE email = %s"
-        return execute_query_one(query, (email,))
+        operador = execute_query_one(query, (email,))
+        if operador:
+            with _cache_lock:
+                _cache_email[email] = dict(operador)
+        return operador
 
     @staticmethod
     def listar_operadores(skip: int = 0, limit: int = 100) -> List[Dict]:
@@ -71,14 +96,19 @@ class OperadorService:
             WHERE id_operador = %s
             RETURNING *
         """
-        return execute_query_one(query, tuple(values))
+        resultado = execute_query_one(query, tuple(values))
+        # El email anterior no se conoce aquí: se vacía el cache completo
+        _invalidar_cache()
+        return resultado
 
     @staticmethod
     def eliminar_operador(operador_id: int) -> bool:
         """Eliminar operador"""
         try:
-            query = "DELETE FROM operador WHERE id_operador = %s"
-            return execute_insert_update_delete(query, (operador_id,))
+            query = "DELETE FROM operador WHERE id_operador = %s RETURNING id_operador"
+            resultado = execute_insert_returning(query, (operador_id,))
+            _invalidar_cache()
+            return resultado is not None
         except Exception as e:
             logger.error(f"Error al eliminar operador {operador_id}: {e}")
             raise
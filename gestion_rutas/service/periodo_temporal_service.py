@@ -4,11 +4,14 @@ Service Layer para Periodos Temporales - PostgreSQL Directo
 
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete, separar_total
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columnas de periodo_temporal en las consultas preparadas
+_COLUMNAS_PERIODO = "id_periodo, fecha_inicio, fecha_fin, tipo_granularidad, estacionalidad"
+
 
 class PeriodoTemporalService:
     """Servicio para operaciones con Periodos Temporales"""
@@ -38,17 +41,26 @@ class PeriodoTemporalService:
     @staticmethod
     def obtener_periodo(periodo_id: int) -> Optional[Dict]:
         """Obtener período temporal por ID"""
-        query = "SELECT * FROM periodo_temporal WHERE id_periodo = %s"
-        return execute_query_one(query, (periodo_id,))
+        query = f"SELECT {_COLUMNAS_PERIODO} FROM periodo_temporal WHERE id_periodo = %s"
+        return execute_query_one(query, (periodo_id,), preparada=True)
 
     @staticmethod
     def obtener_periodos(
         tipo_granularidad: Optional[str] = None,
         estacionalidad: Optional[str] = None,
         skip: int = 0,
-        limit: int = 10
-    ) -> tuple[List[Dict], int]:
-        """Obtener períodos temporales con filtros"""
+        limit: int = 10,
+        cursor_fecha: Optional[datetime] = None,
+        cursor_id: Optional[int] = None,
+        con_total: bool = True
+    ) -> tuple[List[Dict], Optional[int]]:
+        """
+        Obtener períodos temporales con filtros.
+        Con cursor_fecha y cursor_id (fecha_inicio e id_periodo de la última fila
+        recibida) se pagina por clave en lugar de OFFSET; en ese modo el total cuenta
+        las filas restantes.
+        Con con_total=False no se cuenta (scroll infinito) y el total es None.
+        """
         conditions = []
         params = []
         
@@ -58,18 +70,25 @@ class PeriodoTemporalService:
         if estacionalidad:
             conditions.append("estacionalidad = %s")
             params.append(estacionalidad)
+        if cursor_fecha is not None and cursor_id is not None:
+            # id_periodo desempata períodos con la misma fecha_inicio
+            conditions.append("(fecha_inicio, id_periodo) < (%s, %s)")
+            params.extend([cursor_fecha, cursor_id])
+            skip = 0
         
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
         
         params.extend([skip, limit])
-        query = f"SELECT * FROM periodo_temporal{where_clause} ORDER BY fecha_inicio DESC OFFSET %s LIMIT %s"
-        periodos = execute_query(query, tuple(params))
+        if not con_total:
+            query = f"SELECT * FROM periodo_temporal{where_clause} ORDER BY fecha_inicio DESC, id_periodo DESC OFFSET %s LIMIT %s"
+            return execute_query(query, tuple(params)), None
         
-        count_query = f"SELECT COUNT(*) as total FROM periodo_temporal{where_clause}"
-        count_result = execute_query_one(count_query, tuple(params[:-2]) if conditions else ())
-        total = count_result['total'] if count_result else 0
+        # Página y total en una sola consulta
+        query = f"SELECT *, COUNT(*) OVER() AS total FROM periodo_temporal{where_clause} ORDER BY fecha_inicio DESC, id_periodo DESC OFFSET %s LIMIT %s"
+        periodos = execute_query(query, tuple(params))
         
-        return periodos, total
+        conteo = f"SELECT COUNT(*) AS total FROM periodo_temporal{where_clause}"
+        return separar_total(periodos, skip=skip, consulta_conteo=conteo, params_conteo=tuple(params[:-2]))
 
     @staticmethod
     def actualizar_periodo(periodo_id: int, datos: Dict[str, Any]) -> Optional[Dict]:
@@ -92,17 +111,17 @@ class PeriodoTemporalService:
     def eliminar_periodo(periodo_id: int) -> bool:
         """Eliminar un período temporal"""
         query = "DELETE FROM periodo_temporal WHERE id_periodo = %s"
-        resultado = execute_insert_update_delete(query, (periodo_id,))
+        resultado = execute_insert_update_delete(query, (periodo_id,), preparada=True)
         return resultado > 0
 
     @staticmethod
     def obtener_periodos_por_granularidad(tipo_granularidad: str) -> List[Dict]:
         """Obtener todos los períodos de una granularidad específica"""
-        query = "SELECT * FROM periodo_temporal WHERE tipo_granularidad = %s ORDER BY fecha_inicio DESC"
-        return execute_query(query, (tipo_granularidad,))
+        query = f"SELECT {_COLUMNAS_PERIODO} FROM periodo_temporal WHERE tipo_granularidad = %s ORDER BY fecha_inicio DESC"
+        return execute_query(query, (tipo_granularidad,), preparada=True)
 
     @staticmethod
     def obtener_periodos_por_estacionalidad(estacionalidad: str) -> List[Dict]:
         """Obtener todos los períodos de una estacionalidad específica"""
-        query = "SELECT * FROM periodo_temporal WHERE estacionalidad = %s ORDER BY fecha_inicio DESC"
-        return execute_query(query, (estacionalidad,))
+        query = f"SELECT {_COLUMNAS_PERIODO} FROM periodo_temporal WHERE estacionalidad = %s ORDER BY fecha_inicio DESC"
+        return execute_query(query, (estacionalidad,), preparada=True)
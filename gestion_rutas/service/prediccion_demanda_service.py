@@ -4,11 +4,17 @@ Service Layer para Predicciones de Demanda - PostgreSQL Directo
 
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete, execute_values_returning, separar_total
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columnas de prediccion_demanda en las consultas preparadas
+_COLUMNAS_PREDICCION = (
+    "id_prediccion, id_zona, horizonte_horas, fecha_prediccion, valor_predicho_kg, "
+    "valor_real_kg, modelo_lstm_version, error_rmse, error_mape"
+)
+
 
 class PrediccionDemandaService:
     """Servicio para operaciones con Predicciones de Demanda"""
@@ -43,11 +49,45 @@ class PrediccionDemandaService:
             logger.error(f"Error al crear predicción: {str(e)}")
             raise
 
+    @staticmethod
+    def crear_predicciones_bulk(predicciones: List[Dict]) -> List[Dict]:
+        """
+        Crear varias predicciones en un solo INSERT ... VALUES (por páginas de 1000).
+        Cada elemento usa las mismas claves que crear_prediccion.
+        """
+        filas = [
+            (
+                p['id_zona'],
+                p['horizonte_horas'],
+                p['fecha_prediccion'],
+                p['valor_predicho_kg'],
+                p.get('valor_real_kg'),
+                p.get('modelo_lstm_version', "v1.0"),
+                p.get('error_rmse'),
+                p.get('error_mape'),
+            )
+            for p in predicciones
+        ]
+        try:
+            query = """
+                INSERT INTO prediccion_demanda 
+                (id_zona, horizonte_horas, fecha_prediccion, valor_predicho_kg, valor_real_kg, 
+                 modelo_lstm_version, error_rmse, error_mape)
+                VALUES %s
+                RETURNING *
+            """
+            resultado = execute_values_returning(query, filas)
+            logger.info(f"{len(filas)} predicciones creadas en lote")
+            return resultado
+        except Exception as e:
+            logger.error(f"Error al crear predicciones en lote: {str(e)}")
+            raise
+
     @staticmethod
     def obtener_prediccion(prediccion_id: int) -> Optional[Dict]:
         """Obtener predicción por ID"""
-        query = "SELECT * FROM prediccion_demanda WHERE id_prediccion = %s"
-        return execute_query_one(query, (prediccion_id,))
+        query = f"SELECT {_COLUMNAS_PREDICCION} FROM prediccion_demanda WHERE id_prediccion = %s"
+        return execute_query_one(query, (prediccion_id,), preparada=True)
 
     @staticmethod
     def obtener_predicciones(
@@ -57,9 +97,18 @@ class PrediccionDemandaService:
         fecha_hasta: Optional[datetime] = None,
         modelo_version: Optional[str] = None,
         skip: int = 0,
-        limit: int = 10
-    ) -> tuple[List[Dict], int]:
-        """Obtener predicciones con filtros"""
+        limit: int = 10,
+        cursor_fecha: Optional[datetime] = None,
+        cursor_id: Optional[int] = None,
+        con_total: bool = True
+    ) -> tuple[List[Dict], Optional[int]]:
+        """
+        Obtener predicciones con filtros.
+        Con cursor_fecha y cursor_id (fecha_prediccion e id_prediccion de la última
+        fila recibida) se pagina por clave en lugar de OFFSET; en ese modo el total
+        cuenta las filas restantes.
+        Con con_total=False no se cuenta (scroll infinito) y el total es None.
+        """
         conditions = []
         params = []
         
@@ -78,18 +127,25 @@ class PrediccionDemandaService:
         if modelo_version:
             conditions.append("modelo_lstm_version = %s")
             params.append(modelo_version)
+        if cursor_fecha is not None and cursor_id is not None:
+            # id_prediccion desempata predicciones de la misma fecha (p. ej. varias zonas)
+            conditions.append("(fecha_prediccion, id_prediccion) < (%s, %s)")
+            params.extend([cursor_fecha, cursor_id])
+            skip = 0
         
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
         
         params.extend([skip, limit])
-        query = f"SELECT * FROM prediccion_demanda{where_clause} ORDER BY fecha_prediccion DESC OFFSET %s LIMIT %s"
-        predicciones = execute_query(query, tuple(params))
+        if not con_total:
+            query = f"SELECT * FROM prediccion_demanda{where_clause} ORDER BY fecha_prediccion DESC, id_prediccion DESC OFFSET %s LIMIT %s"
+            return execute_query(query, tuple(params)), None
         
-        count_query = f"SELECT COUNT(*) as total FROM prediccion_demanda{where_clause}"
-        count_result = execute_query_one(count_query, tuple(params[:-2]) if conditions else ())
-        total = count_result['total'] if count_result else 0
+        # Página y total en una sola consulta
+        query = f"SELECT *, COUNT(*) OVER() AS total FROM prediccion_demanda{where_clause} ORDER BY fecha_prediccion DESC, id_prediccion DESC OFFSET %s LIMIT %s"
+        predicciones = execute_query(query, tuple(params))
         
-        return predicciones, total
+        conteo = f"SELECT COUNT(*) AS total FROM prediccion_demanda{where_clause}"
+        return separar_total(predicciones, skip=skip, consulta_conteo=conteo, params_conteo=tuple(params[:-2]))
 
     @staticmethod
     def actualizar_prediccion(prediccion_id: int, datos: Dict[str, Any]) -> Optional[Dict]:
@@ -112,11 +168,11 @@ class PrediccionDemandaService:
     def eliminar_prediccion(prediccion_id: int) -> bool:
         """Eliminar una predicción"""
         query = "DELETE FROM prediccion_demanda WHERE id_prediccion = %s"
-        resultado = execute_insert_update_delete(query, (prediccion_id,))
+        resultado = execute_insert_update_delete(query, (prediccion_id,), preparada=True)
         return resultado > 0
 
     @staticmethod
     def obtener_predicciones_por_zona(id_zona: int) -> List[Dict]:
         """Obtener todas las predicciones de una zona"""
-        query = "SELECT * FROM prediccion_demanda WHERE id_zona = %s ORDER BY fecha_prediccion DESC"
-        return execute_query(query, (id_zona,))
+        query = f"SELECT {_COLUMNAS_PREDICCION} FROM prediccion_demanda WHERE id_zona = %s ORDER BY fecha_prediccion DESC"
+        return execute_query(query, (id_zona,), preparada=True)
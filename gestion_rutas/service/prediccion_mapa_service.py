@@ -8,18 +8,62 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import json
+import os
+import tempfile
+import threading
+from bisect import bisect_right
 
 try:
+    import tensorflow as tf
     from tensorflow import keras
 except ImportError:
+    tf = None
     keras = None
 
+# Umbrales (kg) y niveles de demanda: kg < 50 -> Muy Bajo, ..., kg >= 150 -> Muy Alto
+_UMBRALES_KG = (50, 80, 120, 150)
+_NIVELES = (
+    {'nivel': 'Muy Bajo', 'color': '#00FF00', 'prioridad': 1, 'radio': 3},
+    {'nivel': 'Bajo', 'color': '#90EE90', 'prioridad': 2, 'radio': 5},
+    {'nivel': 'Medio', 'color': '#FFD700', 'prioridad': 3, 'radio': 7},
+    {'nivel': 'Alto', 'color': '#FFA500', 'prioridad': 4, 'radio': 9},
+    {'nivel': 'Muy Alto', 'color': '#FF0000', 'prioridad': 5, 'radio': 12},
+)
+
+# Índice = datetime.weekday(); mismos nombres que la columna dia_semana del CSV
+_DIAS_ESP = ('Lunes', 'Martes', 'Miercoles', 'Jueves', 'Viernes', 'Sabado', 'Domingo')
+
+# Modelo, scaler, función de inferencia compilada e intérprete TFLite, compartidos
+# entre instancias (los routers crean un servicio por request); clave: ruta del modelo
+_RECURSOS_MODELO: Dict[str, tuple] = {}
+_recursos_lock = threading.Lock()
+# El intérprete TFLite no es thread-safe
+_tflite_lock = threading.Lock()
+
+
+def _escribir_parquet_atomico(df: pd.DataFrame, destino: Path) -> None:
+    """
+    Escribir el Parquet en un temporal del mismo directorio y renombrarlo: otro worker
+    que lo lea a la vez ve el archivo anterior o el nuevo completo, nunca uno a medias
+    """
+    fd, temporal = tempfile.mkstemp(dir=destino.parent, prefix=destino.name, suffix='.tmp')
+    os.close(fd)
+    try:
+        df.to_parquet(temporal, index=False)
+        os.replace(temporal, destino)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
 class PrediccionMapaService:
     """Servicio para generar predicciones LSTM y prepararlas para visualización en mapa"""
     
     def __init__(self):
         self.lstm_dir = Path(__file__).parent.parent / "lstm"
         self.modelo_path = self.lstm_dir / "lstm_temp" / "modelo.keras"
+        # Versión cuantizada opcional (ver lstm/convertir_tflite.py)
+        self.tflite_path = self.lstm_dir / "lstm_temp" / "modelo.tflite"
         self.scaler_path = self.lstm_dir / "scalers.pkl"
         
         # USAR CSV CON COORDENADAS REALES DEL SECTOR SUR
@@ -28,10 +72,58 @@ class PrediccionMapaService:
         
         self.modelo = None
         self.scaler = None
+        self._predict_fn = None
+        self._interprete = None
         self.df = None
         
+        # Promedios precalculados al cargar el CSV (evitan filtrar el DataFrame por punto)
+        self._mean_punto: Dict[str, float] = {}
+        self._mean_punto_dia: Dict[tuple, float] = {}
+        # Layout por punto (SoA): arrays contiguos ordenados por fecha ascendente
+        self._residuos_por_punto: Dict[str, np.ndarray] = {}
+        self._fecha_por_punto: Dict[str, np.ndarray] = {}
+        # Puntos únicos con coordenadas (calculados al cargar el CSV; solo lectura)
+        self._puntos_cache: List[Dict] = []
+        # Buffer de entrada del lote, reutilizado entre llamadas (uno por hilo:
+        # la instancia se comparte entre requests)
+        self._x_buf = threading.local()
+        
     def cargar_modelo(self) -> bool:
-        """Cargar modelo LSTM entrenado y scaler"""
+        """Cargar modelo LSTM entrenado y scaler (una sola vez por proceso)"""
+        if self.modelo is not None:
+            return True
+        
+        clave = str(self.modelo_path)
+        with _recursos_lock:
+            if clave in _RECURSOS_MODELO:
+                self.modelo, self.scaler, self._predict_fn, self._interprete = _RECURSOS_MODELO[clave]
+                return True
+            
+            if not self._cargar_modelo_desde_disco():
+                return False
+            
+            # Grafo compilado: evita el bucle de iteradores de .predict() en lotes pequeños
+            if tf is not None:
+                modelo = self.modelo
+                self._predict_fn = tf.function(
+                    lambda x: modelo(x, training=False),
+                    input_signature=[tf.TensorSpec([None, 3, 1], tf.float32)]
+                )
+                if self.tflite_path.exists():
+                    try:
+                        self._interprete = tf.lite.Interpreter(
+                            model_path=str(self.tflite_path), num_threads=os.cpu_count()
+                        )
+                        self._interprete.allocate_tensors()
+                        print(f"Modelo TFLite cargado desde {self.tflite_path}")
+                    except Exception as e:
+                        print(f"Error cargando TFLite, se usa Keras: {e}")
+                        self._interprete = None
+            _RECURSOS_MODELO[clave] = (self.modelo, self.scaler, self._predict_fn, self._interprete)
+            return True
+    
+    def _cargar_modelo_desde_disco(self) -> bool:
+        """Leer modelo y scaler desde disco"""
         try:
             if keras and self.modelo_path.exists():
                 self.modelo = keras.models.load_model(str(self.modelo_path))
@@ -62,11 +154,48 @@ class PrediccionMapaService:
             return False
     
     def cargar_datos_historicos(self) -> bool:
-        """Cargar datos históricos del CSV"""
+        """Cargar datos históricos del CSV (o de su copia Parquet si está al día)"""
+        if self.df is not None:
+            return True
         try:
             if self.datos_path.exists():
-                self.df = pd.read_csv(str(self.datos_path))
-                self.df['fecha'] = pd.to_datetime(self.df['fecha'])
+                parquet_path = self.datos_path.with_suffix('.parquet')
+                if parquet_path.exists() and parquet_path.stat().st_mtime >= self.datos_path.stat().st_mtime:
+                    # Ya ordenado, con fechas y categorías tipadas
+                    df = pd.read_parquet(parquet_path)
+                else:
+                    df = pd.read_csv(str(self.datos_path))
+                    df['fecha'] = pd.to_datetime(df['fecha'])
+                    # Orden cronológico una sola vez; el nombre del punto como categoría
+                    df = df.sort_values('fecha', kind='stable').reset_index(drop=True)
+                    df['punto_recoleccion'] = df['punto_recoleccion'].astype('category')
+                    try:
+                        _escribir_parquet_atomico(df, parquet_path)
+                    except Exception as e:
+                        print(f" No se pudo guardar caché Parquet: {e}")
+                self.df = df
+                
+                self._mean_punto = self.df.groupby('punto_recoleccion', observed=True)['residuos_kg'].mean().to_dict()
+                self._mean_punto_dia = self.df.groupby(['punto_recoleccion', 'dia_semana'], observed=True)['residuos_kg'].mean().to_dict()
+                
+                self._residuos_por_punto = {}
+                self._fecha_por_punto = {}
+                for punto, sub in self.df.groupby('punto_recoleccion', observed=True, sort=False):
+                    # float32: mismo dtype que la entrada del modelo, sin conversiones por lote
+                    residuos = sub['residuos_kg'].to_numpy(dtype=np.float32)
+                    fechas = sub['fecha'].to_numpy()
+                    # Solo lectura: obtener_ultimos_dias devuelve vistas sin copiar
+                    residuos.flags.writeable = False
+                    fechas.flags.writeable = False
+                    self._residuos_por_punto[punto] = residuos
+                    self._fecha_por_punto[punto] = fechas
+                
+                puntos_df = self.df.groupby(
+                    ['punto_recoleccion', 'latitud_punto_recoleccion', 'longitud_punto_recoleccion'],
+                    observed=True
+                ).size().reset_index(name='registros_historicos')
+                puntos_df.columns = ['nombre', 'latitud', 'longitud', 'registros_historicos']
+                self._puntos_cache = puntos_df.to_dict('records')
                 print(f" CSV cargado: {len(self.df)} registros")
                 print(f" Columnas: {self.df.columns.tolist()}")
                 print(f" Puntos únicos: {self.df['punto_recoleccion'].nunique()}")
@@ -80,25 +209,31 @@ class PrediccionMapaService:
             print(f" Error cargando CSV: {e}")
             return False
     
+    def _inferir(self, X: np.ndarray) -> np.ndarray:
+        """Inferencia del modelo sobre un lote [n, 3, 1]"""
+        X = np.asarray(X, dtype=np.float32)
+        if self._interprete is not None:
+            with _tflite_lock:
+                entrada = self._interprete.get_input_details()[0]
+                if tuple(entrada['shape']) != X.shape:
+                    # Un solo invoke para todo el lote [n, 3, 1]
+                    self._interprete.resize_tensor_input(entrada['index'], X.shape)
+                    self._interprete.allocate_tensors()
+                self._interprete.set_tensor(entrada['index'], X)
+                self._interprete.invoke()
+                salida = self._interprete.get_output_details()[0]
+                return self._interprete.get_tensor(salida['index']).copy()
+        if self._predict_fn is not None:
+            return self._predict_fn(tf.constant(X)).numpy()
+        return self.modelo.predict(X, verbose=0, batch_size=len(X))
+    
     def obtener_puntos_recoleccion_unicos(self) -> List[Dict]:
-        """Extraer lista única de puntos con coordenadas reales del Sector Sur"""
+        """Lista única de puntos con coordenadas reales del Sector Sur (precalculada al cargar el CSV)"""
         if self.df is None:
             print(" DataFrame es None, no se pueden obtener puntos")
             return []
         
-        # Agrupar por punto único
-        puntos = self.df.groupby(['punto_recoleccion', 'latitud_punto_recoleccion', 
-                                   'longitud_punto_recoleccion']).size().reset_index(name='registros')
-        
-        puntos_lista = []
-        
-        for _, row in puntos.iterrows():
-            puntos_lista.append({
-                'nombre': row['punto_recoleccion'],
-                'latitud': row['latitud_punto_recoleccion'],
-                'longitud': row['longitud_punto_recoleccion'],
-                'registros_historicos': row['registros']
-            })
+        puntos_lista = self._puntos_cache
         
         print(f" Puntos únicos extraídos: {len(puntos_lista)}")
         if puntos_lista:
@@ -110,22 +245,21 @@ class PrediccionMapaService:
         if self.df is None:
             return None
         
-        df_punto = self.df[self.df['punto_recoleccion'] == punto].copy()
-        
-        if len(df_punto) == 0:
+        # Array del punto ya ordenado por fecha ascendente (ver cargar_datos_historicos)
+        residuos = self._residuos_por_punto.get(punto)
+        if residuos is None or len(residuos) == 0:
             return None
-            
-        # Usar los datos más recientes disponibles
-        df_punto = df_punto.sort_values('fecha', ascending=False)
         
-        if len(df_punto) < n_dias:
+        if len(residuos) < n_dias:
             # Si no hay suficientes datos, usar el promedio histórico completo
-            promedio = df_punto['residuos_kg'].mean() if len(df_punto) > 0 else 80.0
-            return np.array([promedio] * n_dias)
+            return np.full(n_dias, np.nanmean(residuos))
         
-        # Tomar los últimos n_dias
-        ultimos = df_punto.head(n_dias)['residuos_kg'].values[::-1]
-        return ultimos
+        # Tomar los últimos n_dias, en orden cronológico (vista de solo lectura, sin copia)
+        return residuos[-n_dias:]
+    
+    def _ultimos_dias_por_punto(self, n_dias: int = 3) -> Dict[str, np.ndarray]:
+        """Últimos N días de residuos para todos los puntos, sin filtrar el DataFrame"""
+        return {punto: self.obtener_ultimos_dias(punto, n_dias) for punto in self._residuos_por_punto}
     
     def predecir_residuos(self, punto: str, fecha_prediccion: Optional[datetime] = None) -> Dict:
         """
@@ -143,34 +277,13 @@ class PrediccionMapaService:
         
         # Calcular promedio histórico completo para este punto
         if self.df is not None:
-            df_punto = self.df[self.df['punto_recoleccion'] == punto]
-            if len(df_punto) > 0:
-                promedio_historico = df_punto['residuos_kg'].mean()
-                # Validar que no sea NaN
-                if np.isnan(promedio_historico):
-                    promedio_historico = 80.0
-            else:
+            promedio_historico = self._mean_punto.get(punto, 80.0)
+            # Validar que no sea NaN
+            if np.isnan(promedio_historico):
                 promedio_historico = 80.0
             
             # Calcular factor del día de la semana basado en datos históricos
-            dia_semana = fecha_prediccion.strftime('%A')
-            dias_esp = {
-                'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miercoles',
-                'Thursday': 'Jueves', 'Friday': 'Viernes', 'Saturday': 'Sabado', 'Sunday': 'Domingo'
-            }
-            dia_esp = dias_esp.get(dia_semana, dia_semana)
-            
-            # Calcular promedio por día de la semana
-            df_dia = df_punto[df_punto['dia_semana'] == dia_esp]
-            if len(df_dia) > 0:
-                promedio_dia = df_dia['residuos_kg'].mean()
-                # Validar que no sea NaN
-                if np.isnan(promedio_dia):
-                    factor_dia = 1.0
-                else:
-                    factor_dia = promedio_dia / promedio_historico if promedio_historico > 0 else 1.0
-            else:
-                factor_dia = 1.0
+            factor_dia = self._calcular_factor_dia(punto, _DIAS_ESP[fecha_prediccion.weekday()])
         else:
             promedio_historico = 80.0
             factor_dia = 1.0
@@ -187,7 +300,7 @@ class PrediccionMapaService:
                 X = ultimos_dias.reshape(1, 3, 1)
                 
                 # Hacer predicción
-                prediccion = self.modelo.predict(X, verbose=0)[0][0]
+                prediccion = self._inferir(X)[0][0]
                 prediccion = max(0, prediccion)
                 
                 # Ajustar predicción según día de la semana
@@ -238,7 +351,7 @@ class PrediccionMapaService:
         Returns:
             Lista de diccionarios con predicciones y coordenadas para cada punto
         """
-        # Cargar recursos
+        # Cargar recursos (sin costo si la instancia viene de get_service())
         self.cargar_modelo()
         self.cargar_datos_historicos()
         
@@ -251,21 +364,19 @@ class PrediccionMapaService:
         
         # OPTIMIZACIÓN: Preparar todas las entradas primero
         if self.modelo is not None:
-            # Preparar lote de entradas para predicción
-            entradas_lote = []
-            puntos_validos = []
+            # Preparar lote de entradas para predicción (un solo groupby para todos los puntos)
+            ultimos_por_punto = self._ultimos_dias_por_punto(n_dias=3)
+            puntos_validos = [p for p in puntos if p['nombre'] in ultimos_por_punto]
             
-            for punto_info in puntos:
-                ultimos_dias = self.obtener_ultimos_dias(punto_info['nombre'], n_dias=3)
-                if ultimos_dias is not None:
-                    entradas_lote.append(ultimos_dias.reshape(1, 3, 1))
-                    puntos_validos.append(punto_info)
-            
-            if entradas_lote:
+            if puntos_validos:
                 # Hacer predicción por lotes (MUCHO MÁS RÁPIDO)
-                import numpy as np
-                X_lote = np.vstack(entradas_lote)  # Shape: [n_puntos, 3, 1]
-                predicciones_lote = self.modelo.predict(X_lote, verbose=0)  # Una sola llamada
+                buf = getattr(self._x_buf, 'array', None)
+                if buf is None or buf.shape[0] < len(puntos_validos):
+                    buf = self._x_buf.array = np.empty((len(puntos), 3, 1), dtype=np.float32)
+                X_lote = buf[:len(puntos_validos)]  # Shape: [n_puntos, 3, 1]
+                for j, p in enumerate(puntos_validos):
+                    X_lote[j, :, 0] = ultimos_por_punto[p['nombre']]
+                predicciones_lote = self._inferir(X_lote)  # Una sola llamada
                 
                 # Aplicar scaler inverso si está disponible
                 if self.scaler is not None:
@@ -275,47 +386,44 @@ class PrediccionMapaService:
                     except Exception as e:
                         print(f" Error aplicando scaler inverso: {e}")
                 
-                # Procesar resultados
-                predicciones = []
-                for i, punto_info in enumerate(puntos_validos):
-                    prediccion_raw = float(predicciones_lote[i][0])
-                    
-                    # Calcular factores de ajuste
-                    if fecha_prediccion is None:
-                        fecha_prediccion = datetime.now() + timedelta(days=1)
-                    
-                    factor_dia = self._calcular_factor_dia(punto_info['nombre'], fecha_prediccion)
-                    prediccion_ajustada = max(0, prediccion_raw * factor_dia)
-                    
-                    # Si la predicción es muy baja (< 5 kg), usar promedio histórico
-                    if prediccion_ajustada < 5:
-                        # Calcular promedio histórico para este punto
-                        df_punto = self.df[self.df['punto_recoleccion'] == punto_info['nombre']]
-                        if len(df_punto) > 0:
-                            promedio = df_punto['residuos_kg'].mean()
-                            if not np.isnan(promedio):
-                                prediccion_ajustada = promedio * factor_dia
-                                metodo = 'promedio_historico'
-                            else:
-                                prediccion_ajustada = 80.0 * factor_dia
-                                metodo = 'valor_default'
-                        else:
-                            prediccion_ajustada = 80.0 * factor_dia
-                            metodo = 'valor_default'
-                    else:
-                        metodo = 'lstm_batch'
-                    
-                    pred_completa = {
+                # Procesar resultados (fecha y día constantes para todos los puntos)
+                if fecha_prediccion is None:
+                    fecha_prediccion = datetime.now() + timedelta(days=1)
+                dia_esp = _DIAS_ESP[fecha_prediccion.weekday()]
+                fecha_str = fecha_prediccion.strftime('%Y-%m-%d')
+                
+                # Ajustes vectorizados sobre todo el lote
+                nombres = [p['nombre'] for p in puntos_validos]
+                n = len(nombres)
+                prediccion_raw = np.asarray(predicciones_lote, dtype=np.float64)[:, 0]
+                promedios = np.fromiter((self._mean_punto.get(nombre, np.nan) for nombre in nombres), dtype=np.float64, count=n)
+                promedios_dia = np.fromiter((self._mean_punto_dia.get((nombre, dia_esp), np.nan) for nombre in nombres), dtype=np.float64, count=n)
+                # Factor del día (misma regla que _calcular_factor_dia): 1.0 si falta algún promedio o es 0
+                factor_valido = ~np.isnan(promedios) & (promedios != 0) & ~np.isnan(promedios_dia)
+                factores = np.divide(promedios_dia, promedios, out=np.ones(n), where=factor_valido)
+                
+                # fmax: un NaN del modelo cuenta como 0 y cae al fallback
+                prediccion_ajustada = np.fmax(0, prediccion_raw * factores)
+                # Si la predicción es muy baja (< 5 kg), usar promedio histórico (o 80 kg por defecto)
+                bajo = prediccion_ajustada < 5
+                sin_promedio = np.isnan(promedios)
+                fallback = np.where(sin_promedio, 80.0, promedios) * factores
+                prediccion_ajustada = np.where(bajo, fallback, prediccion_ajustada)
+                metodos = np.where(bajo, np.where(sin_promedio, 'valor_default', 'promedio_historico'), 'lstm_batch')
+                
+                predicciones = [
+                    {
                         'punto': punto_info['nombre'],
-                        'fecha': fecha_prediccion.strftime('%Y-%m-%d'),
-                        'prediccion_kg': round(prediccion_ajustada, 2),
+                        'fecha': fecha_str,
+                        'prediccion_kg': round(kg, 2),
                         'metodo': metodo,
                         'confianza': 'alta' if metodo == 'lstm_batch' else 'media',
                         'latitud': punto_info['latitud'],
                         'longitud': punto_info['longitud'],
                         'registros_historicos': punto_info['registros_historicos']
                     }
-                    predicciones.append(pred_completa)
+                    for punto_info, kg, metodo in zip(puntos_validos, prediccion_ajustada.tolist(), metodos.tolist())
+                ]
                 
                 print(f" {len(predicciones)} predicciones generadas por lote en modo optimizado")
                 return predicciones
@@ -336,32 +444,15 @@ class PrediccionMapaService:
         
         return predicciones
     
-    def _calcular_factor_dia(self, punto: str, fecha: datetime) -> float:
-        """Calcular factor de ajuste según día de la semana"""
-        if self.df is None:
+    def _calcular_factor_dia(self, punto: str, dia_esp: str) -> float:
+        """Calcular factor de ajuste según día de la semana (dia_esp: nombre en español)"""
+        promedio_historico = self._mean_punto.get(punto)
+        if promedio_historico is None or np.isnan(promedio_historico) or promedio_historico == 0:
             return 1.0
         
-        df_punto = self.df[self.df['punto_recoleccion'] == punto]
-        if len(df_punto) == 0:
-            return 1.0
-        
-        promedio_historico = df_punto['residuos_kg'].mean()
-        if np.isnan(promedio_historico) or promedio_historico == 0:
-            return 1.0
-        
-        # Obtener día de la semana
-        dia_semana = fecha.strftime('%A')
-        dias_esp = {
-            'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miercoles',
-            'Thursday': 'Jueves', 'Friday': 'Viernes', 'Saturday': 'Sabado', 'Sunday': 'Domingo'
-        }
-        dia_esp = dias_esp.get(dia_semana, dia_semana)
-        
-        df_dia = df_punto[df_punto['dia_semana'] == dia_esp]
-        if len(df_dia) > 0:
-            promedio_dia = df_dia['residuos_kg'].mean()
-            if not np.isnan(promedio_dia):
-                return promedio_dia / promedio_historico
+        promedio_dia = self._mean_punto_dia.get((punto, dia_esp))
+        if promedio_dia is not None and not np.isnan(promedio_dia):
+            return promedio_dia / promedio_historico
         
         return 1.0
     
@@ -370,34 +461,24 @@ class PrediccionMapaService:
         Clasificar nivel de demanda según cantidad predicha
         
         Returns:
-            Dict con nivel, color y prioridad
+            Dict con nivel, color y prioridad (compartido: no modificar)
         """
-        if kg < 50:
-            return {'nivel': 'Muy Bajo', 'color': '#00FF00', 'prioridad': 1, 'radio': 3}
-        elif kg < 80:
-            return {'nivel': 'Bajo', 'color': '#90EE90', 'prioridad': 2, 'radio': 5}
-        elif kg < 120:
-            return {'nivel': 'Medio', 'color': '#FFD700', 'prioridad': 3, 'radio': 7}
-        elif kg < 150:
-            return {'nivel': 'Alto', 'color': '#FFA500', 'prioridad': 4, 'radio': 9}
-        else:
-            return {'nivel': 'Muy Alto', 'color': '#FF0000', 'prioridad': 5, 'radio': 12}
+        return _NIVELES[bisect_right(_UMBRALES_KG, kg)]
     
     def generar_estadisticas_globales(self, predicciones: List[Dict]) -> Dict:
         """Generar estadísticas agregadas de las predicciones"""
         if not predicciones:
             return {}
         
-        total_kg = sum([p['prediccion_kg'] for p in predicciones])
-        promedio_kg = total_kg / len(predicciones)
-        max_kg = max([p['prediccion_kg'] for p in predicciones])
-        min_kg = min([p['prediccion_kg'] for p in predicciones])
+        kg = np.fromiter((p['prediccion_kg'] for p in predicciones), dtype=np.float64, count=len(predicciones))
+        total_kg = float(kg.sum())
+        promedio_kg = float(kg.mean())
+        max_kg = float(kg.max())
+        min_kg = float(kg.min())
         
-        # Contar por nivel de demanda
-        niveles = {'Muy Bajo': 0, 'Bajo': 0, 'Medio': 0, 'Alto': 0, 'Muy Alto': 0}
-        for pred in predicciones:
-            nivel = self.clasificar_nivel_demanda(pred['prediccion_kg'])['nivel']
-            niveles[nivel] += 1
+        # Contar por nivel de demanda (mismos umbrales que clasificar_nivel_demanda)
+        conteos = np.bincount(np.digitize(kg, _UMBRALES_KG), minlength=len(_NIVELES))
+        niveles = {n['nivel']: c for n, c in zip(_NIVELES, conteos.tolist())}
         
         return {
             'total_puntos': len(predicciones),
@@ -408,3 +489,37 @@ class PrediccionMapaService:
             'distribucion_niveles': niveles,
             'fecha_generacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
+
+
+# Instancia compartida entre requests: modelo, scaler y CSV cargados una sola vez.
+# Si cambia la fecha de modificación del CSV o del modelo se construye una nueva
+# instancia y se reemplaza la referencia (las requests en curso siguen con la anterior).
+_INSTANCE: Optional[PrediccionMapaService] = None
+_INSTANCE_MTIMES: Optional[tuple] = None
+_LOCK = threading.Lock()
+
+
+def _mtimes_recursos(servicio: PrediccionMapaService) -> tuple:
+    """Fechas de modificación de los archivos de los que depende el servicio"""
+    return tuple(
+        ruta.stat().st_mtime if ruta.exists() else None
+        for ruta in (servicio.datos_path, servicio.modelo_path, servicio.tflite_path, servicio.scaler_path)
+    )
+
+
+def get_service() -> PrediccionMapaService:
+    """Obtener el servicio de predicciones del mapa ya cargado"""
+    global _INSTANCE, _INSTANCE_MTIMES
+    with _LOCK:
+        if _INSTANCE is not None and _mtimes_recursos(_INSTANCE) == _INSTANCE_MTIMES:
+            return _INSTANCE
+        servicio = PrediccionMapaService()
+        mtimes = _mtimes_recursos(servicio)
+        if _INSTANCE is not None:
+            # Archivos actualizados: descartar el modelo cacheado
+            with _recursos_lock:
+                _RECURSOS_MODELO.pop(str(servicio.modelo_path), None)
+        servicio.cargar_modelo()
+        servicio.cargar_datos_historicos()
+        _INSTANCE, _INSTANCE_MTIMES = servicio, mtimes
+        return _INSTANCE
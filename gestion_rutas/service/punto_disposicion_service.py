@@ -3,11 +3,27 @@ Service Layer para Puntos de Disposición - PostgreSQL Directo
 """
 
 from typing import List, Optional, Dict, Any
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete, execute_values_returning, separar_total, set_enviados, valores_enviados
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columnas devueltas por las sentencias preparadas
+_COLUMNAS_PUNTO = "id_disposicion, nombre, tipo, latitud, longitud, capacidad_diaria_ton"
+
+# Columnas de PuntoDisposicionUpdate
+_COLUMNAS_ACTUALIZABLES = ('nombre', 'tipo', 'latitud', 'longitud', 'capacidad_diaria_ton')
+_SQL_ACTUALIZAR_PUNTO = (
+    "UPDATE punto_disposicion SET "
+    + set_enviados(_COLUMNAS_ACTUALIZABLES)
+    + f" WHERE id_disposicion = %s RETURNING {_COLUMNAS_PUNTO}"
+)
+
+
+def _escapar_like(texto: str) -> str:
+    """Escapar los comodines de LIKE (el escape por defecto en PostgreSQL es \\)"""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
 
 class PuntoDisposicionService:
     """Servicio para operaciones con Puntos de Disposición"""
@@ -22,12 +38,12 @@ class PuntoDisposicionService:
     ) -> Optional[Dict]:
         """Crear nuevo punto de disposición"""
         try:
-            query = """
+            query = f"""
                 INSERT INTO punto_disposicion (nombre, tipo, latitud, longitud, capacidad_diaria_ton)
                 VALUES (%s, %s, %s, %s, %s)
-                RETURNING *
+                RETURNING {_COLUMNAS_PUNTO}
             """
-            resultado = execute_insert_returning(query, (nombre, tipo, latitud, longitud, capacidad_diaria_ton))
+            resultado = execute_insert_returning(query, (nombre, tipo, latitud, longitud, capacidad_diaria_ton), preparada=True)
             if resultado:
                 logger.info(f"Punto disposición {resultado.get('id_disposicion')} creado: {nombre}")
             return resultado
@@ -35,6 +51,26 @@ class PuntoDisposicionService:
             logger.error(f"Error al crear punto: {str(e)}")
             raise
 
+    @staticmethod
+    def crear_puntos_bulk(puntos: List[Dict]) -> List[Dict]:
+        """Crear varios puntos de disposición en un solo INSERT ... VALUES"""
+        filas = [
+            (p['nombre'], p['tipo'], p['latitud'], p['longitud'], p['capacidad_diaria_ton'])
+            for p in puntos
+        ]
+        try:
+            query = """
+                INSERT INTO punto_disposicion (nombre, tipo, latitud, longitud, capacidad_diaria_ton)
+                VALUES %s
+                RETURNING *
+            """
+            resultado = execute_values_returning(query, filas)
+            logger.info(f"{len(filas)} puntos de disposición creados en lote")
+            return resultado
+        except Exception as e:
+            logger.error(f"Error al crear puntos en lote: {str(e)}")
+            raise
+
     @staticmethod
     def obtener_punto(punto_id: int) -> Optional[Dict]:
         """Obtener punto de disposición por ID"""
@@ -46,9 +82,14 @@ class PuntoDisposicionService:
         tipo: Optional[str] = None,
         nombre: Optional[str] = None,
         skip: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        despues_de_id: Optional[int] = None
     ) -> tuple[List[Dict], int]:
-        """Obtener puntos de disposición con filtros"""
+        """
+        Obtener puntos de disposición con filtros.
+        Con despues_de_id (último id_disposicion recibido) se pagina por clave en
+        lugar de OFFSET; en ese modo el total cuenta las filas restantes.
+        """
         conditions = []
         params = []
         
@@ -56,37 +97,38 @@ class PuntoDisposicionService:
             conditions.append("tipo = %s")
             params.append(tipo)
         if nombre:
+            # Búsqueda literal (sin comodines del usuario); la acelera idx_punto_nombre_trgm
             conditions.append("nombre ILIKE %s")
-            params.append(f"%{nombre}%")
+            params.append(f"%{_escapar_like(nombre)}%")
+        if despues_de_id is not None:
+            conditions.append("id_disposicion > %s")
+            params.append(despues_de_id)
+            skip = 0
         
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
         
+        # Página y total en una sola consulta
         params.extend([skip, limit])
-        query = f"SELECT * FROM punto_disposicion{where_clause} ORDER BY id_disposicion OFFSET %s LIMIT %s"
+        query = f"SELECT *, COUNT(*) OVER () AS total FROM punto_disposicion{where_clause} ORDER BY id_disposicion OFFSET %s LIMIT %s"
         puntos = execute_query(query, tuple(params))
         
-        count_query = f"SELECT COUNT(*) as total FROM punto_disposicion{where_clause}"
-        count_result = execute_query_one(count_query, tuple(params[:-2]) if conditions else ())
-        total = count_result['total'] if count_result else 0
-        
-        return puntos, total
+        conteo = f"SELECT COUNT(*) AS total FROM punto_disposicion{where_clause}"
+        return separar_total(puntos, skip=skip, consulta_conteo=conteo, params_conteo=tuple(params[:-2]))
 
     @staticmethod
     def actualizar_punto(punto_id: int, datos: Dict[str, Any]) -> Optional[Dict]:
-        """Actualizar datos de un punto"""
-        campos = []
-        valores = []
-        for key, value in datos.items():
-            if value is not None:
-                campos.append(f"{key} = %s")
-                valores.append(value)
+        """Actualizar datos de un punto (los campos ausentes se conservan; un None enviado limpia el campo)"""
+        desconocidos = set(datos) - set(_COLUMNAS_ACTUALIZABLES)
+        if desconocidos:
+            raise ValueError(f"Campos no actualizables: {', '.join(sorted(desconocidos))}")
         
-        if not campos:
+        if not datos:
             return PuntoDisposicionService.obtener_punto(punto_id)
         
+        # Texto SQL fijo: se prepara una vez por conexión
+        valores = valores_enviados(datos, _COLUMNAS_ACTUALIZABLES)
         valores.append(punto_id)
-        query = f"UPDATE punto_disposicion SET {', '.join(campos)} WHERE id_disposicion = %s RETURNING *"
-        return execute_insert_returning(query, tuple(valores))
+        return execute_insert_returning(_SQL_ACTUALIZAR_PUNTO, tuple(valores), preparada=True)
 
     @staticmethod
     def eliminar_punto(punto_id: int) -> bool:
@@ -98,5 +140,9 @@ class PuntoDisposicionService:
     @staticmethod
     def obtener_puntos_por_tipo(tipo: str) -> List[Dict]:
         """Obtener todos los puntos de un tipo específico"""
-        query = "SELECT * FROM punto_disposicion WHERE tipo = %s ORDER BY nombre"
-        return execute_query(query, (tipo,))
+        # Columnas cubiertas por idx_punto_disp_tipo_nombre: index-only scan ya ordenado por nombre
+        query = """
+            SELECT id_disposicion, nombre, tipo, latitud, longitud, capacidad_diaria_ton
+            FROM punto_disposicion WHERE tipo = %s ORDER BY nombre
+        """
+        return execute_query(query, (tipo,), preparada=True)
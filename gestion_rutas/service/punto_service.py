@@ -4,13 +4,135 @@ Usando PostgreSQL directo sin SQLAlchemy
 """
 
 from typing import List, Optional, Dict
+from dataclasses import dataclass
 from datetime import datetime
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from ..database.db import engine, execute_query, execute_query_one, execute_query_stream, execute_insert_returning, execute_insert_update_delete, separar_total, set_enviados, valores_enviados
 import logging
 import math
+import threading
+from itertools import islice
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 logger = logging.getLogger(__name__)
 
+RADIO_TIERRA_KM = 6371
+
+# Columnas de PuntoRecoleccionUpdate
+_COLUMNAS_ACTUALIZABLES = ('id_zona', 'nombre', 'tipo', 'latitud', 'longitud', 'capacidad_kg', 'estado')
+_SQL_ACTUALIZAR_PUNTO = (
+    "UPDATE punto_recoleccion SET "
+    + set_enviados(_COLUMNAS_ACTUALIZABLES)
+    + ", fecha_actualizacion = %s WHERE id = %s RETURNING id, "
+    + ", ".join(_COLUMNAS_ACTUALIZABLES)
+    + ", fecha_actualizacion"
+)
+
+# Coordenadas de los puntos activos en layout SoA (ids, lats y lons en radianes como
+# arrays contiguos, más cos(lat) precalculado). Se reutilizan mientras no cambie el token de la tabla.
+_coord_cache = {'token': None, 'ids': None, 'lats': None, 'lons': None, 'cos_lats': None}
+_cache_lock = threading.Lock()
+
+_BLOQUE_STREAM = 10000
+
+
+@dataclass(slots=True, frozen=True)
+class PuntoCoord:
+    """Fila (id, latitud, longitud) sin el dict por fila de execute_query"""
+    id: int
+    latitud: float
+    longitud: float
+
+
+_SQL_TOKEN_ACTIVOS = (
+    "SELECT MAX(fecha_actualizacion) AS ultima, COUNT(*) AS n, MAX(id) AS max_id "
+    "FROM punto_recoleccion WHERE estado_activo = TRUE"
+)
+
+
+def _invalidar_activos() -> None:
+    with _cache_lock:
+        _coord_cache['token'] = None
+
+
+def _coordenadas_activas() -> tuple:
+    """(ids, lats, lons, cos_lats) de los puntos activos; solo se releen si cambió la tabla"""
+    fila = execute_query_one(_SQL_TOKEN_ACTIVOS, preparada=True)
+    token = (fila['ultima'], fila['n'], fila['max_id']) if fila else None
+    with _cache_lock:
+        if token is not None and _coord_cache['token'] == token:
+            return _coord_cache['ids'], _coord_cache['lats'], _coord_cache['lons'], _coord_cache['cos_lats']
+
+    # Mismo orden que obtener_puntos_activos (desempate estable en la búsqueda).
+    # Se lee por bloques con un cursor del servidor: nunca hay más de un bloque de filas en memoria
+    filas = execute_query_stream(
+        "SELECT id, latitud, longitud FROM punto_recoleccion WHERE estado_activo = TRUE ORDER BY nombre",
+        itersize=_BLOQUE_STREAM,
+        clase=PuntoCoord
+    )
+    bloques_ids, bloques_lats, bloques_lons = [], [], []
+    while True:
+        bloque = list(islice(filas, _BLOQUE_STREAM))
+        if not bloque:
+            break
+        n = len(bloque)
+        bloques_ids.append(np.fromiter((f.id for f in bloque), dtype=np.int64, count=n))
+        bloques_lats.append(np.fromiter((f.latitud for f in bloque), dtype=np.float64, count=n))
+        bloques_lons.append(np.fromiter((f.longitud for f in bloque), dtype=np.float64, count=n))
+    ids = np.concatenate(bloques_ids) if bloques_ids else np.empty(0, dtype=np.int64)
+    lats = np.radians(np.concatenate(bloques_lats)) if bloques_lats else np.empty(0)
+    lons = np.radians(np.concatenate(bloques_lons)) if bloques_lons else np.empty(0)
+    cos_lats = np.cos(lats)
+    with _cache_lock:
+        _coord_cache.update(token=token, ids=ids, lats=lats, lons=lons, cos_lats=cos_lats)
+    return ids, lats, lons, cos_lats
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _haversine_a_lote(lat0, cos_lat0, lon0, lats, cos_lats, lons, out):
+        """Término 'a' de Haversine desde (lat0, lon0) a cada punto; todo en radianes"""
+        for i in prange(lats.shape[0]):
+            out[i] = math.sin((lats[i] - lat0) / 2) ** 2 + cos_lat0 * cos_lats[i] * math.sin((lons[i] - lon0) / 2) ** 2
+
+
+def _haversine_a(lat0: float, cos_lat0: float, lon0: float, lats: np.ndarray, cos_lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Término 'a' de Haversine desde un origen a muchos puntos (coordenadas en radianes).
+    La distancia es 2R·asin(√a), monótona en a: para filtrar por radio y ordenar
+    basta comparar a, sin calcular asin ni sqrt. cos(lat) del origen y de los puntos
+    llegan precalculados: no cambian entre llamadas.
+    """
+    if njit is not None:
+        out = np.empty_like(lats)
+        _haversine_a_lote(lat0, cos_lat0, lon0, lats, cos_lats, lons, out)
+        return out
+    return np.sin((lats - lat0) / 2) ** 2 + cos_lat0 * cos_lats * np.sin((lons - lon0) / 2) ** 2
+
+
+# ¿Existe punto_recoleccion.geog (PostGIS, ver crear_indices_rendimiento)? Se consulta una vez
+_geog_disponible: Optional[bool] = None
+
+
+def _usar_postgis() -> bool:
+    """Indicar si la búsqueda por radio puede resolverse en PostgreSQL con el índice espacial"""
+    global _geog_disponible
+    if _geog_disponible is None:
+        _geog_disponible = False
+        if engine.dialect.name == "postgresql":
+            try:
+                _geog_disponible = execute_query_one(
+                    "SELECT 1 AS ok FROM information_schema.columns "
+                    "WHERE table_name = 'punto_recoleccion' AND column_name = 'geog'"
+                ) is not None
+            except Exception as e:
+                logger.warning(f"No se pudo verificar la columna geog: {e}")
+    return _geog_disponible
+
 
 class PuntoService:
     """Servicio para operaciones con Puntos de Entrega"""
@@ -33,7 +155,9 @@ class PuntoService:
                 punto_data.get('tipo_punto', 'recoleccion'),
                 punto_data.get('estado_activo', True)
             )
-            resultado = execute_insert_returning(query, params)
+            # INSERT de texto fijo: se prepara una vez por conexión del pool
+            resultado = execute_insert_returning(query, params, preparada=True)
+            _invalidar_activos()
             logger.info(f"Punto creado: {resultado.get('nombre')}")
             return resultado
         except Exception as e:
@@ -51,9 +175,14 @@ class PuntoService:
         tipo_punto: Optional[str] = None,
         estado_activo: Optional[bool] = None,
         skip: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        despues_de_id: Optional[int] = None
     ) -> tuple[List[Dict], int]:
-        """Obtener puntos con filtros opcionales"""
+        """
+        Obtener puntos con filtros opcionales.
+        Con despues_de_id (último id_punto recibido) se pagina por clave en lugar de
+        OFFSET; en ese modo el total cuenta las filas restantes.
+        """
         where_conditions = []
         params = []
 
@@ -65,49 +194,41 @@ class PuntoService:
             estado_str = 'activo' if estado_activo else 'inactivo'
             where_conditions.append("estado = %s")
             params.append(estado_str)
+        if despues_de_id is not None:
+            where_conditions.append("id_punto > %s")
+            params.append(despues_de_id)
+            skip = 0
 
         where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
 
-        count_query = f"SELECT COUNT(*) as total FROM punto_recoleccion WHERE {where_clause}"
-        total_result = execute_query_one(count_query, tuple(params))
-        
+        # Página y total en una sola consulta
         # FIX: Usar nombres de columnas correctos según models.py
-        query = f"SELECT * FROM punto_recoleccion WHERE {where_clause} ORDER BY id_punto OFFSET %s LIMIT %s"
+        query = f"SELECT *, COUNT(*) OVER () AS total FROM punto_recoleccion WHERE {where_clause} ORDER BY id_punto OFFSET %s LIMIT %s"
         params.extend([skip, limit])
         
         puntos = execute_query(query, tuple(params))
-        total = total_result['total'] if total_result else 0
-        
-        return puntos, total
-        total = total_result.get('total', 0) if total_result else 0
-
-        query = f"SELECT * FROM punto_recoleccion WHERE {where_clause} LIMIT %s OFFSET %s"
-        params.extend([limit, skip])
-        puntos = execute_query(query, tuple(params))
-        return puntos, total
+        conteo = f"SELECT COUNT(*) AS total FROM punto_recoleccion WHERE {where_clause}"
+        return separar_total(puntos, skip=skip, consulta_conteo=conteo, params_conteo=tuple(params[:-2]))
 
     @staticmethod
     def actualizar_punto(punto_id: int, punto_data: Dict) -> Optional[Dict]:
         """Actualizar punto de entrega"""
         try:
-            if not punto_data:
-                return PuntoService.obtener_punto(punto_id)
+            desconocidos = set(punto_data) - set(_COLUMNAS_ACTUALIZABLES) - {'id', 'fecha_creacion'}
+            if desconocidos:
+                raise ValueError(f"Campos no actualizables: {', '.join(sorted(desconocidos))}")
 
-            set_clauses = []
-            params = []
-            for key, value in punto_data.items():
-                if key not in ['id', 'fecha_creacion']:
-                    set_clauses.append(f"{key} = %s")
-                    params.append(value)
-
-            if not set_clauses:
+            if not any(col in punto_data for col in _COLUMNAS_ACTUALIZABLES):
                 return PuntoService.obtener_punto(punto_id)
 
+            # Texto SQL fijo (cada columna lleva un indicador de "enviada"; un None enviado
+            # la limpia): se prepara una vez por conexión en lugar de planificar cada combinación
+            params = valores_enviados(punto_data, _COLUMNAS_ACTUALIZABLES)
+
             params.append(datetime.utcnow())
             params.append(punto_id)
-
-            query = f"UPDATE punto_recoleccion SET {', '.join(set_clauses)}, fecha_actualizacion = %s WHERE id = %s RETURNING *"
-            resultado = execute_insert_returning(query, tuple(params))
+            resultado = execute_insert_returning(_SQL_ACTUALIZAR_PUNTO, tuple(params), preparada=True)
+            _invalidar_activos()
             logger.info(f"Punto {punto_id} actualizado")
             return resultado
         except Exception as e:
@@ -120,6 +241,7 @@ class PuntoService:
         try:
             query = "DELETE FROM punto_recoleccion WHERE id = %s"
             rowcount = execute_insert_update_delete(query, (punto_id,))
+            _invalidar_activos()
             logger.info(f"Punto {punto_id} eliminado")
             return rowcount > 0
         except Exception as e:
@@ -143,7 +265,7 @@ class PuntoService:
         Calcular distancia entre dos puntos usando fórmula Haversine
         Retorna distancia en kilómetros
         """
-        R = 6371  # Radio de la Tierra en km
+        R = RADIO_TIERRA_KM
         lat1_rad = math.radians(lat1)
         lat2_rad = math.radians(lat2)
         delta_lat = math.radians(lat2 - lat1)
@@ -160,18 +282,61 @@ class PuntoService:
         longitud: float,
         radio_km: float = 5.0
     ) -> List[Dict]:
-        """Obtener puntos cercanos a una coordenada (aproximado)"""
-        puntos_activos = PuntoService.obtener_puntos_activos()
-        puntos_cercanos = []
-
-        for punto in puntos_activos:
-            distancia = PuntoService.calcular_distancia(
-                latitud, longitud,
-                punto['latitud'], punto['longitud']
-            )
-            if distancia <= radio_km:
-                puntos_cercanos.append(punto)
+        """Obtener puntos cercanos a una coordenada (aproximado), ordenados por distancia"""
+        if _usar_postgis():
+            # Filtro con el índice SP-GiST sobre geog; el orden solo ordena los puntos del radio
+            query = """
+                SELECT * FROM punto_recoleccion
+                WHERE estado_activo = TRUE
+                  AND ST_DWithin(geog, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, %s)
+                ORDER BY ST_Distance(geog, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography)
+            """
+            puntos = execute_query(query, (longitud, latitud, radio_km * 1000, longitud, latitud))
+            for punto in puntos:
+                punto.pop('geog', None)
+            return puntos
+
+        if radio_km < 0:
+            return []
+        ids, lats, lons, cos_lats = _coordenadas_activas()
+        if ids.size == 0:
+            return []
+
+        # d <= radio  <=>  a <= sin²(radio / 2R)  (hasta medio meridiano; más allá entra todo)
+        umbral = 1.0 if radio_km >= math.pi * RADIO_TIERRA_KM else math.sin(radio_km / (2 * RADIO_TIERRA_KM)) ** 2
+
+        lat0, lon0 = math.radians(latitud), math.radians(longitud)
+        cos_lat0 = math.cos(lat0)
+
+        # Prefiltro por caja envolvente: comparaciones baratas descartan los puntos lejanos
+        # antes de la trigonometría. Semiancho en longitud exacto (asin(sin δ / cos φ0)),
+        # así la caja siempre contiene el círculo; sin filtro de longitud si alcanza un polo
+        candidatos = None
+        delta = radio_km / RADIO_TIERRA_KM
+        if delta < math.pi / 2:
+            caja = np.abs(lats - lat0) <= delta
+            if math.sin(delta) < cos_lat0:
+                dlon = math.asin(math.sin(delta) / cos_lat0)
+                dif_lon = np.abs(lons - lon0)
+                caja &= np.minimum(dif_lon, 2 * math.pi - dif_lon) <= dlon
+            candidatos = np.flatnonzero(caja)
+            if candidatos.size == 0:
+                return []
+            lats, lons, cos_lats = lats[candidatos], lons[candidatos], cos_lats[candidatos]
+
+        # Haversine solo sobre los candidatos (Numba si está instalado)
+        a = _haversine_a(lat0, cos_lat0, lon0, lats, cos_lats, lons)
+
+        idx = np.flatnonzero(a <= umbral)
+        if idx.size == 0:
+            return []
+        orden = idx[np.argsort(a[idx], kind='stable')]
+        if candidatos is not None:
+            orden = candidatos[orden]
+        ids_cercanos = ids[orden].tolist()
 
-        return sorted(puntos_cercanos, key=lambda p: PuntoService.calcular_distancia(
-            latitud, longitud, p['latitud'], p['longitud']
-        ))
+        # Filas completas solo de los puntos dentro del radio
+        marcadores = ", ".join(["%s"] * len(ids_cercanos))
+        filas = execute_query(f"SELECT * FROM punto_recoleccion WHERE id IN ({marcadores})", tuple(ids_cercanos))
+        por_id = {f['id']: f for f in filas}
+        return [por_id[i] for i in ids_cercanos if i in por_id]
@@ -10,24 +10,120 @@ OSRM proporciona:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional, Tuple
 from ..models.base import Punto
 import logging
 from functools import lru_cache
+from pathlib import Path
 import json
+import os
+import sqlite3
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+OSRM_URL = "http://router.project-osrm.org/route/v1/driving"
+
+# Sesión HTTP compartida: reutiliza conexiones keep-alive con OSRM en vez de
+# abrir un TCP nuevo por request
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+# Caché persistente de rutas entre dos puntos (sobrevive reinicios del servidor). Es un
+# SQLite en modo WAL: varios workers (procesos) pueden leer y escribir a la vez
+OSRM_CACHE_PATH = os.getenv(
+    "OSRM_CACHE_PATH", str(Path(__file__).resolve().parent.parent / "osrm_rutas_cache.sqlite")
+)
+
+# ~1 m de precisión: coordenadas que difieren en ruido de punto flotante comparten entrada
+DECIMALES_CACHE = 5
+
+
+def _leer_disco(clave: str) -> Optional[str]:
+    """Leer una ruta (JSON) del caché en disco; si no existe o falla se trata como ausente"""
+    if not os.path.exists(OSRM_CACHE_PATH):
+        return None
+    try:
+        # Solo lectura: un lector nunca crea ni bloquea el archivo
+        conn = sqlite3.connect(f"file:{OSRM_CACHE_PATH}?mode=ro", uri=True, timeout=5)
+        try:
+            fila = conn.execute("SELECT ruta FROM rutas WHERE clave = ?", (clave,)).fetchone()
+        finally:
+            conn.close()
+        return fila[0] if fila else None
+    except sqlite3.Error as e:
+        logger.warning(f"No se pudo leer el caché OSRM en disco: {e}")
+        return None
+
+
+def _guardar_disco(clave: str, ruta: str) -> None:
+    """Guardar una ruta (JSON) en el caché en disco (best-effort)"""
+    try:
+        conn = sqlite3.connect(OSRM_CACHE_PATH, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS rutas (clave TEXT PRIMARY KEY, ruta TEXT NOT NULL)")
+            conn.execute("INSERT OR REPLACE INTO rutas (clave, ruta) VALUES (?, ?)", (clave, ruta))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"No se pudo guardar el caché OSRM en disco: {e}")
+
+
+@lru_cache(maxsize=4096)
+def _osrm_ruta_cached(o_lon: float, o_lat: float, d_lon: float, d_lat: float) -> str:
+    """
+    Ruta OSRM entre dos coordenadas ya redondeadas, como texto JSON (inmutable: cada
+    llamador decodifica su propia copia).
+    Lanza LookupError si OSRM no devuelve ruta (lru_cache no guarda excepciones).
+    """
+    coords = f"{o_lon},{o_lat};{d_lon},{d_lat}"
+    
+    guardada = _leer_disco(coords)
+    if guardada is not None:
+        logger.debug("Ruta obtenida del caché en disco")
+        return guardada
+    
+    params = {
+        "steps": "true",
+        "geometries": "geojson",
+        "overview": "full",
+        "annotations": "true"
+    }
+    response = _session.get(f"{OSRM_URL}/{coords}", params=params, timeout=10)
+    data = response.json()
+    
+    if data.get("code") == "Ok" and data.get("routes"):
+        ruta = data["routes"][0]
+        result = json.dumps({
+            "geometry": ruta["geometry"]["coordinates"],  # Lista de [lon, lat]
+            "distancia_km": round(ruta["distance"] / 1000, 2),
+            "duracion_minutos": round(ruta["duration"] / 60, 2),
+            "waypoints": data.get("waypoints", [])
+        })
+        _guardar_disco(coords, result)
+        return result
+    
+    raise LookupError(data.get('message', 'Unknown'))
+
 
 class RoutingService:
     """Servicio para enrutamiento usando OSRM (calles reales de OpenStreetMap)"""
     
-    OSRM_URL = "http://router.project-osrm.org/route/v1/driving"
+    OSRM_URL = OSRM_URL
     OSRM_TABLE_URL = "http://router.project-osrm.org/table/v1/driving"
     OSRM_TRIP_URL = "http://router.project-osrm.org/trip/v1/driving"
     
-    # Caché para rutas ya calculadas
-    _route_cache: Dict[str, Dict] = {}
+    # Caché para distancias ya calculadas (las rutas usan _osrm_ruta_cached)
     _distance_cache: Dict[str, float] = {}
     
     @staticmethod
@@ -53,42 +149,12 @@ class RoutingService:
                 - waypoints: Puntos de paso
         """
         try:
-            coords = f"{punto_origen.longitud},{punto_origen.latitud};{punto_destino.longitud},{punto_destino.latitud}"
-            
-            # Verificar caché
-            cache_key = coords
-            if cache_key in RoutingService._route_cache:
-                logger.debug("Ruta obtenida del caché")
-                return RoutingService._route_cache[cache_key]
-            
-            params = {
-                "steps": "true",
-                "geometries": "geojson",
-                "overview": "full",
-                "annotations": "true"
-            }
-            
-            response = requests.get(
-                f"{RoutingService.OSRM_URL}/{coords}", 
-                params=params, 
-                timeout=10
-            )
-            data = response.json()
-            
-            if data.get("code") == "Ok" and data.get("routes"):
-                ruta = data["routes"][0]
-                result = {
-                    "geometry": ruta["geometry"]["coordinates"],  # Lista de [lon, lat]
-                    "distancia_km": round(ruta["distance"] / 1000, 2),
-                    "duracion_minutos": round(ruta["duration"] / 60, 2),
-                    "waypoints": data.get("waypoints", [])
-                }
-                
-                # Guardar en caché
-                RoutingService._route_cache[cache_key] = result
-                return result
-            
-            logger.warning(f"OSRM no pudo calcular ruta: {data.get('message', 'Unknown')}")
+            return json.loads(_osrm_ruta_cached(
+                round(punto_origen.longitud, DECIMALES_CACHE), round(punto_origen.latitud, DECIMALES_CACHE),
+                round(punto_destino.longitud, DECIMALES_CACHE), round(punto_destino.latitud, DECIMALES_CACHE)
+            ))
+        except LookupError as e:
+            logger.warning(f"OSRM no pudo calcular ruta: {e}")
             return None
         except Exception as e:
             logger.error(f"Error en enrutamiento entre puntos: {str(e)}")
@@ -130,7 +196,7 @@ class RoutingService:
             url = f"{RoutingService.OSRM_TRIP_URL}/{coords}"
             logger.info(f" Optimizando ruta con {len(puntos)} puntos")
             
-            response = requests.get(url, params=params, timeout=30)
+            response = _session.get(url, params=params, timeout=30)
             logger.info(f" Respuesta OSRM: Status {response.status_code}")
             
             data = response.json()
@@ -161,16 +227,11 @@ class RoutingService:
             logger.error(f" Error en optimización de ruta: {str(e)}")
             return None
     
-    # @staticmethod
-    # async def obtener_ruta_async(punto_origen: Punto, punto_destino: Punto) -> Optional[Dict]:
-    #     """Versión asíncrona para obtener ruta (mejor rendimiento)"""
-    #     # Requiere aiohttp: pip install aiohttp
-    #     pass
-    
     @staticmethod
-    def obtener_matriz_distancias(puntos: List[Punto]) -> Optional[List[List[float]]]:
+    def obtener_matriz_distancias(puntos: List[Punto]) -> Optional[np.ndarray]:
         """
         Calcula matriz de distancias REALES por calles entre todos los puntos.
+        Devuelve un ndarray float64 contiguo (N×N, km) que OR-Tools/scipy consumen sin copiar.
         """
         if not puntos:
             return None
@@ -181,13 +242,14 @@ class RoutingService:
             url = f"{RoutingService.OSRM_TABLE_URL}/{coords}"
             
             logger.info(f" Calculando matriz para {len(puntos)} puntos")
-            response = requests.get(url, params=params, timeout=60)
-            data = response.json()
+            response = _session.get(url, params=params, timeout=60)
+            # orjson parsea respuestas numéricas grandes bastante más rápido que json
+            data = orjson.loads(response.content) if orjson is not None else response.json()
             
             if data.get("code") == "Ok" and data.get("distances"):
-                distancias_m = data["distances"]
-                distancias_km = [[d / 1000 if d else 0 for d in fila] for fila in distancias_m]
-                logger.info(f" Matriz calculada: {len(distancias_km)}x{len(distancias_km[0])}")
+                # null (par sin ruta) -> NaN -> 0, como antes
+                distancias_km = np.nan_to_num(np.array(data["distances"], dtype=np.float64) / 1000.0, nan=0.0)
+                logger.info(f" Matriz calculada: {distancias_km.shape[0]}x{distancias_km.shape[1]}")
                 return distancias_km
             
             return None
@@ -197,7 +259,17 @@ class RoutingService:
     
     @staticmethod
     def clear_cache():
-        """Limpia el caché de rutas"""
-        RoutingService._route_cache.clear()
+        """Limpia el caché de rutas (memoria y disco)"""
+        _osrm_ruta_cached.cache_clear()
+        try:
+            if os.path.exists(OSRM_CACHE_PATH):
+                conn = sqlite3.connect(OSRM_CACHE_PATH, timeout=5)
+                try:
+                    conn.execute("DELETE FROM rutas")
+                    conn.commit()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo limpiar el caché OSRM en disco: {e}")
         RoutingService._distance_cache.clear()
         logger.info("Caché limpiado")
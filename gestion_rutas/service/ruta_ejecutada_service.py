@@ -2,13 +2,57 @@
 Service Layer para Rutas Ejecutadas - PostgreSQL Directo
 """
 
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 from datetime import date
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from cachetools import TTLCache
+from ..database.db import execute_query, execute_query_one, execute_query_stream, execute_insert_returning, execute_insert_update_delete, separar_total, estimar_total, set_enviados, valores_enviados
+import copy
+import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Columnas de los listados: sin telemetria_json (JSON que puede pesar decenas de KB por
+# fila y que los listados no usan; obtener_ruta_ejecutada sí la incluye)
+COLUMNAS_LISTADO = (
+    "id_ruta_exec, id_ruta, id_camion, fecha, distancia_real_km, duracion_real_min, "
+    "cumplimiento_horario_pct, desviacion_km"
+)
+# Fila completa (detalle, INSERT/UPDATE ... RETURNING)
+_COLUMNAS_RUTA = COLUMNAS_LISTADO + ", telemetria_json"
+
+# Columnas de RutaEjecutadaUpdate
+_COLUMNAS_ACTUALIZABLES = (
+    'id_ruta', 'id_camion', 'fecha', 'distancia_real_km', 'duracion_real_min',
+    'cumplimiento_horario_pct', 'desviacion_km', 'telemetria_json'
+)
+_SQL_ACTUALIZAR_RUTA = (
+    "UPDATE ruta_ejecutada SET "
+    + set_enviados(_COLUMNAS_ACTUALIZABLES)
+    + f" WHERE id_ruta_exec = %s RETURNING {_COLUMNAS_RUTA}"
+)
+
+# Totales de obtener_rutas_ejecutadas por combinación de filtros: las páginas siguientes
+# de un mismo listado no vuelven a contar. Se invalida en cada escritura.
+_cache_totales = TTLCache(maxsize=256, ttl=30)
+_cache_lock = threading.Lock()
+
+
+# Filas de obtener_ruta_ejecutada por id (lecturas de detalle); se invalidan al actualizar o eliminar.
+# Se guardan y entregan copias profundas (telemetria_json puede venir como dict)
+_cache_filas = TTLCache(maxsize=1024, ttl=60)
+
+
+def _invalidar_totales() -> None:
+    with _cache_lock:
+        _cache_totales.clear()
+
+
+def _invalidar_fila(ruta_exec_id: int) -> None:
+    with _cache_lock:
+        _cache_filas.pop(ruta_exec_id, None)
+
 
 class RutaEjecutadaService:
     """Servicio para operaciones con Rutas Ejecutadas"""
@@ -26,15 +70,18 @@ class RutaEjecutadaService:
     ) -> Optional[Dict]:
         """Crear nuevo registro de ruta ejecutada"""
         try:
-            query = """
+            query = f"""
                 INSERT INTO ruta_ejecutada (id_ruta, id_camion, fecha, distancia_real_km, duracion_real_min, 
                                            cumplimiento_horario_pct, desviacion_km, telemetria_json)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING *
+                RETURNING {_COLUMNAS_RUTA}
             """
+            # Un dict no se adapta solo a json: se serializa una vez aquí
+            telemetria = json.dumps(telemetria_json) if telemetria_json is not None else None
             resultado = execute_insert_returning(query, (id_ruta, id_camion, fecha, distancia_real_km, 
                                                          duracion_real_min, cumplimiento_horario_pct, 
-                                                         desviacion_km, telemetria_json))
+                                                         desviacion_km, telemetria), preparada=True)
+            _invalidar_totales()
             if resultado:
                 logger.info(f"Ruta ejecutada {resultado.get('id_ruta_exec')} creada")
             return resultado
@@ -45,8 +92,17 @@ class RutaEjecutadaService:
     @staticmethod
     def obtener_ruta_ejecutada(ruta_exec_id: int) -> Optional[Dict]:
         """Obtener ruta ejecutada por ID"""
-        query = "SELECT * FROM ruta_ejecutada WHERE id_ruta_exec = %s"
-        return execute_query_one(query, (ruta_exec_id,))
+        with _cache_lock:
+            fila = _cache_filas.get(ruta_exec_id)
+        if fila is not None:
+            return copy.deepcopy(fila)
+        
+        query = f"SELECT {_COLUMNAS_RUTA} FROM ruta_ejecutada WHERE id_ruta_exec = %s"
+        fila = execute_query_one(query, (ruta_exec_id,), preparada=True)
+        if fila is not None:
+            with _cache_lock:
+                _cache_filas[ruta_exec_id] = copy.deepcopy(fila)
+        return fila
 
     @staticmethod
     def obtener_rutas_ejecutadas(
@@ -55,9 +111,18 @@ class RutaEjecutadaService:
         fecha_desde: Optional[date] = None,
         fecha_hasta: Optional[date] = None,
         skip: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        cursor_fecha: Optional[date] = None,
+        cursor_id: Optional[int] = None,
+        total_exacto: bool = False
     ) -> tuple[List[Dict], int]:
-        """Obtener rutas ejecutadas con filtros"""
+        """
+        Obtener rutas ejecutadas con filtros.
+        Con cursor_fecha y cursor_id (fecha e id_ruta_exec de la última fila recibida) se
+        pagina por clave en lugar de OFFSET; en ese modo el total cuenta las filas restantes.
+        Sin filtros, en una tabla grande el total es la estimación del planificador
+        salvo que se pida total_exacto.
+        """
         conditions = []
         params = []
         
@@ -73,45 +138,78 @@ class RutaEjecutadaService:
         if fecha_hasta:
             conditions.append("fecha <= %s")
             params.append(fecha_hasta)
+        if cursor_fecha is not None and cursor_id is not None:
+            conditions.append("(fecha, id_ruta_exec) < (%s, %s)")
+            params.extend([cursor_fecha, cursor_id])
+            skip = 0
         
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
         
-        params.extend([skip, limit])
-        query = f"SELECT * FROM ruta_ejecutada{where_clause} ORDER BY fecha DESC OFFSET %s LIMIT %s"
-        rutas = execute_query(query, tuple(params))
+        clave = (id_ruta, id_camion, fecha_desde, fecha_hasta, cursor_fecha, cursor_id)
+        with _cache_lock:
+            total = _cache_totales.get(clave)
+        if total is None and not conditions and not total_exacto:
+            total = estimar_total('ruta_ejecutada')
         
-        count_query = f"SELECT COUNT(*) as total FROM ruta_ejecutada{where_clause}"
-        count_result = execute_query_one(count_query, tuple(params[:-2]) if conditions else ())
-        total = count_result['total'] if count_result else 0
+        params.extend([skip, limit])
+        if total is not None:
+            query = f"SELECT {COLUMNAS_LISTADO} FROM ruta_ejecutada{where_clause} ORDER BY fecha DESC, id_ruta_exec DESC OFFSET %s LIMIT %s"
+            return execute_query(query, tuple(params)), total
         
+        # Página y total en una sola consulta
+        query = f"SELECT {COLUMNAS_LISTADO}, COUNT(*) OVER () AS total FROM ruta_ejecutada{where_clause} ORDER BY fecha DESC, id_ruta_exec DESC OFFSET %s LIMIT %s"
+        conteo = f"SELECT COUNT(*) AS total FROM ruta_ejecutada{where_clause}"
+        rutas, total = separar_total(
+            execute_query(query, tuple(params)), skip=skip, consulta_conteo=conteo, params_conteo=tuple(params[:-2])
+        )
+        if total is not None:
+            with _cache_lock:
+                _cache_totales[clave] = total
         return rutas, total
 
     @staticmethod
     def actualizar_ruta_ejecutada(ruta_exec_id: int, datos: Dict[str, Any]) -> Optional[Dict]:
-        """Actualizar datos de una ruta ejecutada"""
-        campos = []
-        valores = []
-        for key, value in datos.items():
-            if value is not None:
-                campos.append(f"{key} = %s")
-                valores.append(value)
+        """Actualizar datos de una ruta ejecutada (los campos ausentes se conservan; un None enviado limpia el campo)"""
+        desconocidos = set(datos) - set(_COLUMNAS_ACTUALIZABLES)
+        if desconocidos:
+            raise ValueError(f"Campos no actualizables: {', '.join(sorted(desconocidos))}")
         
-        if not campos:
+        if not datos:
             return RutaEjecutadaService.obtener_ruta_ejecutada(ruta_exec_id)
+        if datos.get('telemetria_json') is not None:
+            datos = {**datos, 'telemetria_json': json.dumps(datos['telemetria_json'])}
         
+        # Texto SQL fijo: se prepara una vez por conexión
+        valores = valores_enviados(datos, _COLUMNAS_ACTUALIZABLES)
         valores.append(ruta_exec_id)
-        query = f"UPDATE ruta_ejecutada SET {', '.join(campos)} WHERE id_ruta_exec = %s RETURNING *"
-        return execute_insert_returning(query, tuple(valores))
+        resultado = execute_insert_returning(_SQL_ACTUALIZAR_RUTA, tuple(valores), preparada=True)
+        _invalidar_totales()
+        _invalidar_fila(ruta_exec_id)
+        return resultado
 
     @staticmethod
     def eliminar_ruta_ejecutada(ruta_exec_id: int) -> bool:
         """Eliminar una ruta ejecutada"""
         query = "DELETE FROM ruta_ejecutada WHERE id_ruta_exec = %s"
-        resultado = execute_insert_update_delete(query, (ruta_exec_id,))
+        resultado = execute_insert_update_delete(query, (ruta_exec_id,), preparada=True)
+        _invalidar_totales()
+        _invalidar_fila(ruta_exec_id)
         return resultado > 0
 
     @staticmethod
-    def obtener_rutas_por_camion(id_camion: int) -> List[Dict]:
-        """Obtener historial de rutas ejecutadas por un camión"""
-        query = "SELECT * FROM ruta_ejecutada WHERE id_camion = %s ORDER BY fecha DESC"
-        return execute_query(query, (id_camion,))
+    def obtener_rutas_por_camion(id_camion: int, limit: Optional[int] = 500) -> List[Dict]:
+        """
+        Obtener historial de rutas ejecutadas por un camión (las limit más recientes;
+        limit=None trae todo). Para recorrer historiales largos usar obtener_rutas_por_camion_iter.
+        """
+        if limit is None:
+            query = f"SELECT {COLUMNAS_LISTADO} FROM ruta_ejecutada WHERE id_camion = %s ORDER BY fecha DESC"
+            return execute_query(query, (id_camion,), preparada=True)
+        query = f"SELECT {COLUMNAS_LISTADO} FROM ruta_ejecutada WHERE id_camion = %s ORDER BY fecha DESC LIMIT %s"
+        return execute_query(query, (id_camion, limit), preparada=True)
+
+    @staticmethod
+    def obtener_rutas_por_camion_iter(id_camion: int, itersize: int = 1000) -> Iterator[Dict]:
+        """Recorrer el historial completo de un camión con un cursor del servidor (itersize filas por viaje)"""
+        query = f"SELECT {COLUMNAS_LISTADO} FROM ruta_ejecutada WHERE id_camion = %s ORDER BY fecha DESC"
+        return execute_query_stream(query, (id_camion,), itersize=itersize)
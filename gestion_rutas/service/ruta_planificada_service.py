@@ -3,12 +3,289 @@ Service Layer para Rutas Planificadas - PostgreSQL Directo
 """
 
 from typing import List, Optional, Dict, Any
-from datetime import date
+from datetime import date, timedelta
+import copy
+import json
 import logging
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+import math
+import os
+import threading
+import numpy as np
+from cachetools import TTLCache
+from ..database.db import engine, execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete, execute_values_returning, separar_total, estimar_total, set_enviados, valores_enviados
+from .ruta_ejecutada_service import COLUMNAS_LISTADO as COLUMNAS_EJECUTADA
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Volcado del payload de crear_ruta para depuración: solo con LAR_DEBUG_PAYLOAD=1.
+# Una línea JSON por intento; el archivo se reinicia al superar el tamaño máximo.
+DEBUG_PAYLOAD = os.getenv("LAR_DEBUG_PAYLOAD", "0") != "0"
+_DEBUG_PAYLOAD_ARCHIVO = "debug_payload_last_attempt.json"
+_DEBUG_PAYLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+# Totales de obtener_rutas por combinación de filtros: las páginas siguientes de un
+# mismo listado no vuelven a contar. Se invalida en cada escritura.
+_cache_totales = TTLCache(maxsize=256, ttl=30)
+_cache_lock = threading.Lock()
+
+# Consultas de obtener_rutas precalculadas por máscara de filtros presentes (bit i =
+# _FILTROS_LISTADO[i]) y por si incluyen el total: el texto SQL es siempre el mismo
+# para una combinación, así PostgreSQL reutiliza el plan y pg_stat_statements agrupa.
+# OFFSET %s LIMIT %s es neutro: db.py lo reescribe para SQLite
+_FILTROS_LISTADO = ("id_zona = %s", "id_turno = %s", "fecha >= %s", "fecha <= %s", "(fecha, id_ruta) < (%s, %s)")
+
+
+def _where_listado(mascara: int) -> str:
+    condiciones = [f for i, f in enumerate(_FILTROS_LISTADO) if mascara >> i & 1]
+    return " WHERE " + " AND ".join(condiciones) if condiciones else ""
+
+
+def _sql_listado(mascara: int, con_total: bool) -> str:
+    columnas = "*, COUNT(*) OVER () AS total" if con_total else "*"
+    return f"SELECT {columnas} FROM ruta_planificada{_where_listado(mascara)} ORDER BY fecha DESC, id_ruta DESC OFFSET %s LIMIT %s"
+
+
+_SQL_LISTADO = {
+    (mascara, con_total): _sql_listado(mascara, con_total)
+    for mascara in range(1 << len(_FILTROS_LISTADO))
+    for con_total in (False, True)
+}
+# Total cuando la página sale vacía (skip más allá del final), ver separar_total
+_SQL_CONTEO = {
+    mascara: f"SELECT COUNT(*) AS total FROM ruta_planificada{_where_listado(mascara)}"
+    for mascara in range(1 << len(_FILTROS_LISTADO))
+}
+
+# Columnas de ruta_planificada en INSERT/RETURNING; con geometria_bin se agrega al final.
+# Toda sentencia preparada lista columnas explícitas: con SELECT * el plan cacheado queda
+# inválido si cambia el esquema de la tabla
+_COLUMNAS_INSERTAR = (
+    "id_zona, id_turno, fecha, secuencia_puntos, distancia_planificada_km, "
+    "duracion_planificada_min, version_modelo_vrp, geometria_json"
+)
+_COLUMNAS_RUTA = "id_ruta, " + _COLUMNAS_INSERTAR
+
+# Columnas actualizables de ruta_planificada; las JSON se serializan antes de enviarlas
+_COLUMNAS_ACTUALIZABLES = (
+    'id_zona', 'id_turno', 'fecha', 'secuencia_puntos', 'distancia_planificada_km',
+    'duracion_planificada_min', 'version_modelo_vrp', 'geometria_json'
+)
+_COLUMNAS_JSON = ('secuencia_puntos', 'geometria_json')
+# Nombres de RutaPlanificadaUpdate (y de crear_ruta) que difieren de la columna
+_ALIAS_ACTUALIZABLES = {
+    'distancia_km': 'distancia_planificada_km',
+    'tiempo_estimado_min': 'duracion_planificada_min',
+    'duracion_min': 'duracion_planificada_min',
+}
+_SQL_ACTUALIZAR_RUTA = (
+    "UPDATE ruta_planificada SET "
+    + set_enviados(_COLUMNAS_ACTUALIZABLES)
+    + f" WHERE id_ruta = %s RETURNING {_COLUMNAS_RUTA}"
+)
+# Con geometria_bin: si se envía geometría se reemplazan ambas columnas (la que no se usa
+# queda en NULL), así una lectura nunca ve la geometría anterior
+_COLUMNAS_ACTUALIZABLES_BIN = _COLUMNAS_ACTUALIZABLES + ('geometria_bin',)
+_SQL_ACTUALIZAR_RUTA_BIN = (
+    "UPDATE ruta_planificada SET "
+    + set_enviados(_COLUMNAS_ACTUALIZABLES_BIN)
+    + f" WHERE id_ruta = %s RETURNING {_COLUMNAS_RUTA}, geometria_bin"
+)
+
+# ¿Existe ruta_planificada.geometria_bin (ver crear_indices_rendimiento)? Se consulta una vez
+_geometria_bin_disponible: Optional[bool] = None
+
+
+# Filas de obtener_ruta por id (vista de detalle); se invalidan al actualizar o eliminar.
+# Se guardan y entregan copias profundas: secuencia_puntos y geometria_json son listas
+_cache_filas = TTLCache(maxsize=1024, ttl=60)
+
+# Ruta(s) y agregados de sus ejecuciones en una sola consulta; los promedios ignoran
+# valores nulos o en cero, igual que el cálculo original en Python. Se usa un LEFT JOIN
+# a un subquery agrupado (no LATERAL) para que también funcione en SQLite
+_SQL_METRICAS = """
+    SELECT r.id_ruta, r.id_zona, r.secuencia_puntos, r.distancia_planificada_km, r.duracion_planificada_min,
+           COALESCE(e.n, 0) AS n, e.dist_avg, e.dur_avg, e.desv_avg, e.cum_avg
+    FROM ruta_planificada r
+    LEFT JOIN (
+        SELECT id_ruta,
+               COUNT(*) AS n,
+               AVG(distancia_real_km) FILTER (WHERE distancia_real_km <> 0) AS dist_avg,
+               AVG(duracion_real_min) FILTER (WHERE duracion_real_min <> 0) AS dur_avg,
+               AVG(desviacion_km) FILTER (WHERE desviacion_km <> 0) AS desv_avg,
+               AVG(cumplimiento_horario_pct) FILTER (WHERE cumplimiento_horario_pct <> 0) AS cum_avg
+        FROM ruta_ejecutada
+        WHERE id_ruta IN ({ids})
+        GROUP BY id_ruta
+    ) e ON e.id_ruta = r.id_ruta
+    WHERE r.id_ruta IN ({ids})
+"""
+
+
+def _metricas_desde_fila(ruta: Dict) -> Dict[str, Any]:
+    """Armar el dict de métricas a partir de una fila de _SQL_METRICAS"""
+    metricas = {
+        "ruta_id": ruta['id_ruta'],
+        "zona_id": ruta.get('id_zona'),
+        "total_ejecuciones": ruta['n'],
+        "distancia_planificada_km": ruta.get('distancia_planificada_km') or 0,
+        "duracion_planificada_min": ruta.get('duracion_planificada_min') or 0,
+        "puntos_en_ruta": len(ruta.get('secuencia_puntos', [])) if ruta.get('secuencia_puntos') else 0,
+    }
+
+    if ruta['dist_avg'] is not None:
+        metricas["distancia_real_promedio"] = ruta['dist_avg']
+        metricas["desviacion_distancia_promedio_km"] = ruta['desv_avg'] if ruta['desv_avg'] is not None else 0
+    if ruta['dur_avg'] is not None:
+        metricas["duracion_real_promedio_min"] = ruta['dur_avg']
+    if ruta['cum_avg'] is not None:
+        metricas["cumplimiento_horario_promedio_pct"] = ruta['cum_avg']
+
+    return metricas
+
+
+def _sanitizar_json(obj):
+    """Convertir tipos numpy a nativos y NaN/Inf a 0.0 (PostgreSQL rechaza NaN en JSON)"""
+    if obj is None:
+        return None
+    if isinstance(obj, (float, np.floating)):
+        if math.isnan(obj) or math.isinf(obj):
+            return 0.0
+        return float(obj)
+    elif isinstance(obj, (int, np.integer)):
+        return int(obj)
+    elif isinstance(obj, list) or isinstance(obj, np.ndarray):
+        return [_sanitizar_json(x) for x in obj]
+    elif isinstance(obj, dict):
+        return {k: _sanitizar_json(v) for k, v in obj.items()}
+    return obj
+
+
+def _sanitizar_geometria(geometria):
+    """
+    NaN/Inf -> 0.0 en la geometría. Una lista de pares [lat, lon] (o un ndarray) se limpia
+    con np.nan_to_num en una sola pasada; estructuras heterogéneas usan _sanitizar_json.
+    Con orjson se devuelve el ndarray (copia contigua) y se serializa sin pasar por listas.
+    """
+    if isinstance(geometria, (list, np.ndarray)):
+        try:
+            arr = np.array(geometria, dtype=np.float64)
+        except (TypeError, ValueError):
+            return _sanitizar_json(geometria)
+        np.nan_to_num(arr, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        return arr if orjson is not None else arr.tolist()
+    return _sanitizar_json(geometria)
+
+
+def _usar_geometria_bin() -> bool:
+    """Indicar si la geometría se guarda empaquetada en geometria_bin (BYTEA)"""
+    global _geometria_bin_disponible
+    if _geometria_bin_disponible is None:
+        _geometria_bin_disponible = False
+        if engine.dialect.name == "postgresql":
+            try:
+                _geometria_bin_disponible = execute_query_one(
+                    "SELECT 1 AS ok FROM information_schema.columns "
+                    "WHERE table_name = 'ruta_planificada' AND column_name = 'geometria_bin'"
+                ) is not None
+            except Exception as e:
+                logger.warning(f"No se pudo verificar la columna geometria_bin: {e}")
+    return _geometria_bin_disponible
+
+
+def _columnas_lectura() -> str:
+    """Columnas de una fila completa de ruta_planificada (con geometria_bin si existe)"""
+    return _COLUMNAS_RUTA + (", geometria_bin" if _usar_geometria_bin() else "")
+
+
+# Geometría empaquetada en punto fijo: int32 en microgrados (1e-6° ≈ 0,11 m). Mismo
+# tamaño que float32 (8 bytes por punto) pero con error uniforme; float32 pierde hasta
+# ~0,8 m en longitudes como -70°. ±180° = ±1,8e8 cabe holgado en int32
+_ESCALA_GEOMETRIA = 1e6
+
+
+def _empaquetar_geometria(geometria) -> Optional[bytes]:
+    """
+    Geometría [[lat, lon], ...] como pares int32 en microgrados (8 bytes por punto en
+    lugar de ~40 en JSONB). None si no es una lista de pares numéricos (se guarda como JSON).
+    """
+    try:
+        arr = np.array(geometria, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if arr.ndim != 2 or arr.shape[1] != 2:
+        return None
+    np.nan_to_num(arr, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.rint(arr * _ESCALA_GEOMETRIA).astype(np.int32).tobytes()
+
+
+def _desempaquetar_geometria(datos) -> List[List[float]]:
+    """Inversa de _empaquetar_geometria (coordenadas con 6 decimales)"""
+    arr = np.frombuffer(datos, dtype=np.int32).reshape(-1, 2)
+    return (arr / _ESCALA_GEOMETRIA).tolist()
+
+
+def _expandir_geometria(fila: Optional[Dict]) -> Optional[Dict]:
+    """Reemplazar geometria_bin (si la fila la trae) por la lista de geometria_json"""
+    if fila is None:
+        return None
+    datos = fila.pop('geometria_bin', None)
+    if datos is not None:
+        fila['geometria_json'] = _desempaquetar_geometria(datos)
+    return fila
+
+
+def _expandir_geometrias(filas: List[Dict]) -> List[Dict]:
+    for fila in filas:
+        _expandir_geometria(fila)
+    return filas
+
+
+def _a_json(obj) -> str:
+    """
+    Serializar a texto JSON. Con orjson los tipos numpy se serializan en C sin recorrer
+    la estructura en Python (los NaN saldrían como null: la geometría se sanitiza antes).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(_sanitizar_json(obj))
+
+
+def _volcar_payload_debug(payload: Dict) -> None:
+    """Agregar el payload al archivo de depuración (se trunca al pasar _DEBUG_PAYLOAD_MAX_BYTES)"""
+    try:
+        modo = "a"
+        if os.path.exists(_DEBUG_PAYLOAD_ARCHIVO) and os.path.getsize(_DEBUG_PAYLOAD_ARCHIVO) > _DEBUG_PAYLOAD_MAX_BYTES:
+            modo = "w"
+        with open(_DEBUG_PAYLOAD_ARCHIVO, modo, encoding="utf-8") as f:
+            f.write(_a_json(payload) + "\n")
+        logger.debug(f"Payload dumped to {_DEBUG_PAYLOAD_ARCHIVO}")
+    except Exception as e:
+        logger.error(f"Failed to dump debug payload: {e}")
+
+
+def _sanitizar_metrica(valor, convertir):
+    """NaN/Inf -> 0 y tipos numpy -> nativos (convertir: float o int) para distancia/duración"""
+    if valor is not None and isinstance(valor, (float, np.floating)):
+        if math.isnan(valor) or math.isinf(valor):
+            return convertir(0)
+        return convertir(valor)
+    return valor
+
+
+def _invalidar_totales() -> None:
+    with _cache_lock:
+        _cache_totales.clear()
+
+
+def _invalidar_fila(ruta_id: int) -> None:
+    with _cache_lock:
+        _cache_filas.pop(ruta_id, None)
+
 
 class RutaPlanificadaService:
     """Servicio para operaciones de Rutas Planificadas"""
@@ -27,63 +304,36 @@ class RutaPlanificadaService:
     ) -> Dict:
         """Crear una nueva ruta planificada"""
         try:
-            # Convertir geometría a JSON string si es necesario (psycopg2 suele manejar listas/dicts a JSONB automáticamente)
-            import json
-            import math
-            import numpy as np
-
-            def sanitize_for_json(obj):
-                if obj is None:
-                    return None
-                if isinstance(obj, (float, np.floating)):
-                    if math.isnan(obj) or math.isinf(obj):
-                        return 0.0
-                    return float(obj)
-                elif isinstance(obj, (int, np.integer)):
-                    return int(obj)
-                elif isinstance(obj, list) or isinstance(obj, np.ndarray):
-                    return [sanitize_for_json(x) for x in obj]
-                elif isinstance(obj, dict):
-                    return {k: sanitize_for_json(v) for k, v in obj.items()}
-                return obj
-            
             # Log para depuración de datos antes de insertar
             logger.info(f"Intentando guardar ruta: Zona={id_zona}, Turno={id_turno}, Puntos={len(secuencia_puntos) if secuencia_puntos else 0}")
             logger.info(f"   Datos: Distancia={distancia_km}, Duracion={duracion_min}, Fecha={fecha}")
-            logger.info(f"   Geometria Puntos: {len(geometria_json) if geometria_json else 0}")
-            
-            # Sanitize geometry and sequence to avoid NaN/Inf which Postgres JSONB rejects
-            if geometria_json:
-                geometria_json = sanitize_for_json(geometria_json)
+            logger.info(f"   Geometria Puntos: {len(geometria_json) if geometria_json is not None else 0}")
             
-            if secuencia_puntos:
-                secuencia_puntos = sanitize_for_json(secuencia_puntos)
-
-            geometria_str = json.dumps(geometria_json) if geometria_json else None
-            secuencia_str = json.dumps(secuencia_puntos) if secuencia_puntos else "[]"
+            # Sanitize geometry to avoid NaN/Inf which Postgres JSONB rejects
+            # (secuencia_puntos son enteros: _a_json ya maneja los tipos numpy). La geometría
+            # puede ser un ndarray, por eso se usa len() y no su valor de verdad
+            geometria_str = None
+            geometria_bin = None
+            usar_bin = _usar_geometria_bin()
+            if geometria_json is not None and len(geometria_json):
+                geometria_json = _sanitizar_geometria(geometria_json)
+                if usar_bin:
+                    geometria_bin = _empaquetar_geometria(geometria_json)
+                if geometria_bin is None:
+                    geometria_str = _a_json(geometria_json)
+            secuencia_str = _a_json(secuencia_puntos) if secuencia_puntos else "[]"
 
             # Sanitize scalars
-            if distancia_km is not None:
-                if isinstance(distancia_km, (float, np.floating)):
-                     if math.isnan(distancia_km) or math.isinf(distancia_km):
-                        distancia_km = 0.0
-                     else:
-                        distancia_km = float(distancia_km)
-
-            if duracion_min is not None:
-                if isinstance(duracion_min, (float, np.floating)):
-                    if math.isnan(duracion_min) or math.isinf(duracion_min):
-                        duracion_min = 0
-                    else:
-                        duracion_min = int(duracion_min)
+            distancia_km = _sanitizar_metrica(distancia_km, float)
+            duracion_min = _sanitizar_metrica(duracion_min, int)
             
             # Truncate version string to fit VARCHAR(50)
             if len(version_vrp) > 50:
                 version_vrp = version_vrp[:50]
 
-            # --- DEBUG: DUMP PAYLOAD TO FILE ---
-            try:
-                debug_payload = {
+            # --- DEBUG: DUMP PAYLOAD TO FILE (LAR_DEBUG_PAYLOAD=1) ---
+            if DEBUG_PAYLOAD:
+                _volcar_payload_debug({
                     "id_zona": id_zona,
                     "id_turno": id_turno,
                     "fecha": str(fecha),
@@ -92,28 +342,23 @@ class RutaPlanificadaService:
                     "tiempo_estimado_min": duracion_min,
                     "version_modelo_vrp": version_vrp,
                     "geometria_json": geometria_json # FULL DUMP
-                }
-                with open("debug_payload_last_attempt.json", "w", encoding="utf-8") as f:
-                    json.dump(debug_payload, f, indent=4, ensure_ascii=False)
-                logger.info("Payload dumped to debug_payload_last_attempt.json")
-            except Exception as e:
-                logger.error(f"Failed to dump debug payload: {e}")
+                })
             # -----------------------------------
 
-            query = """
-                INSERT INTO ruta_planificada 
-                (id_zona, id_turno, fecha, secuencia_puntos,
-                 distancia_planificada_km, duracion_planificada_min, version_modelo_vrp, geometria_json)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id_ruta, id_zona, id_turno, fecha, secuencia_puntos,
-                          distancia_planificada_km, duracion_planificada_min, version_modelo_vrp, geometria_json
-            """
+            valores = [
+                id_zona, id_turno, fecha, secuencia_str,
+                distancia_km, duracion_min, version_vrp, geometria_str
+            ]
+            columnas = _COLUMNAS_INSERTAR
+            if usar_bin:
+                columnas += ", geometria_bin"
+                valores.append(geometria_bin)
+            marcadores = ", ".join(["%s"] * len(valores))
+            query = f"INSERT INTO ruta_planificada ({columnas}) VALUES ({marcadores}) RETURNING id_ruta, {columnas}"
             
             try:
-                resultado = execute_insert_returning(query, (
-                    id_zona, id_turno, fecha, secuencia_str,
-                    distancia_km, duracion_min, version_vrp, geometria_str
-                ))
+                resultado = _expandir_geometria(execute_insert_returning(query, tuple(valores), preparada=True))
+                _invalidar_totales()
                 logger.info(f"Ruta {resultado['id_ruta']} creada exitosamente")
                 return resultado
             except UnicodeDecodeError as ude:
@@ -137,19 +382,64 @@ class RutaPlanificadaService:
             logger.error(f"Error general en crear_ruta: {str(e)}")
             raise
 
+    @staticmethod
+    def crear_rutas_batch(rutas: List[Dict]) -> List[Dict]:
+        """
+        Crear varias rutas planificadas (p. ej. todas las de una corrida VRP) en un solo
+        INSERT ... VALUES por página. Cada elemento usa los nombres de los argumentos de
+        crear_ruta; se sanitizan igual que allí.
+        """
+        usar_bin = _usar_geometria_bin()
+        filas = []
+        for r in rutas:
+            secuencia = r.get('secuencia_puntos')
+            geometria = r.get('geometria_json')
+            geometria_str = None
+            geometria_bin = None
+            if geometria is not None and len(geometria):
+                geometria = _sanitizar_geometria(geometria)
+                if usar_bin:
+                    geometria_bin = _empaquetar_geometria(geometria)
+                if geometria_bin is None:
+                    geometria_str = _a_json(geometria)
+            fila = (
+                r['id_zona'],
+                r['id_turno'],
+                r['fecha'],
+                _a_json(secuencia) if secuencia else "[]",
+                _sanitizar_metrica(r.get('distancia_km'), float),
+                _sanitizar_metrica(r.get('duracion_min'), int),
+                (r.get('version_vrp') or "v1.0")[:50],
+                geometria_str,
+            )
+            filas.append(fila + (geometria_bin,) if usar_bin else fila)
+        try:
+            columnas = _COLUMNAS_INSERTAR + (", geometria_bin" if usar_bin else "")
+            query = f"INSERT INTO ruta_planificada ({columnas}) VALUES %s RETURNING id_ruta, {columnas}"
+            resultado = _expandir_geometrias(execute_values_returning(query, filas, page_size=500))
+            _invalidar_totales()
+            logger.info(f"{len(filas)} rutas planificadas creadas en lote")
+            return resultado
+        except Exception as e:
+            logger.error(f"Error al crear rutas en lote: {str(e)}")
+            raise
+
     @staticmethod
     def obtener_ruta(ruta_id: int) -> Optional[Dict]:
         """Obtener ruta planificada por ID"""
-        query = """
-            SELECT id_ruta, id_zona, id_turno, fecha, secuencia_puntos,
-                   distancia_planificada_km, duracion_planificada_min, version_modelo_vrp, geometria_json
-            FROM ruta_planificada
-            WHERE id_ruta = %s
-        """
+        with _cache_lock:
+            fila = _cache_filas.get(ruta_id)
+        if fila is not None:
+            return copy.deepcopy(fila)
         
-        resultado = execute_query_one(query, (ruta_id,))
+        query = f"SELECT {_columnas_lectura()} FROM ruta_planificada WHERE id_ruta = %s"
+        
+        resultado = _expandir_geometria(execute_query_one(query, (ruta_id,), preparada=True))
         if not resultado:
             logger.warning(f"Ruta {ruta_id} no encontrada")
+        else:
+            with _cache_lock:
+                _cache_filas[ruta_id] = copy.deepcopy(resultado)
         return resultado
 
     @staticmethod
@@ -159,58 +449,91 @@ class RutaPlanificadaService:
         fecha_desde: Optional[date] = None,
         fecha_hasta: Optional[date] = None,
         skip: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        cursor_fecha: Optional[date] = None,
+        cursor_id: Optional[int] = None,
+        total_exacto: bool = False
     ) -> tuple:
-        """Obtener rutas planificadas con filtros"""
-        query = "SELECT * FROM ruta_planificada WHERE 1=1"
-        params = []
-        
-        if zona_id:
-            query += " AND id_zona = %s"
-            params.append(zona_id)
-        if turno_id:
-            query += " AND id_turno = %s"
-            params.append(turno_id)
-        if fecha_desde:
-            query += " AND fecha >= %s"
-            params.append(fecha_desde)
-        if fecha_hasta:
-            query += " AND fecha <= %s"
-            params.append(fecha_hasta)
+        """
+        Obtener rutas planificadas con filtros.
+        Con cursor_fecha y cursor_id (fecha e id_ruta de la última fila recibida) se
+        pagina por clave en lugar de OFFSET; en ese modo el total cuenta las filas restantes.
+        Sin filtros, en una tabla grande el total es la estimación del planificador
+        salvo que se pida total_exacto.
+        """
+        clave = (zona_id, turno_id, fecha_desde, fecha_hasta, cursor_fecha, cursor_id)
+        with _cache_lock:
+            total_conocido = _cache_totales.get(clave)
         
-        # Contar total
-        count_query = f"SELECT COUNT(*) as total FROM ({query}) as t"
-        count_result = execute_query(count_query, params)
-        total = count_result[0]['total'] if count_result else 0
+        filtros = (zona_id, turno_id, fecha_desde, fecha_hasta)
+        con_cursor = cursor_fecha is not None and cursor_id is not None
+        mascara = sum(1 << i for i, valor in enumerate(filtros) if valor) | (con_cursor << 4)
+        if total_conocido is None and mascara == 0 and not total_exacto:
+            total_conocido = estimar_total('ruta_planificada')
         
-        # Obtener paginados
-        # FIX: SQLite syntax compatibility
-        # Postgres: OFFSET %s LIMIT %s
-        # SQLite: LIMIT %s OFFSET %s
-        # We use a neutral placeholder that db.py will intercept and rewrite correctly
-        query += " ORDER BY fecha DESC OFFSET %s LIMIT %s"
+        params = [valor for valor in filtros if valor]
+        if con_cursor:
+            params.extend([cursor_fecha, cursor_id])
+            skip = 0
         params.extend([skip, limit])
         
-        rutas = execute_query(query, params)
+        # Página y total en una sola consulta (COUNT OVER se evalúa antes de OFFSET/LIMIT);
+        # con el total en caché (o estimado) no hace falta contar de nuevo
+        query = _SQL_LISTADO[(mascara, total_conocido is None)]
+        
+        if total_conocido is not None:
+            rutas, total = _expandir_geometrias(execute_query(query, params)), total_conocido
+        else:
+            rutas, total = separar_total(
+                _expandir_geometrias(execute_query(query, params)),
+                skip=skip, consulta_conteo=_SQL_CONTEO[mascara], params_conteo=tuple(params[:-2])
+            )
+            if total is not None:
+                with _cache_lock:
+                    _cache_totales[clave] = total
         logger.info(f"Obtenidas {len(rutas)} rutas")
         return rutas, total
 
     @staticmethod
     def actualizar_ruta(ruta_id: int, **kwargs) -> Optional[Dict]:
-        """Actualizar ruta planificada"""
+        """
+        Actualizar ruta planificada: los campos ausentes se conservan y un None enviado
+        limpia el campo. Acepta los nombres del schema (distancia_km, tiempo_estimado_min);
+        un campo sin columna es ValueError.
+        """
         if not kwargs:
             return None
+        kwargs = {_ALIAS_ACTUALIZABLES.get(k, k): v for k, v in kwargs.items()}
+        desconocidos = set(kwargs) - set(_COLUMNAS_ACTUALIZABLES)
+        if desconocidos:
+            raise ValueError(f"Campos no actualizables: {', '.join(sorted(desconocidos))}")
         
-        set_clause = ", ".join([f"{key} = %s" for key in kwargs.keys()])
-        query = f"""
-            UPDATE ruta_planificada
-            SET {set_clause}
-            WHERE id_ruta = %s
-            RETURNING *
-        """
+        usar_bin = _usar_geometria_bin()
+        geometria = kwargs.get('geometria_json')
+        geometria_bin = None
+        if geometria is not None:
+            geometria = _sanitizar_geometria(geometria)
+            if usar_bin:
+                geometria_bin = _empaquetar_geometria(geometria)
+            kwargs['geometria_json'] = None if geometria_bin is not None else geometria
+        if usar_bin and 'geometria_json' in kwargs:
+            kwargs['geometria_bin'] = geometria_bin
+        datos = {
+            col: _a_json(valor) if col in _COLUMNAS_JSON and valor is not None else valor
+            for col, valor in kwargs.items()
+        }
         
-        valores = list(kwargs.values()) + [ruta_id]
-        resultado = execute_insert_returning(query, valores)
+        # Texto SQL fijo (cada columna con su indicador de "enviada"): se prepara una vez por conexión
+        if usar_bin:
+            query = _SQL_ACTUALIZAR_RUTA_BIN
+            valores = valores_enviados(datos, _COLUMNAS_ACTUALIZABLES_BIN)
+        else:
+            query = _SQL_ACTUALIZAR_RUTA
+            valores = valores_enviados(datos, _COLUMNAS_ACTUALIZABLES)
+        valores.append(ruta_id)
+        resultado = _expandir_geometria(execute_insert_returning(query, tuple(valores), preparada=True))
+        _invalidar_totales()
+        _invalidar_fila(ruta_id)
         
         if not resultado:
             logger.warning(f"No se pudo actualizar ruta {ruta_id}")
@@ -224,7 +547,9 @@ class RutaPlanificadaService:
         """Eliminar ruta planificada"""
         try:
             query = "DELETE FROM ruta_planificada WHERE id_ruta = %s"
-            filas = execute_insert_update_delete(query, (ruta_id,))
+            filas = execute_insert_update_delete(query, (ruta_id,), preparada=True)
+            _invalidar_totales()
+            _invalidar_fila(ruta_id)
             logger.info(f"Ruta {ruta_id} eliminada ({filas} filas)")
             return filas > 0
         except Exception as e:
@@ -234,70 +559,55 @@ class RutaPlanificadaService:
     @staticmethod
     def obtener_rutas_por_fecha(fecha: date) -> List[Dict]:
         """Obtener todas las rutas planificadas para una fecha"""
-        query = "SELECT * FROM ruta_planificada WHERE fecha = %s ORDER BY id_ruta"
-        return execute_query(query, (fecha,))
+        query = f"SELECT {_columnas_lectura()} FROM ruta_planificada WHERE fecha = %s ORDER BY id_ruta"
+        return _expandir_geometrias(execute_query(query, (fecha,), preparada=True))
 
     @staticmethod
     def obtener_rutas_por_zona(zona_id: int) -> List[Dict]:
         """Obtener rutas de una zona específica"""
-        query = "SELECT * FROM ruta_planificada WHERE id_zona = %s ORDER BY fecha DESC"
-        return execute_query(query, (zona_id,))
+        query = f"SELECT {_columnas_lectura()} FROM ruta_planificada WHERE id_zona = %s ORDER BY fecha DESC"
+        return _expandir_geometrias(execute_query(query, (zona_id,), preparada=True))
 
     @staticmethod
     def obtener_rutas_ejecutadas(ruta_id: int) -> List[Dict]:
         """Obtener todas las ejecuciones de una ruta planificada"""
-        query = "SELECT * FROM ruta_ejecutada WHERE id_ruta = %s ORDER BY fecha DESC"
-        return execute_query(query, (ruta_id,))
+        query = f"SELECT {COLUMNAS_EJECUTADA} FROM ruta_ejecutada WHERE id_ruta = %s ORDER BY fecha DESC"
+        return execute_query(query, (ruta_id,), preparada=True)
 
     @staticmethod
     def calcular_metricas_ruta(ruta_id: int) -> Dict[str, Any]:
         """Calcular métricas de una ruta planificada"""
-        ruta = RutaPlanificadaService.obtener_ruta(ruta_id)
+        ruta = execute_query_one(_SQL_METRICAS.format(ids="%s"), (ruta_id, ruta_id), preparada=True)
         if not ruta:
+            logger.warning(f"Ruta {ruta_id} no encontrada")
             return {}
+        return _metricas_desde_fila(ruta)
 
-        ejecuciones = RutaPlanificadaService.obtener_rutas_ejecutadas(ruta_id)
-        
-        metricas = {
-            "ruta_id": ruta_id,
-            "zona_id": ruta.get('id_zona'),
-            "total_ejecuciones": len(ejecuciones),
-            "distancia_planificada_km": ruta.get('distancia_planificada_km') or 0,
-            "duracion_planificada_min": ruta.get('duracion_planificada_min') or 0,
-            "puntos_en_ruta": len(ruta.get('secuencia_puntos', [])) if ruta.get('secuencia_puntos') else 0,
-        }
-
-        if ejecuciones:
-            distancias_reales = [e.get('distancia_real_km') for e in ejecuciones if e.get('distancia_real_km')]
-            duraciones_reales = [e.get('duracion_real_min') for e in ejecuciones if e.get('duracion_real_min')]
-            
-            if distancias_reales:
-                metricas["distancia_real_promedio"] = sum(distancias_reales) / len(distancias_reales)
-                desviaciones = [e.get('desviacion_km') for e in ejecuciones if e.get('desviacion_km')]
-                metricas["desviacion_distancia_promedio_km"] = sum(desviaciones) / len(desviaciones) if desviaciones else 0
-            
-            if duraciones_reales:
-                metricas["duracion_real_promedio_min"] = sum(duraciones_reales) / len(duraciones_reales)
-            
-            cumplimientos = [e.get('cumplimiento_horario_pct') for e in ejecuciones if e.get('cumplimiento_horario_pct')]
-            if cumplimientos:
-                metricas["cumplimiento_horario_promedio_pct"] = sum(cumplimientos) / len(cumplimientos)
-
-        return metricas
+    @staticmethod
+    def calcular_metricas_rutas(ruta_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Métricas de varias rutas en una sola consulta (en lugar de una llamada a
+        calcular_metricas_ruta por ruta). Las rutas inexistentes no aparecen en el resultado.
+        """
+        ruta_ids = list(dict.fromkeys(ruta_ids))
+        if not ruta_ids:
+            return {}
+        marcadores = ", ".join(["%s"] * len(ruta_ids))
+        filas = execute_query(_SQL_METRICAS.format(ids=marcadores), tuple(ruta_ids) * 2)
+        return {fila['id_ruta']: _metricas_desde_fila(fila) for fila in filas}
 
     @staticmethod
-    def obtener_rutas_proximas(dias: int = 7) -> List[Dict]:
-        """Obtener rutas programadas para los próximos N días"""
-        from datetime import timedelta
-        hoy = date.today()
+    def obtener_rutas_proximas(dias: int = 7, hoy: Optional[date] = None) -> List[Dict]:
+        """Obtener rutas programadas para los próximos N días (desde hoy, o la fecha dada)"""
+        hoy = hoy or date.today()
         fecha_limite = hoy + timedelta(days=dias)
         
-        query = """
-            SELECT * FROM ruta_planificada 
+        query = f"""
+            SELECT {_columnas_lectura()} FROM ruta_planificada 
             WHERE fecha >= %s AND fecha <= %s 
             ORDER BY fecha ASC
         """
-        return execute_query(query, (hoy, fecha_limite))
+        return _expandir_geometrias(execute_query(query, (hoy, fecha_limite), preparada=True))
 
     @staticmethod
     def actualizar_metricas_ruta(
@@ -307,16 +617,14 @@ class RutaPlanificadaService:
     ) -> Optional[Dict]:
         """Actualizar métricas planificadas de una ruta"""
         try:
-            updates = {}
-            if distancia_km is not None:
-                updates['distancia_planificada_km'] = distancia_km
-            if duracion_min is not None:
-                updates['duracion_planificada_min'] = duracion_min
-            
-            if not updates:
+            if distancia_km is None and duracion_min is None:
                 return RutaPlanificadaService.obtener_ruta(ruta_id)
             
-            return RutaPlanificadaService.actualizar_ruta(ruta_id, **updates)
+            # Un solo UPDATE ... RETURNING de texto fijo; la métrica en None no se envía y se conserva
+            metricas = {'distancia_planificada_km': distancia_km, 'duracion_planificada_min': duracion_min}
+            return RutaPlanificadaService.actualizar_ruta(
+                ruta_id, **{col: valor for col, valor in metricas.items() if valor is not None}
+            )
         except Exception as e:
             logger.error(f"Error al actualizar métricas: {str(e)}")
             raise
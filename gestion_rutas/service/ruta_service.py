@@ -4,7 +4,7 @@ Contiene la lógica de negocio relacionada con rutas
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, insert, func
 from typing import List, Optional, Dict, Any
 from datetime import date, datetime
 from ..models.base import Ruta, Entrega, Vehiculo, Punto, EstadoRuta, EstadoEntrega
@@ -31,7 +31,8 @@ class RutaService:
             Ruta creada
         """
         try:
-            nueva_ruta = Ruta(
+            # INSERT ... RETURNING: la fila completa vuelve en el mismo round trip (sin refresh)
+            stmt = insert(Ruta).values(
                 id_cliente=ruta_data.id_cliente,
                 nombre=ruta_data.nombre,
                 descripcion=ruta_data.descripcion,
@@ -40,11 +41,11 @@ class RutaService:
                 algoritmo_vrp=ruta_data.algoritmo_vrp,
                 id_vehiculo=ruta_data.id_vehiculo,
                 estado=EstadoRuta.PLANIFICADA
-            )
-            db.add(nueva_ruta)
+            ).returning(Ruta)
+            nueva_ruta = db.scalars(stmt).one()
+            ruta_id = nueva_ruta.id
             db.commit()
-            db.refresh(nueva_ruta)
-            logger.info(f"Ruta {nueva_ruta.id} creada exitosamente")
+            logger.info(f"Ruta {ruta_id} creada exitosamente")
             return nueva_ruta
         except Exception as e:
             db.rollback()
@@ -193,13 +194,18 @@ class RutaService:
         if not ruta:
             return {}
 
-        entregas = RutaService.obtener_entregas_ruta(db, ruta_id)
+        # Totales de las entregas agregados en la base (sin traer las filas)
+        total_entregas, peso_total, volumen_total = db.query(
+            func.count(Entrega.id),
+            func.coalesce(func.sum(Entrega.peso_kg), 0),
+            func.coalesce(func.sum(Entrega.volumen_m3), 0),
+        ).filter(Entrega.id_ruta == ruta_id).one()
         
         metricas = {
             "ruta_id": ruta_id,
-            "total_entregas": len(entregas),
-            "peso_total_kg": sum(e.peso_kg for e in entregas),
-            "volumen_total_m3": sum(e.volumen_m3 or 0 for e in entregas),
+            "total_entregas": total_entregas,
+            "peso_total_kg": peso_total,
+            "volumen_total_m3": volumen_total,
             "distancia_planificada_km": ruta.distancia_planificada_km or 0,
             "duracion_planificada_minutos": ruta.duracion_planificada_minutos or 0,
         }
@@ -244,17 +250,20 @@ class RutaService:
             if not ruta:
                 return {"error": "Ruta no encontrada"}
             
-            entregas = RutaService.obtener_entregas_ruta(db, ruta_id)
-            if not entregas:
+            # Puntos de las entregas en orden, en una sola consulta (JOIN en lugar de una por entrega).
+            # Se consulta (Entrega, Punto): un Query de una sola entidad deduplica las filas y
+            # una ruta que vuelve a un mismo punto perdería esas paradas
+            filas = (
+                db.query(Entrega, Punto)
+                .join(Punto, Entrega.id_punto == Punto.id)
+                .filter(Entrega.id_ruta == ruta_id)
+                .order_by(Entrega.id)
+                .all()
+            )
+            puntos = [punto for _, punto in filas]
+            if not puntos:
                 return {"error": "No hay entregas en la ruta"}
             
-            # Obtener puntos en orden
-            puntos = []
-            for entrega in entregas:
-                punto = db.query(Punto).filter(Punto.id == entrega.id_punto).first()
-                if punto:
-                    puntos.append(punto)
-            
             if len(puntos) < 2:
                 return {"error": "Se necesitan al menos 2 puntos para calcular ruta"}
             
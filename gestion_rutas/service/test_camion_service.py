@@ -0,0 +1,51 @@
+"""test_camion_service.py - Métricas de camión sobre SQLite (helpers raw-SQL)"""
+
+import json
+from datetime import date
+
+import pytest
+
+from gestion_rutas.database.db import execute_insert_update_delete
+from gestion_rutas.service.camion_service import CamionService
+
+
+@pytest.fixture
+def camion(sqlite_engine):
+    execute_insert_update_delete(
+        "INSERT INTO camion (id_camion, patente, capacidad_kg, consumo_km_l) VALUES (%s, %s, %s, %s)",
+        (1, "AB-1234", 1000.0, 5.0)
+    )
+    rutas = [
+        (10.0, 60.0, 90.0, {"carga_kg": 400}),
+        (20.0, None, 80.0, {"carga_kg": 600}),
+        (None, 30.0, None, None),
+    ]
+    for i, (dist, dur, cumpl, telemetria) in enumerate(rutas, start=1):
+        execute_insert_update_delete(
+            "INSERT INTO ruta_ejecutada (id_ruta_exec, id_camion, fecha, distancia_real_km, duracion_real_min, "
+            "cumplimiento_horario_pct, telemetria_json) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (i, 1, date.today().isoformat(), dist, dur, cumpl, json.dumps(telemetria) if telemetria else None)
+        )
+    return 1
+
+
+def test_calcular_metricas_camion(camion):
+    metricas = CamionService.calcular_metricas_camion(camion)
+
+    assert metricas["distancia_total_km"] == pytest.approx(30.0)
+    assert metricas["distancia_maxima_km"] == pytest.approx(20.0)
+    assert metricas["consumo_total_litros"] == pytest.approx(6.0)
+    assert metricas["duracion_promedio_minutos"] == pytest.approx(45.0)
+    assert metricas["cumplimiento_horario_promedio_pct"] == pytest.approx(85.0)
+
+
+def test_calcular_metricas_camion_inexistente(sqlite_engine):
+    assert CamionService.calcular_metricas_camion(99) == {}
+
+
+def test_obtener_carga_promedio_camion(camion):
+    resultado = CamionService.obtener_carga_promedio_camion(camion, dias=7)
+
+    assert resultado["rutas_analizadas"] == 3
+    assert resultado["carga_promedio_kg"] == pytest.approx(1000 / 3)
+    assert resultado["carga_maxima_kg"] == 600
@@ -0,0 +1,16 @@
+"""test_entrega_service.py - Pruebas de EntregaService"""
+
+import pytest
+
+from gestion_rutas.models.base import Entrega
+from gestion_rutas.service.entrega_service import EntregaService
+
+
+def test_calcular_peso_entregas():
+    entregas = [Entrega(peso_kg=10.5), Entrega(peso_kg=4.5), Entrega(peso_kg=0.0)]
+
+    assert EntregaService.calcular_peso_entregas(entregas) == pytest.approx(15.0)
+
+
+def test_calcular_peso_entregas_vacio():
+    assert EntregaService.calcular_peso_entregas([]) == 0.0
@@ -0,0 +1,43 @@
+"""test_incidencia_service.py - Pruebas de IncidenciaService sobre SQLite temporal"""
+
+from datetime import datetime
+
+from gestion_rutas.database.db import execute_insert_update_delete
+from gestion_rutas.service.incidencia_service import IncidenciaService
+
+
+def _incidencia(id_incidencia, tipo, severidad):
+    execute_insert_update_delete(
+        "INSERT INTO incidencia (id_incidencia, id_zona, id_camion, tipo, descripcion, fecha_hora, severidad) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        (id_incidencia, 1, 1, tipo, "desc", datetime(2024, 1, id_incidencia), severidad)
+    )
+
+
+def test_obtener_incidencias_filtra_y_pagina(sqlite_engine):
+    for i, (tipo, severidad) in enumerate([("falla", 2), ("falla", 5), ("trafico", 4), ("falla", 4)], start=1):
+        _incidencia(i, tipo, severidad)
+
+    pagina, hay_mas, total = IncidenciaService.obtener_incidencias(tipo="falla", severidad_min=3, limit=1)
+    assert [f["id_incidencia"] for f in pagina] == [4]
+    assert hay_mas
+    assert total is None
+
+    pagina, hay_mas, total = IncidenciaService.obtener_incidencias(tipo="falla", severidad_min=3, skip=1, limit=1, con_total=True)
+    assert [f["id_incidencia"] for f in pagina] == [2]
+    assert not hay_mas
+    assert total == 2
+
+    pagina, hay_mas, total = IncidenciaService.obtener_incidencias(tipo="falla", skip=10, limit=1, con_total=True)
+    assert pagina == [] and not hay_mas
+    assert total == 3
+
+
+def test_obtener_incidencias_sin_filtros(sqlite_engine):
+    for i in range(1, 4):
+        _incidencia(i, "falla", 1)
+
+    pagina, hay_mas, total = IncidenciaService.obtener_incidencias(limit=10)
+
+    assert [f["id_incidencia"] for f in pagina] == [3, 2, 1]
+    assert not hay_mas
@@ -0,0 +1,63 @@
+"""test_periodo_temporal_service.py - Paginación por clave de periodos y predicciones"""
+
+from datetime import datetime
+
+from gestion_rutas.database.db import execute_insert_update_delete
+from gestion_rutas.service.periodo_temporal_service import PeriodoTemporalService
+from gestion_rutas.service.prediccion_demanda_service import PrediccionDemandaService
+
+# Dos filas comparten fecha: sin desempate por id, el cursor saltaría una de ellas
+_FECHAS = [datetime(2024, 1, 3), datetime(2024, 1, 2), datetime(2024, 1, 2), datetime(2024, 1, 1)]
+
+
+def _recorrer(obtener, col_fecha, col_id):
+    """Recorrer todas las páginas de 1 fila siguiendo el cursor (fecha, id) de la última"""
+    vistos = []
+    cursor_fecha = cursor_id = None
+    while True:
+        pagina, total = obtener(limit=1, cursor_fecha=cursor_fecha, cursor_id=cursor_id)
+        if not pagina:
+            return vistos
+        assert total == len(_FECHAS) - len(vistos)
+        vistos.append(pagina[0][col_id])
+        cursor_fecha, cursor_id = pagina[0][col_fecha], pagina[0][col_id]
+
+
+def test_periodos_keyset_desempata_por_id(sqlite_engine):
+    for i, fecha in enumerate(_FECHAS, start=1):
+        execute_insert_update_delete(
+            "INSERT INTO periodo_temporal (id_periodo, fecha_inicio, fecha_fin, tipo_granularidad, estacionalidad) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (i, fecha, fecha, "diario", "general")
+        )
+
+    vistos = _recorrer(PeriodoTemporalService.obtener_periodos, "fecha_inicio", "id_periodo")
+
+    assert vistos == [1, 3, 2, 4]
+
+
+def test_predicciones_keyset_desempata_por_id(sqlite_engine):
+    for i, fecha in enumerate(_FECHAS, start=1):
+        execute_insert_update_delete(
+            "INSERT INTO prediccion_demanda (id_prediccion, id_zona, horizonte_horas, fecha_prediccion, valor_predicho_kg) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (i, i, 24, fecha, 100.0)
+        )
+
+    vistos = _recorrer(PrediccionDemandaService.obtener_predicciones, "fecha_prediccion", "id_prediccion")
+
+    assert vistos == [1, 3, 2, 4]
+
+
+def test_pagina_mas_alla_del_final_conserva_el_total(sqlite_engine):
+    for i, fecha in enumerate(_FECHAS, start=1):
+        execute_insert_update_delete(
+            "INSERT INTO periodo_temporal (id_periodo, fecha_inicio, fecha_fin, tipo_granularidad, estacionalidad) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (i, fecha, fecha, "diario", "general")
+        )
+
+    pagina, total = PeriodoTemporalService.obtener_periodos(skip=10, limit=5)
+
+    assert pagina == []
+    assert total == len(_FECHAS)
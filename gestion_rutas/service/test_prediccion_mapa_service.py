@@ -0,0 +1,34 @@
+"""test_prediccion_mapa_service.py - Caché Parquet de los datos históricos"""
+
+import pandas as pd
+import pytest
+
+from gestion_rutas.service import prediccion_mapa_service
+from gestion_rutas.service.prediccion_mapa_service import _escribir_parquet_atomico
+
+pytest.importorskip("pyarrow")
+
+
+def test_escribir_parquet_atomico_reemplaza_sin_temporales(tmp_path):
+    destino = tmp_path / "datos.parquet"
+    _escribir_parquet_atomico(pd.DataFrame({"a": [1]}), destino)
+
+    _escribir_parquet_atomico(pd.DataFrame({"a": [1, 2]}), destino)
+
+    assert pd.read_parquet(destino)["a"].tolist() == [1, 2]
+    assert [p.name for p in tmp_path.iterdir()] == ["datos.parquet"]
+
+
+def test_escribir_parquet_atomico_conserva_el_anterior_si_falla(tmp_path, monkeypatch):
+    destino = tmp_path / "datos.parquet"
+    _escribir_parquet_atomico(pd.DataFrame({"a": [1]}), destino)
+
+    def falla(temporal, destino):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(prediccion_mapa_service.os, "replace", falla)
+    with pytest.raises(OSError):
+        _escribir_parquet_atomico(pd.DataFrame({"a": [1, 2]}), destino)
+
+    assert pd.read_parquet(destino)["a"].tolist() == [1]
+    assert [p.name for p in tmp_path.iterdir()] == ["datos.parquet"]
@@ -0,0 +1,24 @@
+"""test_punto_disposicion_service.py - UPDATE parcial de puntos de disposición sobre SQLite temporal"""
+
+from gestion_rutas.database.db import execute_insert_update_delete, execute_query_one
+from gestion_rutas.service.punto_disposicion_service import PuntoDisposicionService
+
+
+def _fila(id_disposicion):
+    return execute_query_one(
+        "SELECT nombre, tipo, capacidad_diaria_ton FROM punto_disposicion WHERE id_disposicion = %s", (id_disposicion,)
+    )
+
+
+def test_actualizar_punto_conserva_ausentes_y_limpia_none_enviado(sqlite_engine):
+    execute_insert_update_delete(
+        "INSERT INTO punto_disposicion (id_disposicion, nombre, tipo, latitud, longitud, capacidad_diaria_ton) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        (1, "Relleno Norte", "relleno", -20.2, -70.1, 500.0)
+    )
+
+    PuntoDisposicionService.actualizar_punto(1, {"nombre": "Relleno Norte II"})
+    assert _fila(1) == {"nombre": "Relleno Norte II", "tipo": "relleno", "capacidad_diaria_ton": 500.0}
+
+    PuntoDisposicionService.actualizar_punto(1, {"capacidad_diaria_ton": None})
+    assert _fila(1) == {"nombre": "Relleno Norte II", "tipo": "relleno", "capacidad_diaria_ton": None}
@@ -0,0 +1,90 @@
+"""test_routing_service.py - Caché de rutas OSRM (memoria y disco) y matriz de distancias, sin red"""
+
+import os
+
+import numpy as np
+import pytest
+
+from gestion_rutas.models.base import Punto
+from gestion_rutas.service import routing_service
+from gestion_rutas.service.routing_service import RoutingService, _leer_disco
+
+
+class _RespuestaFalsa:
+    def json(self):
+        return {
+            "code": "Ok",
+            "routes": [{"geometry": {"coordinates": [[-70.1, -20.2], [-70.2, -20.3]]}, "distance": 1500, "duration": 120}],
+            "waypoints": [],
+        }
+
+
+@pytest.fixture
+def osrm_falso(tmp_path, monkeypatch):
+    """OSRM simulado y caché en disco temporal; devuelve la lista de URLs pedidas"""
+    pedidas = []
+
+    def get(url, params=None, timeout=None):
+        pedidas.append(url)
+        return _RespuestaFalsa()
+
+    monkeypatch.setattr(routing_service, "OSRM_CACHE_PATH", str(tmp_path / "osrm.sqlite"))
+    monkeypatch.setattr(routing_service._session, "get", get)
+    routing_service._osrm_ruta_cached.cache_clear()
+    yield pedidas
+    routing_service._osrm_ruta_cached.cache_clear()
+
+
+def _puntos():
+    return Punto(latitud=-20.2, longitud=-70.1), Punto(latitud=-20.3, longitud=-70.2)
+
+
+def test_ruta_devuelta_es_una_copia(osrm_falso):
+    ruta = RoutingService.obtener_ruta_entre_puntos(*_puntos())
+    ruta["geometry"].clear()
+    ruta["distancia_km"] = 0
+
+    otra = RoutingService.obtener_ruta_entre_puntos(*_puntos())
+
+    assert otra["distancia_km"] == 1.5
+    assert len(otra["geometry"]) == 2
+    assert len(osrm_falso) == 1
+
+
+def test_ruta_se_lee_del_disco_tras_reinicio(osrm_falso):
+    RoutingService.obtener_ruta_entre_puntos(*_puntos())
+    routing_service._osrm_ruta_cached.cache_clear()
+
+    ruta = RoutingService.obtener_ruta_entre_puntos(*_puntos())
+
+    assert ruta["duracion_minutos"] == 2.0
+    assert len(osrm_falso) == 1
+
+
+def test_lectura_sin_archivo_no_lo_crea(osrm_falso):
+    assert _leer_disco("-70.1,-20.2;-70.2,-20.3") is None
+    assert not os.path.exists(routing_service.OSRM_CACHE_PATH)
+
+
+def test_clear_cache_vacia_el_disco(osrm_falso):
+    RoutingService.obtener_ruta_entre_puntos(*_puntos())
+
+    RoutingService.clear_cache()
+    RoutingService.obtener_ruta_entre_puntos(*_puntos())
+
+    assert len(osrm_falso) == 2
+
+
+def test_matriz_distancias_ndarray_en_km(monkeypatch):
+    class _RespuestaTabla:
+        content = b'{"code": "Ok", "distances": [[0, 1500.0], [null, 0]]}'
+
+        def json(self):
+            return {"code": "Ok", "distances": [[0, 1500.0], [None, 0]]}
+
+    monkeypatch.setattr(routing_service._session, "get", lambda url, params=None, timeout=None: _RespuestaTabla())
+
+    matriz = RoutingService.obtener_matriz_distancias(list(_puntos()))
+
+    assert matriz.dtype == np.float64 and matriz.flags.c_contiguous
+    assert matriz.tolist() == [[0.0, 1.5], [0.0, 0.0]]
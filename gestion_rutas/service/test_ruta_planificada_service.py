@@ -0,0 +1,91 @@
+"""test_ruta_planificada_service.py - Pruebas de RutaPlanificadaService sobre SQLite temporal"""
+
+import json
+from datetime import date
+
+import pytest
+
+from gestion_rutas.database.db import execute_query
+from gestion_rutas.service.ruta_planificada_service import (
+    RutaPlanificadaService,
+    _empaquetar_geometria,
+    _cache_filas,
+    _expandir_geometria,
+    _invalidar_fila,
+)
+
+
+def test_crear_rutas_batch_inserta_todas(sqlite_engine):
+    RutaPlanificadaService.crear_rutas_batch([
+        {"id_zona": 1, "id_turno": 1, "fecha": date(2024, 1, 1), "secuencia_puntos": [3, 1, 2],
+         "distancia_km": 12.5, "duracion_min": 40, "version_vrp": "x" * 60,
+         "geometria_json": [[-20.2, -70.1], [float("nan"), -70.2]]},
+        {"id_zona": 2, "id_turno": 1, "fecha": date(2024, 1, 2), "secuencia_puntos": None},
+    ])
+
+    filas = execute_query("SELECT * FROM ruta_planificada ORDER BY id_ruta")
+
+    assert [f["id_zona"] for f in filas] == [1, 2]
+    assert json.loads(filas[0]["secuencia_puntos"]) == [3, 1, 2]
+    assert json.loads(filas[0]["geometria_json"]) == [[-20.2, -70.1], [0.0, -70.2]]
+    assert len(filas[0]["version_modelo_vrp"]) == 50
+    assert json.loads(filas[1]["secuencia_puntos"]) == []
+    assert filas[1]["version_modelo_vrp"] == "v1.0"
+    assert filas[1]["geometria_json"] is None
+
+
+def test_crear_rutas_batch_vacio(sqlite_engine):
+    assert RutaPlanificadaService.crear_rutas_batch([]) == []
+    assert execute_query("SELECT COUNT(*) AS n FROM ruta_planificada") == [{"n": 0}]
+
+
+def test_actualizar_ruta_conserva_ausentes_y_limpia_none_enviado(sqlite_engine):
+    RutaPlanificadaService.crear_rutas_batch([
+        {"id_zona": 1, "id_turno": 1, "fecha": date(2024, 1, 1), "secuencia_puntos": [1, 2],
+         "distancia_km": 12.5, "duracion_min": 40, "geometria_json": [[-20.2, -70.1]]},
+    ])
+
+    RutaPlanificadaService.actualizar_metricas_ruta(1, duracion_min=55)
+    RutaPlanificadaService.actualizar_ruta(1, geometria_json=None, tiempo_estimado_min=None)
+
+    fila = execute_query(
+        "SELECT distancia_planificada_km, duracion_planificada_min, secuencia_puntos, geometria_json "
+        "FROM ruta_planificada WHERE id_ruta = %s", (1,)
+    )[0]
+    assert fila["distancia_planificada_km"] == 12.5
+    assert fila["duracion_planificada_min"] is None
+    assert json.loads(fila["secuencia_puntos"]) == [1, 2]
+    assert fila["geometria_json"] is None
+
+
+def test_geometria_empaquetada_ida_y_vuelta():
+    geometria = [[-20.213456, -70.152789], [-20.3, -70.1], [float("nan"), 0.0]]
+
+    datos = _empaquetar_geometria(geometria)
+    fila = _expandir_geometria({"id_ruta": 1, "geometria_json": None, "geometria_bin": datos})
+
+    assert len(datos) == 8 * len(geometria)
+    assert "geometria_bin" not in fila
+    esperado = [-20.213456, -70.152789, -20.3, -70.1, 0.0, 0.0]
+    assert sum(fila["geometria_json"], []) == pytest.approx(esperado, abs=1e-6)
+
+
+def test_geometria_no_numerica_no_se_empaqueta():
+    assert _empaquetar_geometria([[1.0, 2.0, 3.0]]) is None
+    assert _empaquetar_geometria([["a", "b"]]) is None
+    assert _expandir_geometria({"geometria_json": [[1.0, 2.0]]}) == {"geometria_json": [[1.0, 2.0]]}
+
+
+def test_obtener_ruta_cacheada_no_comparte_listas():
+    # En PostgreSQL las columnas JSON llegan como listas; en SQLite como texto, por eso se siembra la caché
+    _cache_filas[1] = {"id_ruta": 1, "secuencia_puntos": [1, 2], "geometria_json": [[-20.2, -70.1]]}
+    try:
+        primera = RutaPlanificadaService.obtener_ruta(1)
+        primera["secuencia_puntos"].append(3)
+        primera["geometria_json"][0][0] = 0.0
+
+        assert RutaPlanificadaService.obtener_ruta(1) == {
+            "id_ruta": 1, "secuencia_puntos": [1, 2], "geometria_json": [[-20.2, -70.1]]
+        }
+    finally:
+        _invalidar_fila(1)
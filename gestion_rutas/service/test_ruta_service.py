@@ -0,0 +1,73 @@
+"""test_ruta_service.py - Pruebas de RutaService sobre SQLite en memoria"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from gestion_rutas.database.db import Base
+from gestion_rutas.models.base import Cliente, Punto, Entrega, Ruta
+from gestion_rutas.service.ruta_service import RutaService
+from gestion_rutas.service.routing_service import RoutingService
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    sesion = sessionmaker(bind=engine)()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+        engine.dispose()
+
+
+def _ruta_con_entregas(db, ids_puntos_visitados):
+    """Crear una ruta con una entrega por cada punto visitado (en ese orden)"""
+    cliente = Cliente(nombre="Cliente", email="cliente@test.cl")
+    db.add(cliente)
+    db.flush()
+    puntos = {}
+    for i in sorted(set(ids_puntos_visitados)):
+        puntos[i] = Punto(id=i, nombre=f"P{i}", latitud=-20.2 - i / 100, longitud=-70.1 - i / 100)
+        db.add(puntos[i])
+    ruta = Ruta(id_cliente=cliente.id, nombre="R1", fecha_planificacion=date(2024, 1, 1))
+    db.add(ruta)
+    db.flush()
+    for i in ids_puntos_visitados:
+        db.add(Entrega(
+            id_cliente=cliente.id, id_punto=i, id_ruta=ruta.id,
+            peso_kg=10.0, volumen_m3=1.0, fecha_programada=date(2024, 1, 1)
+        ))
+    db.commit()
+    return ruta
+
+
+def test_calcular_ruta_con_calles_conserva_puntos_repetidos(db, monkeypatch):
+    """Una ruta que vuelve a un punto (1, 2, 1) debe enviar las tres paradas a OSRM"""
+    ruta = _ruta_con_entregas(db, [1, 2, 1])
+    recibidos = []
+
+    def ruta_optimizada(puntos):
+        recibidos.extend(p.id for p in puntos)
+        return {"distancia_km": 1.0, "duracion_minutos": 2.0, "geometry": {}, "orden_optimizado": []}
+
+    monkeypatch.setattr(RoutingService, "obtener_ruta_optimizada", staticmethod(ruta_optimizada))
+
+    resultado = RutaService.calcular_ruta_con_calles(db, ruta.id)
+
+    assert recibidos == [1, 2, 1]
+    assert resultado["puntos_totales"] == 3
+
+
+def test_calcular_metricas_ruta_agrega_entregas(db):
+    ruta = _ruta_con_entregas(db, [1, 2, 3])
+
+    metricas = RutaService.calcular_metricas_ruta(db, ruta.id)
+
+    assert metricas["total_entregas"] == 3
+    assert metricas["peso_total_kg"] == pytest.approx(30.0)
+    assert metricas["volumen_total_m3"] == pytest.approx(3.0)
@@ -0,0 +1,18 @@
+"""test_turno_service.py - UPDATE parcial de turnos sobre SQLite temporal"""
+
+from datetime import date
+
+from gestion_rutas.database.db import execute_insert_update_delete, execute_query_one
+from gestion_rutas.service.turno_service import TurnoService
+
+
+def test_actualizar_turno_conserva_ausentes_y_limpia_none_enviado(sqlite_engine):
+    execute_insert_update_delete(
+        "INSERT INTO turno (id_turno, id_camion, fecha, operador, estado) VALUES (%s, %s, %s, %s, %s)",
+        (1, 7, date(2024, 1, 1), "Ana", "programado")
+    )
+
+    TurnoService.actualizar_turno(1, {"estado": "en_curso", "operador": None})
+
+    fila = execute_query_one("SELECT id_camion, operador, estado FROM turno WHERE id_turno = %s", (1,))
+    assert fila == {"id_camion": 7, "operador": None, "estado": "en_curso"}
@@ -4,11 +4,42 @@ Service Layer para Turnos - PostgreSQL Directo
 
 from typing import List, Optional, Dict, Any
 from datetime import date
-from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete
+from ..database.db import execute_query, execute_query_one, execute_insert_returning, execute_insert_update_delete, separar_total, set_enviados, valores_enviados
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Consultas de obtener_turnos precalculadas por máscara de filtros presentes
+# (bit i = _FILTROS_LISTADO[i]): texto SQL estable por combinación de filtros
+_FILTROS_LISTADO = ("estado = %s", "id_camion = %s", "fecha >= %s", "fecha <= %s")
+
+
+def _where_listado(mascara: int) -> str:
+    condiciones = [f for i, f in enumerate(_FILTROS_LISTADO) if mascara >> i & 1]
+    return " WHERE " + " AND ".join(condiciones) if condiciones else ""
+
+
+_SQL_LISTADO = [
+    f"SELECT *, COUNT(*) OVER () AS total FROM turno{_where_listado(mascara)} ORDER BY fecha DESC OFFSET %s LIMIT %s"
+    for mascara in range(1 << len(_FILTROS_LISTADO))
+]
+# Total cuando la página sale vacía (skip más allá del final), ver separar_total
+_SQL_CONTEO = [
+    f"SELECT COUNT(*) AS total FROM turno{_where_listado(mascara)}"
+    for mascara in range(1 << len(_FILTROS_LISTADO))
+]
+
+# Fila completa de turno para las sentencias preparadas (nunca SELECT *)
+_COLUMNAS_TURNO = "id_turno, id_camion, fecha, hora_inicio, hora_fin, operador, estado"
+
+# Columnas actualizables de turno; texto SQL fijo (lo no enviado se conserva)
+_COLUMNAS_ACTUALIZABLES = ('id_camion', 'fecha', 'hora_inicio', 'hora_fin', 'operador', 'estado')
+_SQL_ACTUALIZAR_TURNO = (
+    "UPDATE turno SET "
+    + set_enviados(_COLUMNAS_ACTUALIZABLES)
+    + f" WHERE id_turno = %s RETURNING {_COLUMNAS_TURNO}"
+)
+
 
 class TurnoService:
     """Servicio para operaciones con Turnos"""
@@ -24,12 +55,12 @@ class TurnoService:
     ) -> Optional[Dict]:
         """Crear nuevo turno"""
         try:
-            query = """
+            query = f"""
                 INSERT INTO turno (id_camion, fecha, hora_inicio, hora_fin, operador, estado)
                 VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING *
+                RETURNING {_COLUMNAS_TURNO}
             """
-            resultado = execute_insert_returning(query, (id_camion, fecha, hora_inicio, hora_fin, operador, estado))
+            resultado = execute_insert_returning(query, (id_camion, fecha, hora_inicio, hora_fin, operador, estado), preparada=True)
             if resultado:
                 logger.info(f"Turno {resultado.get('id_turno')} creado")
             return resultado
@@ -40,8 +71,8 @@ class TurnoService:
     @staticmethod
     def obtener_turno(turno_id: int) -> Optional[Dict]:
         """Obtener turno por ID"""
-        query = "SELECT * FROM turno WHERE id_turno = %s"
-        return execute_query_one(query, (turno_id,))
+        query = f"SELECT {_COLUMNAS_TURNO} FROM turno WHERE id_turno = %s"
+        return execute_query_one(query, (turno_id,), preparada=True)
 
     @staticmethod
     def obtener_turnos(
@@ -53,39 +84,20 @@ class TurnoService:
         limit: int = 10
     ) -> tuple[List[Dict], int]:
         """Obtener turnos con filtros"""
-        conditions = []
-        params = []
-        
-        if estado:
-            conditions.append("estado = %s")
-            params.append(estado)
-        if id_camion:
-            conditions.append("id_camion = %s")
-            params.append(id_camion)
-        if fecha_desde:
-            conditions.append("fecha >= %s")
-            params.append(fecha_desde)
-        if fecha_hasta:
-            conditions.append("fecha <= %s")
-            params.append(fecha_hasta)
-        
-        where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
-        
-        params.extend([skip, limit])
-        query = f"SELECT * FROM turno{where_clause} ORDER BY fecha DESC OFFSET %s LIMIT %s"
-        turnos = execute_query(query, tuple(params))
+        filtros = (estado, id_camion, fecha_desde, fecha_hasta)
+        mascara = sum(1 << i for i, valor in enumerate(filtros) if valor)
+        params = [valor for valor in filtros if valor]
         
-        count_query = f"SELECT COUNT(*) as total FROM turno{where_clause}"
-        count_result = execute_query_one(count_query, tuple(params[:-2]) if conditions else ())
-        total = count_result['total'] if count_result else 0
+        # Página y total en una sola consulta
+        turnos = execute_query(_SQL_LISTADO[mascara], tuple(params) + (skip, limit))
         
-        return turnos, total
+        return separar_total(turnos, skip=skip, consulta_conteo=_SQL_CONTEO[mascara], params_conteo=tuple(params))
 
     @staticmethod
     def obtener_turnos_por_camion(id_camion: int) -> List[Dict]:
         """Obtener todos los turnos de un camión"""
-        query = "SELECT * FROM turno WHERE id_camion = %s ORDER BY fecha DESC"
-        return execute_query(query, (id_camion,))
+        query = f"SELECT {_COLUMNAS_TURNO} FROM turno WHERE id_camion = %s ORDER BY fecha DESC"
+        return execute_query(query, (id_camion,), preparada=True)
 
     @staticmethod
     def cambiar_estado_turno(turno_id: int, nuevo_estado: str) -> Optional[Dict]:
@@ -95,8 +107,8 @@ class TurnoService:
             if nuevo_estado not in estados_validos:
                 raise ValueError(f"Estado no válido. Debe ser uno de: {estados_validos}")
 
-            query = "UPDATE turno SET estado = %s WHERE id_turno = %s RETURNING *"
-            resultado = execute_insert_returning(query, (nuevo_estado, turno_id))
+            query = f"UPDATE turno SET estado = %s WHERE id_turno = %s RETURNING {_COLUMNAS_TURNO}"
+            resultado = execute_insert_returning(query, (nuevo_estado, turno_id), preparada=True)
             if resultado:
                 logger.info(f"Turno {turno_id} cambió a estado {nuevo_estado}")
             return resultado
@@ -106,24 +118,21 @@ class TurnoService:
 
     @staticmethod
     def actualizar_turno(turno_id: int, datos: Dict[str, Any]) -> Optional[Dict]:
-        """Actualizar datos de un turno"""
-        campos = []
-        valores = []
-        for key, value in datos.items():
-            if value is not None:
-                campos.append(f"{key} = %s")
-                valores.append(value)
+        """Actualizar datos de un turno (los campos ausentes se conservan; un None enviado limpia el campo)"""
+        desconocidos = set(datos) - set(_COLUMNAS_ACTUALIZABLES)
+        if desconocidos:
+            raise ValueError(f"Campos no actualizables: {', '.join(sorted(desconocidos))}")
         
-        if not campos:
+        if not datos:
             return TurnoService.obtener_turno(turno_id)
         
+        valores = valores_enviados(datos, _COLUMNAS_ACTUALIZABLES)
         valores.append(turno_id)
-        query = f"UPDATE turno SET {', '.join(campos)} WHERE id_turno = %s RETURNING *"
-        return execute_insert_returning(query, tuple(valores))
+        return execute_insert_returning(_SQL_ACTUALIZAR_TURNO, tuple(valores), preparada=True)
 
     @staticmethod
     def eliminar_turno(turno_id: int) -> bool:
         """Eliminar un turno"""
         query = "DELETE FROM turno WHERE id_turno = %s"
-        resultado = execute_insert_update_delete(query, (turno_id,))
+        resultado = execute_insert_update_delete(query, (turno_id,), preparada=True)
         return resultado > 0